@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, product, content, scheduler, youtube, facebook, instagram, twitter, twitterNew
+from app.api.v1.endpoints import auth, product, content, scheduler, youtube, facebook, instagram, twitter, twitterNew, uploads, media, jobs
 
 router = APIRouter()
 
@@ -20,5 +20,12 @@ router.include_router(youtube.router, prefix="/youtube", tags=["YouTube"])
 router.include_router(facebook.router, prefix="/facebook", tags=["Facebook"])
 router.include_router(instagram.router, prefix="/instagram", tags=["Instagram"])
 router.include_router(twitter.router, prefix="/twitter", tags=["Twitter"])
+
+# Resumable media uploads
+router.include_router(uploads.router, prefix="/uploads", tags=["Uploads"])
+router.include_router(media.router, prefix="/media", tags=["Media"])
+
+# Background jobs (202 Accepted endpoints)
+router.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
 # router.include_router(twitterNew.router, prefix="/twitter-new", tags=["Twitter-New"])
 # router.include_router(health.router)
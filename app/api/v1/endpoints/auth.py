@@ -10,6 +10,7 @@ from app.models.firestore_db import (
     sign_in_with_email_password
 )
 from app.core.db_dependencies import db_session
+from app.services import connections
 from typing import Dict
 from firebase_admin import auth as firebase_auth
 import httpx
@@ -106,20 +107,11 @@ async def get_connected_platforms(
     #     raise HTTPException(status_code=403, detail="Not authorized to view this user's platforms.")
 
     platforms = {}
-    platform_collections = {
-        "facebook": "facebook_credentials",
-        "twitter": "twitter_credentials",
-        "instagram": "instagram_credentials",
-        "youtube": "youtube_credentials",
-    }
-    for platform, collection in platform_collections.items():
-        creds = await db.query(
-            collection,
-            filters=[("user_id", "==", user_id)]
-        )
-        print(f"***Found {creds} active credentials for {platform}***")
-        if creds and len(creds) > 0:
-            platforms[platform] = {"status": "connected"}
+    doc = await connections.get(db, user_id)
+    for platform in connections.CREDENTIAL_COLLECTIONS:
+        credential_id = connections.credential_id(doc, platform)
+        if credential_id:
+            platforms[platform] = {"status": "connected", "credential_id": credential_id}
         else:
             platforms[platform] = {"status": "not_connected"}
 
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.models.content import Content, ContentCreate, ContentUpdate
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List, Optional, Union
+from app.models.content import Content, ContentChanges, ContentCreate, ContentUpdate
 from app.models.user import User
 from app.core.db_dependencies import get_db
 from app.models.firestore_db import FirestoreSession
 from app.api.v1.dependencies import get_firebase_user
+from app.services import sync
 
 router = APIRouter()
 
@@ -20,12 +21,28 @@ async def create_content(
     doc_id = await db.add("content", content_data)
     return {**content_data, "id": doc_id}
 
-@router.get("/", response_model=List[Content])
+@router.get("/", response_model=Union[List[Content], ContentChanges])
 async def list_content(
+    response: Response,
+    since: Optional[str] = None,
     db: FirestoreSession = Depends(get_db),
     current_user: User = Depends(get_firebase_user)
 ):
-    """List all content items for the current user."""
+    """
+    List all content items for the current user (next sync cursor in the
+    X-Sync-Cursor header), or with `?since=<cursor>` only what changed.
+    """
+    if since:
+        try:
+            return await sync.changes_since(
+                db, "content", str(current_user.id), sync.decode_cursor(since)
+            )
+        except sync.CursorExpired as exc:
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(exc))
+        except sync.InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    response.headers["X-Sync-Cursor"] = sync.current_cursor()
     content_items = await db.query(
         "content",
         filters=[("user_id", "==", str(current_user.id))]
@@ -84,3 +101,4 @@ async def delete_content(
         raise HTTPException(status_code=403, detail="Not authorized to delete this content")
     
     await db.delete("content", content_id)
+    await sync.record_deletion(db, "content", content_id, str(current_user.id))
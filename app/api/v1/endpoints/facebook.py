@@ -5,14 +5,17 @@ from app.core.db_dependencies import db_session
 from app.api.v1.dependencies import get_firebase_user
 from app.services import facebook_service as fb
 from app.services.facebook_service import post_video
+from app.services import media_budget
+from app.services.media_storage import get_media_storage, owns_object
+from app.services import connections, ephemeral, jobs, rendering
+from app.models.job import JobAccepted
 from app.models.firestore_db import FirestoreSession
 from app.services.user_service_new import UserService
 import httpx
 from app.core.config import get_settings
 from typing import List
 from app.models.facebook import FacebookCredential, FacebookCredentialCreate, FacebookCredentialUpdate
-import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 settings = get_settings()
 router = APIRouter(tags=["Facebook"])
@@ -139,14 +142,16 @@ async def fb_callback(
         
         if existing_fb_credentials:
             # Update existing Facebook credential
+            fb_credential_id = existing_fb_credentials[0]["id"]
             await db.update(
                 "facebook_credentials",
-                existing_fb_credentials[0]["id"],
+                fb_credential_id,
                 fb_credential_data
             )
         else:
             # Create new Facebook credential
-            await db.add("facebook_credentials", fb_credential_data)
+            fb_credential_id = await db.add("facebook_credentials", fb_credential_data)
+        await connections.record(db, user_id, "facebook", fb_credential_id, fb_credential_data)
         
         # Get Instagram account
         instagram_url = f"https://graph.facebook.com/v23.0/{page['id']}"
@@ -186,14 +191,16 @@ async def fb_callback(
                 
                 if existing_instagram_credentials:
                     # Update existing Instagram credential
+                    ig_credential_id = existing_instagram_credentials[0]["id"]
                     await db.update(
                         "instagram_credentials",
-                        existing_instagram_credentials[0]["id"],
+                        ig_credential_id,
                         instagram_credential_data
                     )
                 else:
                     # Create new Instagram credential
-                    await db.add("instagram_credentials", instagram_credential_data)
+                    ig_credential_id = await db.add("instagram_credentials", instagram_credential_data)
+                await connections.record(db, user_id, "instagram", ig_credential_id, instagram_credential_data)
     
     return {"message": "Facebook and Instagram accounts connected successfully"}
 
@@ -202,9 +209,15 @@ async def fb_callback(
 async def post_message(
     message: str = Form(...),
     file: UploadFile = File(None),
+    object_name: str | None = Form(None),
     user: User = Depends(get_firebase_user),
     db: FirestoreSession = Depends(db_session)
 ):
+    """Post to the page feed with an uploaded photo or one already in the media bucket."""
+    message = rendering.fit_text("facebook", message)
+    if object_name and not owns_object(str(user.id), object_name):
+        raise HTTPException(status_code=403, detail="Not authorized to use this media object")
+
     # Get user's Facebook credentials
     credentials = await db.query(
         "facebook_credentials",
@@ -218,28 +231,39 @@ async def post_message(
     # Upload photo if provided
     photo_id = None
     if file:
-        path = f"/tmp/{file.filename}"
-        with open(path, "wb") as f:
-            f.write(await file.read())
-        
-        async with httpx.AsyncClient() as client:
+        async with media_budget.admitted_upload(file) as source:
+            # httpx streams the spooled file into the multipart body
+            async with httpx.AsyncClient(timeout=120.0) as client:
+                response = await client.post(
+                    f"https://graph.facebook.com/v23.0/{credential['page_id']}/photos",
+                    params={
+                        "access_token": credential["access_token"],
+                        "published": False
+                    },
+                    files={
+                        "source": (file.filename, source, file.content_type)
+                    }
+                )
+
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail="Failed to upload photo")
+
+        photo_id = response.json()["id"]
+    elif object_name:
+        # Meta fetches the photo from the bucket; no bytes pass through the API
+        async with httpx.AsyncClient(timeout=60.0) as client:
             response = await client.post(
                 f"https://graph.facebook.com/v23.0/{credential['page_id']}/photos",
-                params={
+                data={
+                    "url": get_media_storage().signed_download_url(object_name),
+                    "published": False,
                     "access_token": credential["access_token"],
-                    "published": False
                 },
-                files={
-                    "source": open(path, "rb")
-                }
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Failed to upload photo")
-            
-            photo_id = response.json()["id"]
-        
-        os.remove(path)
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail="Failed to upload photo")
+
+        photo_id = response.json()["id"]
     
     # Create post
     async with httpx.AsyncClient() as client:
@@ -298,7 +322,7 @@ async def fb_photo(
         raise HTTPException(400, f"Photo upload failed: {r.text}")
     return r.json()
 
-@router.post("/video")
+@router.post("/video", status_code=status.HTTP_202_ACCEPTED, response_model=JobAccepted)
 async def fb_video(
     video_url: str = Form(...),
     title: str = Form(...),
@@ -307,7 +331,10 @@ async def fb_video(
     user: User = Depends(get_firebase_user),
     db: FirestoreSession = Depends(db_session)
 ):
-    """Post a video to Facebook"""
+    """
+    Post a video to Facebook.  Runs as a background job that waits for
+    Meta to finish processing; poll /jobs/{job_id} for progress.
+    """
     # Get the credential
     if credential_id:
         credential = await db.get("facebook_credentials", credential_id)
@@ -323,43 +350,47 @@ async def fb_video(
             raise HTTPException(status_code=400, detail="No Facebook account connected")
         credential = credentials[0]
         credential_id = credential["id"]  # Store the credential ID for later use
-    
-    # First, create a video container
-    url = f"https://graph.facebook.com/v23.0/{credential['page_id']}/videos"
-    params = {
-        "file_url": video_url,
-        "title": title,
-        "description": description or "",
-        "access_token": credential["access_token"]
-    }
-    
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:  # 30 second timeout for initial request
+
+    async def run(job: jobs.JobContext) -> dict:
+        await job.progress(0.0, "sending video to Facebook", force=True)
+        # First, create a video container
+        url = f"https://graph.facebook.com/v23.0/{credential['page_id']}/videos"
+        params = {
+            "file_url": video_url,
+            "title": title,
+            "description": description or "",
+            "access_token": credential["access_token"]
+        }
+        async with httpx.AsyncClient(timeout=120.0) as client:
             r = await client.post(url, data=params)
-            if r.status_code != 200:
-                raise HTTPException(400, f"Video upload failed: {r.text}")
-            response = r.json()
-            
-            # Store the upload status in the database
-            status_data = {
-                "user_id": str(user.id),
-                "credential_id": credential_id,
-                "video_id": response.get("id"),
-                "status": "processing",
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            await db.add("video_uploads", status_data)
-            
-            return {
-                "video_id": response.get("id"),
-                "status": "processing",
-                "message": "Video upload started. Use /video/{video_id}/status to check progress."
-            }
-    except httpx.TimeoutException:
-        raise HTTPException(408, "Request timed out. The video might be too large or the server might be busy.")
-    except httpx.RequestError as e:
-        raise HTTPException(500, f"Failed to upload video: {str(e)}")
+        if r.status_code != 200:
+            raise RuntimeError(f"Video upload failed: {r.text}")
+        video_id = r.json().get("id")
+
+        # Store the upload status in the database, keyed by the video ID
+        await db.set("video_uploads", video_id, {
+            "user_id": str(user.id),
+            "credential_id": credential_id,
+            "video_id": video_id,
+            "status": "processing",
+            "updated_at": datetime.utcnow().isoformat(),
+            "expires_at": ephemeral.expires_in(timedelta(days=settings.video_upload_ttl_days)),
+        })
+
+        video_status = await fb.wait_for_video(
+            video_id,
+            credential["access_token"],
+            on_progress=lambda pct: job.progress(pct / 100, "Facebook is processing the video"),
+        )
+        await db.update("video_uploads", video_id, {
+            "status": video_status, "updated_at": datetime.utcnow().isoformat(),
+        })
+        if video_status != "ready":
+            raise RuntimeError(f"Facebook could not process the video (status: {video_status})")
+        return {"video_id": video_id, "status": video_status}
+
+    job_id = await jobs.submit(db, str(user.id), "facebook_video", run, {"video_url": video_url})
+    return jobs.accepted(job_id)
 
 @router.get("/video/{video_id}/status")
 async def video_status(
@@ -400,18 +431,12 @@ async def video_status(
             status_data = r.json()
             
             # Update status in database
-            uploads = await db.query(
-                "video_uploads",
-                filters=[
-                    ("user_id", "==", str(user.id)),
-                    ("video_id", "==", video_id)
-                ]
-            )
+            upload = await db.get("video_uploads", video_id)
             
-            if uploads:
+            if upload and upload.get("user_id") == str(user.id):
                 await db.update(
                     "video_uploads",
-                    uploads[0]["id"],
+                    video_id,
                     {
                         "status": status_data.get("status", "unknown"),
                         "updated_at": datetime.utcnow().isoformat()
@@ -505,6 +530,7 @@ async def update_facebook_credential(
     await db.update("facebook_credentials", credential_id, update_data)
     
     updated_credential = await db.get("facebook_credentials", credential_id)
+    await connections.record(db, str(current_user.id), "facebook", credential_id, updated_credential)
     return updated_credential
 
 @router.delete("/credentials/{credential_id}")
@@ -519,4 +545,5 @@ async def delete_facebook_credential(
         raise HTTPException(status_code=404, detail="Credential not found")
     
     await db.delete("facebook_credentials", credential_id)
+    await connections.forget(db, str(user.id), "facebook", credential_id)
     return {"message": "Credential deleted successfully"}
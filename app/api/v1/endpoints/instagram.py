@@ -5,6 +5,7 @@ from app.api.v1.dependencies import get_firebase_user
 from app.core.db_dependencies import get_db
 from app.models.firestore_db import FirestoreSession
 from app.models.instagram import InstagramCredential, InstagramCredentialCreate, InstagramCredentialUpdate
+from app.services import connections, rendering
 import httpx
 from starlette.responses import RedirectResponse
 from datetime import datetime, timedelta
@@ -108,7 +109,9 @@ async def instagram_callback(
         "token_expires_at": datetime.utcnow() + timedelta(seconds=long_lived_expires_in),
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
-        "is_active": True
+        "is_active": True,
+        # a reconnect ends any refresh backoff (token_refresh.py)
+        "refresh_failures": 0,
     }
 
     # Check if credential already exists
@@ -127,6 +130,7 @@ async def instagram_callback(
     else:
         # Create new credential
         credential_id = await db.add("instagram_credentials", credential_data)
+    await connections.record(db, state, "instagram", credential_id, credential_data)
 
     return {
         "status": "connected",
@@ -178,6 +182,7 @@ async def delete_credential(
         raise HTTPException(status_code=403, detail="Not authorized to delete this credential")
     
     await db.update("instagram_credentials", credential_id, {"is_active": False})
+    await connections.record(db, str(user.id), "instagram", credential_id, {**credential, "is_active": False})
     return None
 
 # Media endpoints remain the same but use the credential from the database
@@ -207,7 +212,7 @@ async def create_media(
     url = f"https://graph.facebook.com/v23.0/{credential['instagram_account_id']}/media"
     params = {
         "image_url": image_url,
-        "caption": caption or "",
+        "caption": rendering.fit_text("instagram", caption or ""),
         "access_token": credential["access_token"]
     }
     async with httpx.AsyncClient() as client:
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.models.user import User
+from app.models.job import Job
+from app.models.firestore_db import FirestoreSession
+from app.core.db_dependencies import db_session
+from app.api.v1.dependencies import get_firebase_user
+from app.services.jobs import get_job
+
+router = APIRouter(tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job_status(
+    job_id: str,
+    user: User = Depends(get_firebase_user),
+    db: FirestoreSession = Depends(db_session),
+):
+    """Status, progress and – once finished – the result of a background job."""
+    job = await get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["user_id"] != str(user.id):
+        raise HTTPException(status_code=403, detail="Not authorized to access this job")
+    return job
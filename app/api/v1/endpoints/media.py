@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from starlette.responses import FileResponse, Response
+from app.models.user import User
+from app.models.media import MediaUploadRequest, MediaUploadTicket
+from app.api.v1.dependencies import get_firebase_user
+from app.core.config import get_settings
+from app.services.media_storage import LocalMediaStorage, get_media_storage, user_prefix
+from datetime import datetime, timedelta, timezone
+from pathlib import PurePosixPath
+import uuid
+
+router = APIRouter(tags=["Media"])
+settings = get_settings()
+
+
+@router.post("/upload-url", response_model=MediaUploadTicket, status_code=status.HTTP_201_CREATED)
+async def create_upload_url(
+    data: MediaUploadRequest,
+    user: User = Depends(get_firebase_user),
+):
+    """
+    Issue a signed URL so the client uploads media straight to the bucket.
+    Send the returned `object_name` to the posting endpoints or put it in
+    `marketing_content[platform].video_object` / `image_object`.
+    """
+    filename = PurePosixPath(data.filename).name or "upload"
+    object_name = f"{user_prefix(str(user.id))}{uuid.uuid4().hex}/{filename}"
+    ticket = get_media_storage().signed_upload(object_name, data.content_type)
+    return {
+        **ticket,
+        "object_name": object_name,
+        "expires_at": datetime.now(timezone.utc) + timedelta(minutes=settings.media_signed_url_minutes),
+    }
+
+
+# ---------- local stand-in for the bucket (MEDIA_STORAGE_BACKEND=local) ---------- #
+def _local_storage(method: str, object_name: str, expires: int, signature: str) -> LocalMediaStorage:
+    storage = get_media_storage()
+    if not isinstance(storage, LocalMediaStorage):
+        raise HTTPException(status_code=404, detail="Not found")
+    if not storage.verify(method, object_name, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+    return storage
+
+
+@router.put("/local/{object_name:path}", include_in_schema=False)
+async def local_put_object(object_name: str, expires: int, signature: str, request: Request):
+    storage = _local_storage("PUT", object_name, expires, signature)
+    path = storage.path(object_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as fh:
+        async for chunk in request.stream():
+            fh.write(chunk)
+    return Response(status_code=status.HTTP_200_OK)
+
+
+@router.get("/local/{object_name:path}", include_in_schema=False)
+async def local_get_object(object_name: str, expires: int, signature: str):
+    storage = _local_storage("GET", object_name, expires, signature)
+    path = storage.path(object_name)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Object not found")
+    return FileResponse(path)
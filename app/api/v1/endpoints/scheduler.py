@@ -1,22 +1,54 @@
-from datetime import datetime, timezone
-from typing import List
+import asyncio
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from typing import Any, List, Literal, Union
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from uuid import UUID
 
 from app.api.v1.dependencies import get_firebase_user
+from app.core.config import get_settings
 from app.core.db_dependencies import get_db
-from app.models.enums import ScheduleState
+from app.models.enums import Platform, ScheduleState
 from app.models.firestore_db import FirestoreSession
-from app.models.schedule import Schedule, ScheduleCreate, ScheduleUpdate
+from app.models.schedule import (
+    Schedule,
+    ScheduleBulkCreate,
+    ScheduleBulkDelete,
+    ScheduleBulkResult,
+    ScheduleBulkStatus,
+    ScheduleChanges,
+    ScheduleCreate,
+    ScheduleUpdate,
+)
 from app.models.user import User
+from app.services import calendar_counters, events, payloads, schedule_bulk, schedule_writes, sync
+from app.services.media_storage import MediaAccessDenied
+from app.services.native_scheduling import cancel_native, needs_native, retime_native
+from app.utils.pagination import InvalidPageToken, decode_page_token, encode_page_token
 
 router = APIRouter()
+settings = get_settings()
+
+CALENDAR_MAX_DAYS = 62
 
 
 # ────────────────────────────────────────────────────────────────────
 # helpers
 # ────────────────────────────────────────────────────────────────────
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+async def _payload(db: FirestoreSession, product_id: str | None, platforms: List[Any], user_id: str):
+    """Payload snapshot; 403 if the product points at another user's media."""
+    try:
+        return await payloads.build(db, product_id, platforms, user_id)
+    except MediaAccessDenied as exc:
+        raise HTTPException(status_code=403, detail=f"Not authorized to use media object {exc}")
+
+
 def _assert_owner(user_id: str, current_user: User):
     if user_id != str(current_user.id):
         raise HTTPException(
@@ -28,14 +60,75 @@ def _assert_owner(user_id: str, current_user: User):
 # ────────────────────────────────────────────────────────────────────
 # routes
 # ────────────────────────────────────────────────────────────────────
-@router.get("/", response_model=List[Schedule])
+@router.get("/", response_model=Union[List[Schedule], ScheduleChanges])
 async def list_schedules(
     user_id: str,
+    response: Response,
+    since: str | None = None,
+    status_filter: ScheduleState | None = Query(None, alias="status"),
+    platform: Platform | None = None,
+    run_at_from: datetime | None = None,
+    run_at_to: datetime | None = None,
+    sort: Literal["run_at", "-run_at"] = "run_at",
+    page_size: int = Query(settings.schedule_page_size_default, ge=1),
+    page_token: str | None = None,
     db: FirestoreSession = Depends(get_db),
     # current_user: User = Depends(get_firebase_user),
 ):
+    """
+    The user's schedules, filtered by `status`, `platform` and a `run_at`
+    range and sorted by run_at (`-run_at` = newest first).  Pages hold at most
+    `schedule_page_size_max` items; the token for the next page is returned
+    in X-Next-Page-Token and the cursor for incremental sync in X-Sync-Cursor.
+
+    With `?since=<cursor>` only the schedules changed and the IDs deleted
+    since then are returned instead (filters don't apply).
+    """
     # _assert_owner(user_id, current_user)
-    return await db.query("schedules", filters=[("user_id", "==", user_id)])
+    if since:
+        try:
+            return await sync.changes_since(db, "schedules", user_id, sync.decode_cursor(since))
+        except sync.CursorExpired as exc:
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(exc))
+        except sync.InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    response.headers["X-Sync-Cursor"] = sync.current_cursor()
+
+    filters = [("user_id", "==", user_id)]
+    if status_filter:
+        filters.append(("status", "==", status_filter.value))
+    if platform:
+        filters.append(("platforms", "array_contains", platform.value))
+    if run_at_from:
+        filters.append(("run_at", ">=", _as_utc(run_at_from)))
+    if run_at_to:
+        filters.append(("run_at", "<", _as_utc(run_at_to)))
+
+    start_after = None
+    if page_token:
+        try:
+            start_after = decode_page_token(page_token, {"filters": filters, "sort": sort})
+        except InvalidPageToken as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    limit = min(page_size, settings.schedule_page_size_max)
+    rows = await db.query(
+        "schedules",
+        filters=filters,
+        order_by=["run_at", "__name__"],
+        direction="DESCENDING" if sort == "-run_at" else "ASCENDING",
+        start_after=start_after,
+        limit=limit + 1,
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Page-Token"] = encode_page_token(
+            {"run_at": last["run_at"], "__name__": last["id"]},
+            {"filters": filters, "sort": sort},
+        )
+    return rows
 
 
 @router.post("/", response_model=Schedule, status_code=status.HTTP_201_CREATED)
@@ -56,11 +149,123 @@ async def create_schedule(
 
     # data.run_at is already tz-aware UTC thanks to the validator
     schedule_data["run_at"] = data.run_at
+    # rendered text + media refs, so dispatch needn't read the product
+    payload = await _payload(db, schedule_data["product_id"], data.platforms, user_id)
+    if payload:
+        schedule_data["payload"] = payload
+    schedule_data["native_pending"] = needs_native(schedule_data)
 
-    doc_id = await db.add("schedules", schedule_data)
+    doc_id = await schedule_writes.create(db, schedule_data)
+    events.publish_schedule(doc_id, schedule_data)
     return {**schedule_data, "id": doc_id}
 
 
+def _check_bulk_size(count: int) -> None:
+    if count > settings.schedule_bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.schedule_bulk_max_items} items per request",
+        )
+
+
+@router.post("/bulk", response_model=ScheduleBulkResult)
+async def bulk_create_schedules(
+    user_id: str,
+    data: ScheduleBulkCreate,
+    db: FirestoreSession = Depends(get_db),
+    current_user: User = Depends(get_firebase_user),
+):
+    """Create many schedules at once; each item is a ScheduleCreate with its own result."""
+    _assert_owner(user_id, current_user)
+    _check_bulk_size(len(data.items))
+    return await schedule_bulk.create_many(db, user_id, data.items)
+
+
+@router.post("/bulk/status", response_model=ScheduleBulkResult)
+async def bulk_update_status(
+    user_id: str,
+    data: ScheduleBulkStatus,
+    db: FirestoreSession = Depends(get_db),
+    current_user: User = Depends(get_firebase_user),
+):
+    """Set the status of many schedules."""
+    _assert_owner(user_id, current_user)
+    _check_bulk_size(len(data.ids))
+    return await schedule_bulk.update_status_many(db, user_id, data.ids, data.status)
+
+
+@router.post("/bulk/delete", response_model=ScheduleBulkResult)
+async def bulk_delete_schedules(
+    user_id: str,
+    data: ScheduleBulkDelete,
+    db: FirestoreSession = Depends(get_db),
+    current_user: User = Depends(get_firebase_user),
+):
+    """Delete many schedules, withdrawing natively scheduled posts."""
+    _assert_owner(user_id, current_user)
+    _check_bulk_size(len(data.ids))
+    return await schedule_bulk.delete_many(db, user_id, data.ids)
+
+
+@router.get("/calendar")
+async def schedule_calendar(
+    user_id: str,
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+    tz: str = "UTC",
+    db: FirestoreSession = Depends(get_db),
+    current_user: User = Depends(get_firebase_user),
+):
+    """
+    Schedule counts per day in [from, to] (local dates in `tz`), split by
+    platform and status.  Served from the per-day counter docs.
+    """
+    _assert_owner(user_id, current_user)
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {tz}")
+    if end < start:
+        raise HTTPException(status_code=400, detail="`to` is before `from`")
+    if (end - start).days >= CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {CALENDAR_MAX_DAYS} days per request")
+
+    days = await calendar_counters.calendar_days(db, user_id, start, end, zone)
+    return {"from": start, "to": end, "tz": tz, "days": days}
+
+
+@router.get("/events")
+async def schedule_events(
+    request: Request,
+    current_user: User = Depends(get_firebase_user),
+):
+    """
+    Server-Sent Events stream of the current user's schedule status changes
+    (`event: schedule`, incl. per-platform results) and background job
+    progress (`event: job`).
+    """
+    events.bridge.ensure_started()
+
+    async def stream():
+        async with events.broker.subscribe(str(current_user.id)) as queue:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=settings.events_keepalive_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield events.format_sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{schedule_id}", response_model=Schedule)
 async def get_schedule(
     user_id: str,
@@ -96,11 +301,47 @@ async def update_schedule(
 
     update_data = data.model_dump(exclude_unset=True)
     update_data["modified_at"] = datetime.utcnow()
-    if "run_at" in update_data:
+    # re-render from the current product; keep the old snapshot if it is gone
+    payload = await _payload(
+        db, schedule.get("product_id"),
+        update_data.get("platforms") or schedule.get("platforms") or [], user_id,
+    )
+    if payload:
+        update_data["payload"] = payload
+    leaving_upcoming = (
+        update_data.get("status") not in (None, ScheduleState.upcoming)
+        and schedule.get("status") == ScheduleState.upcoming
+    )
+    native = schedule.get("native") or {}
+    if leaving_upcoming and native:
+        # a cancelled / paused schedule must not be published by the platform
+        await cancel_native(db, schedule)
+        update_data["native"] = {}
+    elif any(payloads.changed(schedule.get("payload"), update_data.get("payload"), p) for p in native):
+        # the platform holds the old content: take it back, the worker
+        # schedules the new one natively again (at the new run_at, if any)
+        await cancel_native(db, schedule)
+        update_data.update({"native": {}, "native_skipped": [], "native_attempts": {}})
+    elif "run_at" in update_data:
         # validator already UTC-normalised
         update_data["run_at"] = update_data["run_at"]
-    await db.update("schedules", schedule_id, update_data)
-    return await db.get("schedules", schedule_id)
+        if schedule.get("native"):
+            # keep the platform-side scheduled posts in step with run_at
+            update_data["native"] = await retime_native(db, schedule, update_data["run_at"])
+
+    def decide(current: dict | None) -> dict | None:
+        # a dispatch or another edit that changed the status meanwhile wins
+        if current is None or current.get("status") != schedule.get("status"):
+            return None
+        after = schedule_writes.merged(current, update_data)
+        return {**update_data, "native_pending": needs_native(after)}
+
+    written = await schedule_writes.update(db, schedule_id, decide)
+    if written is None:
+        raise HTTPException(status_code=409, detail="Schedule changed meanwhile; reload and retry")
+    updated = written[1]
+    events.publish_schedule(schedule_id, updated)
+    return updated
 
 
 @router.delete("/{schedule_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -117,4 +358,12 @@ async def delete_schedule(
         raise HTTPException(status_code=404, detail="Schedule not found")
     if schedule["user_id"] != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    await db.delete("schedules", schedule_id)
+    if schedule.get("native") and schedule.get("status") == ScheduleState.upcoming:
+        await cancel_native(db, schedule)
+    tombstone = db.db.collection(sync.TOMBSTONES).document()
+    deleted = await schedule_writes.delete(db, schedule_id, also=[
+        lambda t: t.set(tombstone, sync.tombstone("schedules", schedule_id, user_id)),
+    ])
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    events.broker.publish(user_id, {"type": "schedule_deleted", "id": schedule_id})
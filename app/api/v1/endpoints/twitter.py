@@ -6,16 +6,21 @@ from app.core.db_dependencies import db_session
 from app.api.v1.dependencies import get_firebase_user
 from app.models.firestore_db import FirestoreSession
 from app.core.config import get_settings
+from app.services import connections, ephemeral, media_budget, rendering
+from app.services.media_storage import MediaObjectNotFound, get_media_storage, owns_object
+from app.services.twitter_service import post_tweet_for_user
 import tweepy, secrets
+from contextlib import AsyncExitStack
 from datetime import datetime, timedelta
+from pathlib import PurePosixPath
 from typing import List, Optional
 
 router = APIRouter(tags=["Twitter"])
 settings = get_settings()
 
-# --- temporary store for pending OAuth exchanges ---
+# --- temporary store for pending OAuth exchanges, keyed by state ---
 STATE_COLL = "twitter_oauth_state"
-STATE_TTL  = timedelta(minutes=10)            # one-time use, short-lived
+STATE_TTL  = timedelta(minutes=10)            # one-time use, short-lived (Firestore TTL)
 
 
 # ─────────────────────────────────────────────────────────────
@@ -43,13 +48,14 @@ async def twitter_connect(
         redirect_url = handler.get_authorization_url()     # ③ user goes to Twitter
 
         # ④ persist mapping <state → request_token + user>
-        await db.add(
+        await db.set(
             STATE_COLL,
+            state,
             {
                 "state":         state,
                 "request_token": handler.request_token,
                 "user_id":       str(user.id),
-                "expires_at":    datetime.utcnow() + STATE_TTL,
+                "expires_at":    ephemeral.expires_in(STATE_TTL),
             },
         )
 
@@ -73,14 +79,13 @@ async def twitter_callback(
         raise HTTPException(400, "Missing oauth_verifier or state")
 
     # ① find the record we stashed under this state
-    recs = await db.query(STATE_COLL, filters=[("state", "==", state)])
-    if not recs:
+    rec = await db.get(STATE_COLL, state)
+    if ephemeral.expired(rec):
         raise HTTPException(400, "State expired or unknown")
 
-    rec          = recs[0]
     request_tok  = rec["request_token"]      # full {"oauth_token": ..., "oauth_token_secret": ...}
     user_id      = rec["user_id"]
-    await db.delete(STATE_COLL, rec["id"])   # one-time use
+    await db.delete(STATE_COLL, state)       # one-time use
 
     handler = tweepy.OAuth1UserHandler(
         settings.twitter_api_key,
@@ -102,9 +107,11 @@ async def twitter_callback(
 
         existing = await db.query("twitter_credentials", filters=[("user_id", "==", user_id)])
         if existing:
-            credentail_id = await db.update("twitter_credentials", existing[0]["id"], cred)
+            credentail_id = existing[0]["id"]
+            await db.update("twitter_credentials", credentail_id, cred)
         else:
             credentail_id = await db.add("twitter_credentials", cred)
+        await connections.record(db, user_id, "twitter", credentail_id, cred)
         return {"message": "Twitter credentials created successfully", "credential_id": credentail_id}
     
     except Exception as e:
@@ -150,6 +157,7 @@ async def update_twitter_credential(
     update_data["updated_at"] = datetime.utcnow()
     await db.update("twitter_credentials", credential_id, update_data)
     updated_credential = await db.get("twitter_credentials", credential_id)
+    await connections.record(db, str(user.id), "twitter", credential_id, updated_credential)
     return updated_credential
 
 @router.delete("/credentials/{credential_id}")
@@ -162,16 +170,24 @@ async def delete_twitter_credential(
     if not credential or credential["user_id"] != str(user.id):
         raise HTTPException(status_code=404, detail="Credential not found")
     await db.update("twitter_credentials", credential_id, {"is_active": False})
+    await connections.record(db, str(user.id), "twitter", credential_id, {**credential, "is_active": False})
     return {"message": "Credential deleted successfully"}
 
 @router.post("/post", status_code=status.HTTP_201_CREATED)
 async def post_to_twitter(
     text: str = Form(...),
     media: Optional[List[UploadFile]] = File(None),
+    media_objects: Optional[List[str]] = Form(None),
     credential_id: Optional[str] = Form(None),
     user: User = Depends(get_firebase_user),
     db: FirestoreSession = Depends(db_session)
 ):
+    """Tweet with uploaded media and/or objects already in the media bucket."""
+    text = rendering.fit_text("twitter", text)
+    for object_name in media_objects or []:
+        if not owns_object(str(user.id), object_name):
+            raise HTTPException(status_code=403, detail="Not authorized to use this media object")
+
     # Get the credential
     if credential_id:
         credential = await db.get("twitter_credentials", credential_id)
@@ -188,27 +204,23 @@ async def post_to_twitter(
         credential = credentials[0]
         credential_id = credential["id"]  # Store the credential ID for later use
 
-    media_paths = []
-    if media:
-        for file in media:
-            path = f"/tmp/{file.filename}"
-            with open(path, "wb") as out:
-                out.write(file.file.read())
-            media_paths.append(path)
-
     try:
-        tweet_id = await post_tweet_for_user(
-            credential["access_token"],
-            credential["access_token_secret"],
-            text,
-            media_paths
-        )
+        async with AsyncExitStack() as stack:
+            media_files = [
+                (file.filename, await stack.enter_async_context(media_budget.admitted_upload(file)))
+                for file in media or []
+            ]
+            for object_name in media_objects or []:
+                source, _ = stack.enter_context(get_media_storage().open(object_name))
+                media_files.append((PurePosixPath(object_name).name, source))
+            tweet_id = await post_tweet_for_user(
+                credential["access_token"],
+                credential["access_token_secret"],
+                text,
+                media_files=media_files,
+            )
         return {"status": "success", "tweet_id": tweet_id}
+    except MediaObjectNotFound as exc:
+        raise HTTPException(status_code=404, detail=f"Media object not found: {exc}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to post tweet: {e}")
-    finally:
-        for path in media_paths:
-            try:
-                os.remove(path)
-            except Exception:
-                pass
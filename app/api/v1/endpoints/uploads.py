@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from app.models.user import User
+from app.models.upload import UploadCreate, UploadSession
+from app.models.firestore_db import FirestoreSession
+from app.core.db_dependencies import db_session
+from app.api.v1.dependencies import get_firebase_user
+from app.services.media_budget import MediaBudgetExceeded
+from app.services.resumable_uploads import (
+    UploadClosed,
+    UploadExpired,
+    UploadOffsetMismatch,
+    UploadSessionStore,
+    UploadTooLarge,
+    append_chunk,
+    create_upload,
+    expired,
+    get_upload_store,
+    schedule_publish,
+    schedule_sweep,
+)
+
+router = APIRouter(tags=["Uploads"])
+
+TUS_HEADERS = {"Tus-Resumable": "1.0.0", "Cache-Control": "no-store"}
+
+
+async def _owned_session(upload_id: str, user: User, store: UploadSessionStore) -> dict:
+    session = await store.get(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if session["user_id"] != str(user.id):
+        raise HTTPException(status_code=403, detail="Not authorized to access this upload")
+    return session
+
+
+@router.post("/", response_model=UploadSession, status_code=status.HTTP_201_CREATED)
+async def create_resumable_upload(
+    data: UploadCreate,
+    response: Response,
+    user: User = Depends(get_firebase_user),
+    store: UploadSessionStore = Depends(get_upload_store),
+):
+    """Open a resumable upload; send the bytes with PATCH, resume after HEAD."""
+    try:
+        session = await create_upload(store, str(user.id), data.model_dump())
+    except MediaBudgetExceeded as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+    schedule_sweep(store)
+    response.headers.update({
+        **TUS_HEADERS,
+        "Location": f"/api/v1/uploads/{session['id']}",
+        "Upload-Offset": "0",
+        "Upload-Length": str(session["length"]),
+    })
+    return session
+
+
+@router.head("/{upload_id}")
+async def upload_progress(
+    upload_id: str,
+    user: User = Depends(get_firebase_user),
+    store: UploadSessionStore = Depends(get_upload_store),
+):
+    """Offset to resume from."""
+    session = await _owned_session(upload_id, user, store)
+    if session["status"] == "uploading" and expired(session):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Upload expired")
+    return Response(headers={
+        **TUS_HEADERS,
+        "Upload-Offset": str(session["offset"]),
+        "Upload-Length": str(session["length"]),
+    })
+
+
+@router.patch("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    user: User = Depends(get_firebase_user),
+    store: UploadSessionStore = Depends(get_upload_store),
+    db: FirestoreSession = Depends(db_session),
+):
+    """Append the request body at Upload-Offset; publishes once complete."""
+    session = await _owned_session(upload_id, user, store)
+    try:
+        offset = await append_chunk(store, session, upload_offset, request.stream())
+    except UploadExpired as exc:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(exc))
+    except (UploadClosed, UploadOffsetMismatch) as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+
+    if offset == session["length"]:
+        schedule_publish(db, store, {**session, "offset": offset})
+    return Response(status_code=status.HTTP_204_NO_CONTENT,
+                    headers={**TUS_HEADERS, "Upload-Offset": str(offset)})
+
+
+@router.get("/{upload_id}", response_model=UploadSession)
+async def get_upload(
+    upload_id: str,
+    user: User = Depends(get_firebase_user),
+    store: UploadSessionStore = Depends(get_upload_store),
+):
+    """Upload state, including the platform result once published."""
+    return await _owned_session(upload_id, user, store)
@@ -8,11 +8,17 @@ from app.models.firestore_db import FirestoreSession
 from app.models.youtube import YouTubeCredential, YouTubeCredentialCreate, YouTubeCredentialUpdate
 import httpx
 from starlette.responses import RedirectResponse
-import os
-from datetime import datetime, timedelta
-import json
+from datetime import datetime, timedelta, timezone
 from app.services.user_service_new import UserService
 from app.core.db_dependencies import db_session
+from app.services import media_budget
+from app.services.media_budget import MediaBudgetExceeded
+from app.services.youtube_service import upload_stream
+from app.services.media_storage import MediaObjectNotFound, get_media_storage, owns_object
+from app.services import connections, jobs, rendering
+from app.models.job import JobAccepted
+from contextlib import AsyncExitStack
+import mimetypes
 
 router = APIRouter()
 settings = get_settings()
@@ -76,8 +82,11 @@ async def youtube_callback(
                 "access_token": token_data["access_token"],
                 "refresh_token": token_data["refresh_token"],
                 "token_type": token_data["token_type"],
-                "expires_at": (datetime.utcnow() + timedelta(seconds=token_data["expires_in"])).isoformat(),
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=token_data["expires_in"]),
                 "scope": token_data["scope"],
+                "is_active": True,
+                # a reconnect ends any refresh backoff (token_refresh.py)
+                "refresh_failures": 0,
                 "created_at": datetime.utcnow().isoformat(),
                 "updated_at": datetime.utcnow().isoformat()
             }
@@ -92,10 +101,12 @@ async def youtube_callback(
                 # Update existing credential
                 credential_id = existing_credentials[0]["id"]
                 await db.update("youtube_credentials", credential_id, credential_data)
+                await connections.record(db, user.id, "youtube", credential_id, credential_data)
                 return {"message": "YouTube credentials updated successfully", "credential_id": credential_id}
             else:
                 # Create new credential
                 credential_id = await db.add("youtube_credentials", credential_data)
+                await connections.record(db, user.id, "youtube", credential_id, credential_data)
                 return {"message": "YouTube credentials created successfully", "credential_id": credential_id}
             
     except Exception as e:
@@ -104,95 +115,120 @@ async def youtube_callback(
             detail=str(e)
         )
 
-@router.post("/upload")
+@router.post("/upload", status_code=status.HTTP_202_ACCEPTED, response_model=JobAccepted)
 async def youtube_upload(
     title: str = Form(...),
     description: str = Form(""),
-    file: UploadFile = File(...),
+    file: UploadFile | None = File(None),
+    object_name: str | None = Form(None),
     user: User = Depends(get_firebase_user),
     db: FirestoreSession = Depends(get_db)
 ):
-    path = f"/tmp/{file.filename}"
-    with open(path, "wb") as f:
-        f.write(await file.read())
-    
-    # Get user's YouTube credentials
-    credentials = await db.query(
-        "youtube_credentials",
-        filters=[("user_id", "==", str(user.id))]
-    )
+    """
+    Upload a video sent as `file`, or one already in the media bucket
+    (`object_name`).  The upload runs as a background job; poll
+    /jobs/{job_id} for progress and the video ID.
+    """
+    if not file and not object_name:
+        raise HTTPException(status_code=422, detail="Send either file or object_name")
+    title = rendering.fit_title("youtube", title) or "Untitled Video"
+    if object_name and not owns_object(str(user.id), object_name):
+        raise HTTPException(status_code=403, detail="Not authorized to use this media object")
+
+    # Get user's YouTube credentials (older ones have no is_active flag)
+    credentials = [
+        c for c in await db.query("youtube_credentials", filters=[("user_id", "==", str(user.id))])
+        if c.get("is_active", True) is not False
+    ]
     if not credentials:
         raise HTTPException(status_code=401, detail="YouTube credentials not found")
     
     credential = credentials[0]
     
-    # Upload to YouTube
-    async with httpx.AsyncClient() as client:
-        # Prepare the metadata part
-        metadata = {
-            "snippet": {
-                "title": title,
-                "description": description,
-                "categoryId": "22"  # People & Blogs category
-            },
-            "status": {
-                "privacyStatus": "private"
-            }
-        }
-        
-        # Prepare the multipart request
-        files = {
-            "file": ("video.mp4", open(path, "rb"), "video/mp4")
-        }
-        
-        data = {
-            "part": "snippet,status",
-            "uploadType": "multipart"
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {credential['access_token']}"
-        }
-        
-        # First, create the video with metadata
-        response = await client.post(
-            "https://www.googleapis.com/upload/youtube/v3/videos",
-            params=data,
-            headers=headers,
-            files=files,
-            data={"metadata": json.dumps(metadata)}
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Failed to upload to YouTube: {response.text}"
+    headers = {
+        "Authorization": f"Bearer {credential['access_token']}"
+    }
+
+    # The source has to outlive this request: bucket objects are read by the
+    # job directly, multipart bodies are copied off Starlette's spool first.
+    # The job closes it (`cleanup`) however it ends.
+    source_stack = AsyncExitStack()
+    try:
+        if object_name:
+            source, size = source_stack.enter_context(get_media_storage().open(object_name))
+            mimetype = mimetypes.guess_type(object_name)[0] or "video/mp4"
+        else:
+            path = await source_stack.enter_async_context(
+                media_budget.persisted_upload(file, jobs.scratch_path())
             )
-        
-        video_id = response.json()["id"]
-        
-        # Update the video with metadata to ensure it's set
-        update_response = await client.put(
-            f"https://www.googleapis.com/youtube/v3/videos?part=snippet,status",
-            headers=headers,
-            json={
-                "id": video_id,
-                "snippet": {
-                    "title": title,
-                    "description": description,
-                    "categoryId": "22"  # People & Blogs category
+            source, size = source_stack.enter_context(path.open("rb")), path.stat().st_size
+            mimetype = file.content_type or "video/mp4"
+    except MediaObjectNotFound:
+        await source_stack.aclose()
+        raise HTTPException(status_code=404, detail="Media object not found")
+    except MediaBudgetExceeded as exc:
+        await source_stack.aclose()
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+    except BaseException:
+        await source_stack.aclose()
+        raise
+
+    async def run(job: jobs.JobContext) -> dict:
+        async def on_progress(sent: int) -> None:
+            await job.progress(sent / size if size else 0.0, "uploading to YouTube")
+
+        # Stream the source into YouTube's resumable upload API
+        try:
+            video = await upload_stream(
+                credential["access_token"],
+                source,
+                size,
+                metadata={
+                    "snippet": {
+                        "title": title,
+                        "description": description,
+                        "categoryId": "22"  # People & Blogs category
+                    },
+                    "status": {
+                        "privacyStatus": "private"
+                    }
                 },
-                "status": {
-                    "privacyStatus": "public"
+                mimetype=mimetype,
+                on_progress=on_progress,
+            )
+        except httpx.HTTPStatusError as exc:
+            raise RuntimeError(f"Failed to upload to YouTube: {exc.response.text}")
+
+        video_id = video["id"]
+        await job.progress(1.0, "updating video metadata", force=True)
+
+        # Update the video with metadata to ensure it's set
+        async with httpx.AsyncClient() as client:
+            update_response = await client.put(
+                f"https://www.googleapis.com/youtube/v3/videos?part=snippet,status",
+                headers=headers,
+                json={
+                    "id": video_id,
+                    "snippet": {
+                        "title": title,
+                        "description": description,
+                        "categoryId": "22"  # People & Blogs category
+                    },
+                    "status": {
+                        "privacyStatus": "public"
+                    }
                 }
-            }
-        )
-        
+            )
+
         if update_response.status_code != 200:
             print(f"Warning: Failed to update video metadata: {update_response.text}")
-    
-    os.remove(path)
-    return {"video_id": video_id}
+
+        return {"video_id": video_id}
+
+    job_id = await jobs.submit(
+        db, str(user.id), "youtube_upload", run, {"title": title}, cleanup=source_stack.aclose
+    )
+    return jobs.accepted(job_id)
 
 # @router.post("/", response_model=YouTubeCredential)
 # async def create_youtube_credential(
@@ -256,6 +292,7 @@ async def update_youtube_credential(
     await db.update("youtube_credentials", user_id, update_data)
     
     updated_credential = await db.get("youtube_credentials", user_id)
+    await connections.record(db, str(current_user.id), "youtube", user_id, updated_credential)
     return updated_credential
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -272,4 +309,5 @@ async def delete_youtube_credential(
     if existing_credential["user_id"] != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized to delete this credential")
     
-    await db.delete("youtube_credentials", user_id)
\ No newline at end of file
+    await db.delete("youtube_credentials", user_id)
+    await connections.forget(db, str(current_user.id), "youtube", user_id)
\ No newline at end of file
@@ -52,6 +52,148 @@ class Settings(BaseSettings):
     youtube_client_secret: str = os.getenv("YOUTUBE_CLIENT_SECRET", "")
     youtube_callback_url: str = os.getenv("YOUTUBE_CALLBACK_URL", "")
 
+    # ----- Scheduler -----
+    # Facebook / YouTube posts due further out than this are handed to the
+    # platform's own scheduler as soon as the worker sees them.  Never less
+    # than dispatch_max_lead_minutes + 10: an early-started dispatch must not
+    # overlap a native post of the same schedule.
+    native_schedule_min_lead_minutes: int = Field(default=45)
+    native_schedule_max_lead_days: int = Field(default=28)
+    native_schedule_interval_seconds: int = Field(default=60)
+    # polling interval of the due check; schedules due before the next tick
+    # are started by a precise timer instead of waiting for it
+    scheduler_tick_seconds: int = Field(default=10)
+    # where the worker finds due schedules: "buckets" (due_buckets index,
+    # used once `rebuild-buckets` has built it; the query until then) or
+    # "query" (status + run_at)
+    due_index: str = os.getenv("DUE_INDEX", "buckets")
+    # due schedules are read oldest first in pages; at most due_max_per_tick
+    # are started per tick so a backlog drains over several ticks
+    due_page_size: int = Field(default=100)
+    due_max_per_tick: int = Field(default=200)
+    # candidates read per tick and shared fairly between tenants
+    # (app/services/fair_queue.py); keep it well above due_max_per_tick
+    due_scan_limit: int = Field(default=1000)
+    tenant_max_in_flight: int = Field(default=20)
+    # platform dispatches each tenant may start per round-robin turn
+    tenant_quantum: int = Field(default=4)
+
+    # ----- Scheduler coordination (several instances) -----
+    # schedules are split into this many shards across live instances;
+    # at most 30 (Firestore `in` limit), run `rebuild-buckets` after a change
+    scheduler_shards: int = Field(default=30)
+    # instances without a heartbeat for this long are considered gone
+    scheduler_member_ttl_seconds: int = Field(default=30)
+    scheduler_zone: str = os.getenv("SCHEDULER_ZONE", "")
+    # a dispatching instance holds the schedule this long
+    schedule_lease_minutes: int = Field(default=30)
+    # on SIGTERM in-flight dispatches get this long before being left
+    # resumable (Cloud Run allows 10 s)
+    scheduler_drain_seconds: int = Field(default=8)
+    # posts later than the grace: "publish_late", "skip" or "reschedule"
+    catch_up_policy: str = os.getenv("CATCH_UP_POLICY", "publish_late")
+    catch_up_grace_minutes: int = Field(default=15)
+    # slow posts start early by their learned duration (dispatch_stats) so
+    # they go live at run_at with this probability; never more than the max
+    dispatch_lead_percentile: float = Field(default=0.9)
+    dispatch_max_lead_minutes: int = Field(default=30)
+    dispatch_stats_min_samples: int = Field(default=20)
+    # schedules due further out than the next tick are looked at this often
+    # for an early start; the next tick's window is read every tick
+    dispatch_lead_scan_seconds: int = Field(default=60)
+
+    # dispatch lanes: worker count + byte budget per lane.  The budget caps
+    # the total media size of a lane's running units; that media sits in
+    # /tmp under media_disk_budget_mb (RAM-backed on Cloud Run), so a lane
+    # budget above it buys nothing.  Oversized videos that are streamed
+    # through hold the whole lane budget, i.e. run alone.
+    lane_light_workers: int = Field(default=8)
+    lane_light_memory_mb: int = Field(default=64)
+    lane_video_workers: int = Field(default=2)
+    lane_video_memory_mb: int = Field(default=384)
+    lane_poll_workers: int = Field(default=8)
+    lane_poll_memory_mb: int = Field(default=16)
+    # media up to this size is transferred in the light lane
+    lane_light_max_media_mb: int = Field(default=16)
+
+    # ----- Media transfer budget (per process, API and scheduler) -----
+    # /tmp is RAM-backed on Cloud Run: keep memory + disk below the limit
+    media_memory_budget_mb: int = Field(default=32)
+    media_disk_budget_mb: int = Field(default=384)
+    media_chunk_kb: int = Field(default=1024)
+    # assumed size of media whose Content-Length is unknown
+    media_unknown_size_mb: int = Field(default=256)
+
+    # ----- Resumable uploads -----
+    upload_dir: str = os.getenv("UPLOAD_DIR", "/tmp/uploads")
+    # "firestore" or "local" (JSON files under upload_dir, for tests)
+    upload_store_backend: str = os.getenv("UPLOAD_STORE_BACKEND", "firestore")
+    upload_session_ttl_hours: int = Field(default=24)
+    # expired sessions and their .part files are deleted at most this often
+    upload_sweep_interval_minutes: int = Field(default=15)
+
+    # ----- Media bucket (signed direct uploads) -----
+    # "gcs" or "local" (files under media_local_dir, for tests)
+    media_storage_backend: str = os.getenv("MEDIA_STORAGE_BACKEND", "gcs")
+    media_bucket: str = os.getenv("MEDIA_BUCKET", "")
+    media_local_dir: str = os.getenv("MEDIA_LOCAL_DIR", "/tmp/media")
+    media_public_base_url: str = os.getenv("MEDIA_PUBLIC_BASE_URL", "http://localhost:8000")
+    media_signed_url_minutes: int = Field(default=60)
+
+    # ----- Background jobs (202 + GET /jobs/{id}) -----
+    job_workers: int = Field(default=4)
+    # running jobs touch heartbeat_at this often; 3 missed beats = interrupted
+    job_heartbeat_seconds: int = Field(default=30)
+    fb_video_poll_seconds: int = Field(default=10)
+    fb_video_timeout_minutes: int = Field(default=30)
+
+    # ----- Live events (SSE) -----
+    # listen to Firestore so changes written by the scheduler service reach
+    # the API instances; off = only changes made in this process
+    events_firestore_bridge: bool = os.getenv("EVENTS_FIRESTORE_BRIDGE", "true").lower() == "true"
+    events_queue_size: int = Field(default=256)
+    events_keepalive_seconds: int = Field(default=15)
+    # the listeners are re-armed this often so their result sets stay small
+    events_listener_rearm_minutes: int = Field(default=30)
+
+    # ----- Incremental sync (?since=<cursor>) -----
+    sync_page_size: int = Field(default=500)
+    # cursors trail "now" by this much so writes committed late are not missed
+    sync_overlap_seconds: int = Field(default=10)
+    # deletions are remembered this long; older cursors must resync in full
+    sync_tombstone_ttl_days: int = Field(default=30)
+
+    # ----- Schedule search -----
+    schedule_page_size_default: int = Field(default=50)
+    schedule_page_size_max: int = Field(default=200)
+    schedule_bulk_max_items: int = Field(default=2000)
+
+    # ----- OAuth token refresh (scheduler) -----
+    token_refresh_interval_seconds: int = Field(default=300)
+    # YouTube access tokens live an hour; refresh this far ahead
+    youtube_refresh_margin_minutes: int = Field(default=15)
+    # Instagram long-lived tokens live 60 days; re-exchange this far ahead
+    instagram_refresh_margin_days: int = Field(default=10)
+    token_refresh_batch: int = Field(default=200)
+    token_refresh_concurrency: int = Field(default=8)
+    # a failed refresh is retried after this, doubling per failure up to the max
+    token_refresh_backoff_minutes: int = Field(default=5)
+    token_refresh_backoff_max_minutes: int = Field(default=360)
+
+    # ----- Credential health checks (scheduler) -----
+    credential_health_interval_minutes: int = Field(default=60)
+    credential_health_page_size: int = Field(default=300)
+    # Twitter / Google checks in flight; Graph goes 50 tokens per batch request
+    credential_health_concurrency: int = Field(default=8)
+
+    # ----- Ephemeral collections (Firestore TTL on expires_at) -----
+    video_upload_ttl_days: int = Field(default=7)
+    # TTL policies do not run on the emulator; sweep expired docs ourselves there
+    ephemeral_sweeper: bool = os.getenv(
+        "EPHEMERAL_SWEEPER", "true" if os.getenv("FIRESTORE_EMULATOR_HOST") else "false"
+    ).lower() == "true"
+    ephemeral_sweep_interval_minutes: int = Field(default=10)
+
     # ----- Google Cloud -----
     google_application_credentials: str = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'service_account.json'))
 
@@ -0,0 +1,88 @@
+"""
+Tiny in-process metrics registry rendered in Prometheus text format.
+
+    from app.core import metrics
+    metrics.gauge("media_budget_disk_bytes_available", "…").set(n)
+    metrics.counter("media_budget_rejected_total", "…").inc()
+
+`render()` is served on `/metrics` by both the API and the scheduler.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Tuple
+
+_lock = threading.Lock()
+_metrics: Dict[str, "_Metric"] = {}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str):
+        self.name = name
+        self.doc = doc
+        self._values: Dict[Labels, float] = {}
+
+    @staticmethod
+    def _key(labels: Dict[str, str] | None) -> Labels:
+        return tuple(sorted((labels or {}).items()))
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        for key, v in sorted(self._values.items()):
+            label_str = ",".join(f'{k}="{val}"' for k, val in key)
+            lines.append(f"{self.name}{{{label_str}}} {v}" if label_str else f"{self.name} {v}")
+        return "\n".join(lines)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, v: float, **labels: str) -> None:
+        with _lock:
+            self._values[self._key(labels)] = float(v)
+
+    def inc(self, v: float = 1, **labels: str) -> None:
+        with _lock:
+            k = self._key(labels)
+            self._values[k] = self._values.get(k, 0.0) + v
+
+    def dec(self, v: float = 1, **labels: str) -> None:
+        self.inc(-v, **labels)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, v: float = 1, **labels: str) -> None:
+        with _lock:
+            k = self._key(labels)
+            self._values[k] = self._values.get(k, 0.0) + v
+
+
+def _get(cls, name: str, doc: str):
+    with _lock:
+        m = _metrics.get(name)
+        if m is None:
+            m = _metrics[name] = cls(name, doc)
+        return m
+
+
+def gauge(name: str, doc: str = "") -> Gauge:
+    return _get(Gauge, name, doc)
+
+
+def counter(name: str, doc: str = "") -> Counter:
+    return _get(Counter, name, doc)
+
+
+def render() -> str:
+    with _lock:
+        items = list(_metrics.values())
+    return "\n".join(m.render() for m in items) + "\n"
@@ -1,20 +1,51 @@
 from contextlib import asynccontextmanager
+from datetime import datetime
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from app.scheduler_worker import process_due_schedules  # ← your loop
+from app.core import metrics
+from app.core.config import get_settings
+from app.models.firestore_db import FirestoreSession
+from app.scheduler_worker import (  # ← your loop
+    check_credentials,
+    drain,
+    process_due_schedules,
+    recover_abandoned,
+    refresh_tokens,
+    schedule_natively,
+    sweep_ephemeral,
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await recover_abandoned(FirestoreSession())
     sched = AsyncIOScheduler()
-    sched.add_job(process_due_schedules, "interval", seconds=10)
+    sched.add_job(process_due_schedules, "interval",
+                  seconds=get_settings().scheduler_tick_seconds)
+    sched.add_job(schedule_natively, "interval",
+                  seconds=get_settings().native_schedule_interval_seconds)
+    sched.add_job(refresh_tokens, "interval",
+                  seconds=get_settings().token_refresh_interval_seconds,
+                  next_run_time=datetime.now())
+    sched.add_job(check_credentials, "interval",
+                  minutes=get_settings().credential_health_interval_minutes)
+    if get_settings().ephemeral_sweeper:
+        sched.add_job(sweep_ephemeral, "interval",
+                      minutes=get_settings().ephemeral_sweep_interval_minutes)
     sched.start()                                  # starts in same event-loop :contentReference[oaicite:0]{index=0}
     print("✅ APScheduler started")
     yield
-    sched.shutdown(wait=False)
+    # uvicorn runs this on SIGTERM: finish or hand back in-flight dispatches
+    await drain(sched)
 
 app = FastAPI(lifespan=lifespan)                   # modern FastAPI lifespan API :contentReference[oaicite:1]{index=1}
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return metrics.render()
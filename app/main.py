@@ -11,13 +11,15 @@ load_dotenv(dotenv_path=dotenv_path)
 import json
 from sqlalchemy.future import select
 from fastapi import Request, Form, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, PlainTextResponse
 from typing import List, Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from app.api.v1 import router as api_v1_router
 from app.core.config import get_settings
+from app.core import metrics
+from app.services.media_budget import UploadAdmission
 from sqlalchemy import create_engine  # <-- sync engine
 from sqlmodel import SQLModel
 import logging
@@ -68,6 +70,8 @@ def create_app() -> FastAPI:
         }
     )
     print(f"****Loaded ALlowed Origins: {s.allow_origins}***")
+    # innermost: multipart bodies are admitted before they are spooled to /tmp
+    app.add_middleware(UploadAdmission)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=s.allow_origins or ["*"], allow_credentials=True,
@@ -84,6 +88,11 @@ def create_app() -> FastAPI:
     )
 
     app.include_router(api_v1_router, prefix="/api/v1")
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics_endpoint():
+        return metrics.render()
+
     return app
 
 app = create_app()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class Content(BaseModel):
@@ -21,3 +21,10 @@ class ContentUpdate(BaseModel):
     body_text: Optional[str] = None
     image_url: Optional[str] = None
     state: Optional[str] = None
+
+class ContentChanges(BaseModel):
+    """Response of `GET /content/?since=<cursor>`."""
+    changes: List[Content]
+    deleted: List[str] = Field(..., description="IDs deleted since the cursor")
+    cursor: str = Field(..., description="Pass as `since` next time")
+    has_more: bool = Field(..., description="Call again right away with `cursor`")
@@ -11,3 +11,4 @@ class ScheduleState(str, Enum):
     upcoming = "upcoming"
     published = "published"
     failed = "failed"
+    skipped = "skipped"      # overdue past the catch-up grace, not posted
@@ -1,7 +1,7 @@
 import firebase_admin
 from firebase_admin import credentials, firestore, auth, initialize_app
 from pathlib import Path
-from typing import AsyncGenerator, Any, Dict, Optional, Type, List, Tuple
+from typing import AsyncGenerator, Any, Dict, Optional, Type, List, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from fastapi import HTTPException, status
@@ -67,6 +67,17 @@ class FirestoreSession:
         doc_ref.set(data)
         return doc_ref.id
 
+    async def set(self, collection: str, doc_id: str, data: dict) -> str:
+        """Create or overwrite the document `doc_id` (records keyed by a natural ID)."""
+        data = self._serialize_datetime(data)
+
+        # Add timestamps
+        data["created_at"] = datetime.utcnow()
+        data["modified_at"] = datetime.utcnow()
+
+        self.db.collection(collection).document(doc_id).set(data)
+        return doc_id
+
     async def get(self, collection: str, doc_id: str) -> dict:
         doc_ref = self.db.collection(collection).document(doc_id)
         doc = doc_ref.get()
@@ -81,10 +92,16 @@ class FirestoreSession:
         self,
         collection: str,
         filters: List[Tuple[str, str, Any]] = [],
-        order_by: Optional[str] = None,
-        limit: Optional[int] = None
+        order_by: Optional[Union[str, List[str]]] = None,
+        limit: Optional[int] = None,
+        direction: str = "ASCENDING",
+        start_after: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
-        """Query documents in a collection."""
+        """
+        Query documents in a collection.  `order_by` may list several fields
+        ("__name__" = document ID); `start_after` maps those fields to the
+        values of the last document of the previous page.
+        """
         query = self.db.collection(collection)
         
         # Apply filters
@@ -93,7 +110,12 @@ class FirestoreSession:
         
         # Apply ordering
         if order_by:
-            query = query.order_by(order_by)
+            for field in [order_by] if isinstance(order_by, str) else order_by:
+                query = query.order_by(field, direction=direction)
+
+        # Resume after the previous page
+        if start_after:
+            query = query.start_after(start_after)
         
         # Apply limit
         if limit:
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Literal, Optional
+from datetime import datetime
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class Job(BaseModel):
+    """State of a background job."""
+    id: str = Field(..., description="Job ID")
+    user_id: str = Field(..., description="Owner of the job")
+    kind: str = Field(..., description="What the job does, e.g. youtube_upload")
+    status: JobStatus = "queued"
+    progress: float = Field(0.0, description="Fraction done, 0.0 – 1.0")
+    progress_message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = Field(None, description="Outcome once succeeded")
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobAccepted(BaseModel):
+    """Returned with 202 by endpoints that hand their work to a job."""
+    job_id: str
+    status: JobStatus = "queued"
+    status_url: str = Field(..., description="Poll this for progress and the result")
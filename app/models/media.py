@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from typing import Dict
+from datetime import datetime
+
+
+class MediaUploadRequest(BaseModel):
+    """Ask for a signed URL to upload one media file straight to the bucket."""
+    filename: str = Field(..., description="Original file name")
+    content_type: str = Field(..., description="MIME type the client will send")
+
+
+class MediaUploadTicket(BaseModel):
+    """Where and how to upload; pass `object_name` to the posting endpoints."""
+    object_name: str = Field(..., description="Bucket object the upload will create")
+    url: str = Field(..., description="Signed upload URL")
+    method: str = Field("PUT", description="HTTP method to use with `url`")
+    headers: Dict[str, str] = Field(default_factory=dict, description="Headers the upload must send")
+    expires_at: datetime = Field(..., description="When the signed URL stops working")
@@ -1,13 +1,11 @@
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List
 from uuid import UUID, uuid4
 
 from pydantic import validator
 from sqlmodel import SQLModel, Field, Column, JSON
-from zoneinfo import ZoneInfo
-
 from app.models.enums import Platform, ScheduleState
-from app.utils.datetime_utils import parse_run_at
+from app.utils.datetime_utils import get_zone, parse_run_at
 
 
 # ---------------------------------------------------------------------
@@ -53,7 +51,7 @@ class ScheduleCreate(SQLModel):
         if v.tzinfo is None:
             if not tz:
                 raise ValueError("Timezone missing for naïve datetime")
-            v = v.replace(tzinfo=ZoneInfo(tz))
+            v = v.replace(tzinfo=get_zone(tz))
         return v.astimezone(timezone.utc)
 
 
@@ -74,5 +72,43 @@ class ScheduleUpdate(SQLModel):
         if v.tzinfo is None:
             if not tz:
                 raise ValueError("Timezone missing for naïve datetime")
-            v = v.replace(tzinfo=ZoneInfo(tz))
+            v = v.replace(tzinfo=get_zone(tz))
         return v.astimezone(timezone.utc)
+
+
+class ScheduleChanges(SQLModel):
+    """Response of `GET /scheduler/?since=<cursor>`."""
+    changes: List[Schedule]
+    deleted: List[str]                    # IDs deleted since the cursor
+    cursor: str                           # pass as `since` next time
+    has_more: bool                        # call again right away with `cursor`
+
+
+# ---------------------------------------------------------------------
+#  Bulk operations
+# ---------------------------------------------------------------------
+class ScheduleBulkCreate(SQLModel):
+    # validated one by one as ScheduleCreate so a bad item fails alone
+    items: List[Dict[str, Any]]
+
+
+class ScheduleBulkStatus(SQLModel):
+    ids: List[str]
+    status: ScheduleState
+
+
+class ScheduleBulkDelete(SQLModel):
+    ids: List[str]
+
+
+class BulkItemResult(SQLModel):
+    index: int                            # position in the request
+    id: str | None = None                 # schedule ID (created / touched)
+    ok: bool
+    error: str | None = None
+
+
+class ScheduleBulkResult(SQLModel):
+    results: List[BulkItemResult]
+    succeeded: int
+    failed: int
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Literal, Optional
+from datetime import datetime
+
+UploadTarget = Literal["youtube", "facebook", "twitter"]
+
+
+class UploadCreate(BaseModel):
+    """Open a resumable upload session."""
+    filename: str = Field(..., description="Original file name")
+    content_type: str = Field("video/mp4", description="MIME type of the media")
+    length: int = Field(..., gt=0, description="Total size of the upload in bytes")
+    target: UploadTarget = Field(..., description="Platform the file is published to once complete")
+    params: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Posting fields for the target: title/description (YouTube), "
+                    "message (Facebook), text (Twitter)",
+    )
+
+
+class UploadSession(BaseModel):
+    """State of a resumable upload session."""
+    id: str = Field(..., description="Upload ID")
+    user_id: str = Field(..., description="Owner of the upload")
+    filename: str
+    content_type: str
+    length: int = Field(..., description="Total size in bytes")
+    offset: int = Field(0, description="Bytes received so far")
+    target: UploadTarget
+    params: Dict[str, Any] = Field(default_factory=dict)
+    status: Literal["uploading", "publishing", "published", "failed"] = "uploading"
+    result: Optional[Dict[str, Any]] = Field(None, description="Platform response once published")
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
@@ -2,11 +2,19 @@
 app/services/scheduler.py
 ------------------------
 
-• Runs every 10 s (APS-scheduler) and publishes any schedule whose
-  `run_at` ≤ now  AND  `status == "upcoming"`.
+• Runs every `scheduler_tick_seconds` (APS-scheduler) and publishes any
+  schedule whose `run_at` ≤ now  AND  `status == "upcoming"`, oldest
+  first and at most `due_max_per_tick` per tick, shared fairly between
+  tenants (app/services/fair_queue.py); long-overdue posts follow the
+  catch-up policy (app/services/catch_up.py).  Schedules due before the
+  next tick are started by a precise asyncio timer.
 
-• Extracts caption, call-to-action, hashtags, image / video URLs from the
-  nested structure:
+• Each platform of a schedule is dispatched through a lane
+  (app/services/dispatch_lanes.py): light text/image posts, heavy video
+  uploads and Meta status polling never queue behind each other.
+
+• Renders caption, call-to-action, hashtags (app/services/rendering.py)
+  and resolves image / video URLs from the nested structure:
 
     marketing_content[platform] = {
         "content": {
@@ -23,19 +31,33 @@ app/services/scheduler.py
 from __future__ import annotations
 
 import asyncio
-import os
-from datetime import datetime, timezone
+import signal
+from collections import Counter
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Set, Tuple
 
 import aiohttp
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+from app.core import metrics
 from app.models.enums import ScheduleState
 from app.models.firestore_db import FirestoreSession
+from app.core.config import get_settings
 from app.services.facebook_service import post_feed, post_photo, post_video
+from app.services import dispatch_lanes as lanes
+from app.services import (
+    calendar_counters, catch_up, coordination, credential_health, dispatch_stats, due_buckets,
+    ephemeral, events, fair_queue, connections, payloads, rendering, schedule_writes, token_refresh,
+)
+from app.services import media_budget
+from app.services.media_storage import resolve_media_url
+from app.services.native_scheduling import (
+    NATIVE_PLATFORMS, cancel_native, confirm_native, native_window, needs_native,
+)
 from app.services.twitter_service import post_tweet_for_user
-from app.services.youtube_service import upload_video_for_user
+from app.services.youtube_service import upload_video_for_user, upload_video_from_url
 
 
 # ────────────────────────────────────────────────────────────────────────
@@ -45,13 +67,34 @@ TMP_DIR = Path("/tmp")
 TMP_DIR.mkdir(exist_ok=True)
 
 
-async def download_file(url: str, dest: Path) -> Path:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                raise RuntimeError(f"Failed to download {url}: HTTP {resp.status}")
-            dest.write_bytes(await resp.read())
-            return dest
+@asynccontextmanager
+async def downloaded(url: str, dest: Path) -> AsyncIterator[Path]:
+    """
+    Stream `url` to `dest` under the media budget; the file and its budget
+    are released when the block exits.
+    """
+    size = await media_budget.content_length(url)
+    async with media_budget.reserve(size) as res:
+        try:
+            yield await media_budget.stream_url_to_file(url, dest, res)
+        finally:
+            dest.unlink(missing_ok=True)
+
+
+async def upload_youtube_video(cred: Dict[str, Any], url: str, dest: Path, **video: Any) -> str:
+    """
+    Upload the video at `url` to YouTube through the temp file `dest`, or –
+    if it is larger than the whole disk budget – straight from the source.
+    """
+    size = await media_budget.content_length(url)
+    if media_budget.exceeds_disk(size):
+        return await upload_video_from_url(cred, url, size, **video)
+    async with media_budget.reserve(size) as res:
+        try:
+            await media_budget.stream_url_to_file(url, dest, res)
+            return await upload_video_for_user(cred, str(dest), **video)
+        finally:
+            dest.unlink(missing_ok=True)
 
 
 async def post_to_instagram(
@@ -127,222 +170,847 @@ PLATFORM_ALIAS = {
     "x": "twitter",
 }  # extend if you have more aliases: e.g. "fb": "facebook"
 
+SUCCESS_PREFIXES = ("success", "text_success", "image_success", "video_success", "native_success")
+# the schedule was edited, retimed, cancelled or deleted while its dispatch waited
+SUPERSEDED = "superseded"
+
+
+def compose_message(platform: str, block: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    """Rendered text (app/services/rendering.py) + media refs for one marketing_content block."""
+    parts = rendering.render(platform, block)
+    print(f"\n*** {platform} message ({len(parts['message'])} chars): {parts['message']!r} ***")
+    return {
+        **parts,
+        # bucket objects resolve to short-lived signed URLs at dispatch time,
+        # and only those of the schedule's own user
+        "image_url": resolve_media_url(block, "image", user_id),
+        "video_url": resolve_media_url(block, "video", user_id),
+    }
+
+
+async def dispatch_platform(
+    db: FirestoreSession,
+    sched: Dict[str, Any],
+    platform: str,
+    parts: Dict[str, Any],
+    cred: Dict[str, Any],
+) -> str:
+    """Publish one platform of a schedule with `cred` and return its result string."""
+    sched_id: str = sched["id"]
+    message = parts["message"]
+    description = parts["description"]
+    img_url = parts["image_url"]
+    vid_url = parts["video_url"]
+
+    # ─── Facebook ───────────────────────────────────
+    if platform == "facebook":
+
+        if vid_url:
+            result_from_fb_video = await post_video(cred["page_id"], cred["access_token"], vid_url, description=message)
+            print(f"***Facebook video post result: {result_from_fb_video}***")
+            return "video_success"
+        elif img_url:
+            result_from_fb_img = await post_photo(cred["page_id"], cred["access_token"], img_url, caption=message)
+            print(f"***Facebook image post result: {result_from_fb_img}***")
+            return "image_success"
+        else:
+            result_from_fb_feed = await post_feed(cred["page_id"], cred["access_token"], message)
+            print(f"***Facebook feed post result: {result_from_fb_feed}***")
+            return "text_success"
+
+    # ─── Instagram ─────────────────────────────────
+    elif platform == "instagram":
+        result_from_post = await post_to_instagram(cred, img_url, vid_url, message)
+        print(f"***Instagram post result: {result_from_post}***")
+        return "success"
+
+    # ─── Twitter / X ───────────────────────────────
+    elif platform == "twitter":
+
+        async with AsyncExitStack() as stack:
+            media_paths: List[str] = []
+            if img_url:
+                tmp = TMP_DIR / f"{sched_id}_tw_image.jpg"
+                print(f"[DEBUG] Downloading Twitter image from {img_url} to {tmp}")
+                media_paths.append(str(await stack.enter_async_context(downloaded(img_url, tmp))))
+
+            result_from_tweet = await post_tweet_for_user(
+                cred["access_token"],
+                cred["access_token_secret"],
+                message,
+                media_paths or None,
+            )
+            print(f"***Twitter post result: {result_from_tweet}***")
+        return "success"
+
+    # ─── YouTube ───────────────────────────────────
+    elif platform == "youtube":
+        if not vid_url:
+            print(f"[DEBUG] YouTube post requires video_url")
+            return "no_video"
+
+        print(f"***Here's the message, {message}")
+        result_from_you = await upload_youtube_video(
+            cred,
+            vid_url,
+            TMP_DIR / f"{sched_id}_yt_video.mp4",
+            title=parts["title"],
+            desc=description,
+        )
+        print(f"***YouTube upload result: {result_from_you}***")
+        return "success"
+
+    # ─── Unknown platform ──────────────────────────
+    return "unsupported_platform"
+
+
+def _needs_product(sched: Dict[str, Any], platforms: List[str]) -> bool:
+    """True if some of `platforms` is neither native nor in the payload snapshot."""
+    native = sched.get("native") or {}
+    return any(
+        p not in native and not payloads.covers(sched.get("payload"), p)
+        for p in (PLATFORM_ALIAS.get(r, r) for r in platforms)
+    )
+
+
+def _parts(sched: Dict[str, Any], platform: str, mc_root: Dict[str, Any]) -> Dict[str, Any]:
+    """Parts from the schedule's payload snapshot, else rendered from the product."""
+    return (
+        payloads.parts_for(sched.get("payload"), platform, sched["user_id"])
+        or compose_message(platform, mc_root.get(platform, {}), sched["user_id"])
+    )
+
+
+def _size_bucket(platform: str, parts: Dict[str, Any], nbytes: int) -> str:
+    # tweets carry the image only, like their lane (dispatch_lanes.route)
+    video_url = None if platform == "twitter" else parts["video_url"]
+    return dispatch_stats.size_bucket(parts["image_url"], video_url, nbytes)
+
+
+async def _dispatch_in_lane(
+    db: FirestoreSession,
+    sched: Dict[str, Any],
+    raw_platform: str,
+    mc_root: Dict[str, Any],
+    conn: Dict[str, Any],
+) -> str:
+    platform = PLATFORM_ALIAS.get(raw_platform, raw_platform)
+    native: Dict[str, Any] = sched.get("native") or {}
+    try:
+        # ─── Natively scheduled on the platform ────────
+        if platform in native:
+            async with lanes.light.slot(0):
+                return await confirm_native(db, platform, native[platform])
+
+        cred = await connections.credential(db, conn, platform)
+        if cred is None:
+            return "no_credentials"
+        cred = await token_refresh.fresh(db, platform, cred)
+        parts = _parts(sched, platform, mc_root)
+        lane, nbytes = await lanes.route(platform, parts["image_url"], parts["video_url"])
+        bucket = _size_bucket(platform, parts, nbytes)
+
+        # the schedule starts as early as its slowest platform needs; the
+        # others wait for their own predicted start
+        ahead = dispatch_stats.predicted_duration(platform, bucket) or 0.0
+        wait = (sched["run_at"] - datetime.now(timezone.utc)).total_seconds() - ahead
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        started = datetime.now(timezone.utc)
+        print(f"*** {sched['id']}/{raw_platform} → {lane.name} lane ({nbytes} B) ***")
+        async with lane.slot(nbytes):
+            # the schedule may have changed during the wait for run_at / the lane
+            if not await coordination.current(db, sched):
+                return SUPERSEDED
+            outcome = await dispatch_platform(db, sched, platform, parts, cred)
+        if outcome.startswith(SUCCESS_PREFIXES):
+            await dispatch_stats.record(db, platform, bucket, started, sched["run_at"])
+        return outcome
+    except Exception as exc:
+        return f"error: {exc}"
+
+
+async def _dispatch_and_record(
+    db: FirestoreSession,
+    sched: Dict[str, Any],
+    raw_platform: str,
+    mc_root: Dict[str, Any],
+    conn: Dict[str, Any],
+) -> str:
+    """Dispatch one platform; a success is saved at once so a resumed dispatch skips it."""
+    outcome = await _dispatch_in_lane(db, sched, raw_platform, mc_root, conn)
+    if outcome.startswith(SUCCESS_PREFIXES):
+        try:
+            db.db.collection("schedules").document(sched["id"]).update(
+                {f"partial_results.{raw_platform}": outcome}
+            )
+        except Exception as exc:
+            print(f"[DEBUG] could not save {sched['id']}/{raw_platform} progress: {exc}")
+    return outcome
+
+
+async def dispatch_schedule(db: FirestoreSession, sched: Dict[str, Any]) -> None:
+    """
+    Publish every platform of one schedule, each through its own lane.
+    Platforms an interrupted earlier dispatch already published
+    (`partial_results`) are not posted again.  Platforms the user has no
+    active credential for (user_connections) fail as `no_credentials` or
+    `credential_invalid: …` up front; the product is read only for the
+    remaining platforms missing from the schedule's payload snapshot.
+
+    The lease is renewed for as long as the dispatch runs.  If the
+    schedule changes before a platform is posted, the rest is left to a
+    fresh dispatch of the schedule as it is now; the outcome is written
+    only if the schedule is unchanged (`coordination.unchanged`).
+    """
+    lease = asyncio.create_task(coordination.hold(db, sched["id"]))
+    try:
+        await _dispatch(db, sched)
+    finally:
+        lease.cancel()
+
+
+async def _finish(db: FirestoreSession, sched: Dict[str, Any], outcome: Dict[str, Any]) -> None:
+    def decide(current: Dict[str, Any] | None) -> Dict[str, Any] | None:
+        if not coordination.unchanged(sched, current):
+            return None
+        return {**outcome, "modified_at": datetime.utcnow()}
+
+    written = await schedule_writes.update(db, sched["id"], decide)
+    if written is None:
+        print(f"[scheduler] {sched['id']} changed during dispatch; outcome not written: {outcome.get('results')}")
+        await coordination.hand_back(db, sched["id"])
+        return
+    events.publish_schedule(sched["id"], written[1])
+
+
+async def _dispatch(db: FirestoreSession, sched: Dict[str, Any]) -> None:
+    product_id: str | None = sched.get("product_id")
+    done: Dict[str, str] = {
+        p: r for p, r in (sched.get("partial_results") or {}).items()
+        if p in sched["platforms"] and r.startswith(SUCCESS_PREFIXES)
+    }
+    pending = [p for p in sched["platforms"] if p not in done]
+    if done:
+        print(f"*** Resuming {sched['id']}: {sorted(done)} already published ***")
+    conn = await connections.get(db, sched["user_id"])
+    native = sched.get("native") or {}
+    unconnected: Dict[str, str] = {
+        p: reason for p in pending
+        if (alias := PLATFORM_ALIAS.get(p, p)) not in native
+        and alias in connections.CREDENTIAL_COLLECTIONS
+        and (reason := connections.unusable(conn, alias))
+    }
+    pending = [p for p in pending if p not in unconnected]
+    needs_product = _needs_product(sched, pending)
+
+    # 1️⃣  Pull the product document, unless the payload snapshot covers it
+    product: Dict[str, Any] | None = (
+        await db.get("products", product_id) if product_id and needs_product else None
+    )
+    if product is None and needs_product:
+        await _finish(db, sched, {
+            "status": ScheduleState.failed,
+            "results": {"error": "Product not found"},
+        })
+        return
+
+    mc_root = (product or {}).get("marketing_content", {})
+
+    # 2️⃣  Fan the requested platforms out to their lanes
+    outcomes = await asyncio.gather(
+        *(_dispatch_and_record(db, sched, p, mc_root, conn) for p in pending)
+    )
+    results: Dict[str, str] = {**done, **unconnected, **dict(zip(pending, outcomes))}
+
+    # 3️⃣  Persist status on the schedule document
+    if all(v.startswith(SUCCESS_PREFIXES) for v in results.values()):
+        new_state = ScheduleState.published
+    else:
+        new_state = ScheduleState.failed
+
+    await _finish(db, sched, {"status": new_state, "results": results})
+
+
+# schedule id → dispatch task; a schedule stays here until its status is
+# written, so a slow upload is never picked up a second time by a later tick.
+_in_flight: Dict[str, asyncio.Task] = {}
+# set on SIGTERM: ticks stop claiming new work
+_draining = False
+# user_id → schedules of that tenant in _in_flight
+_tenant_load: Counter = Counter()
+
+
+_backlog = metrics.gauge("scheduler_due_backlog", "Upcoming schedules whose run_at has passed")
+_oldest_overdue = metrics.gauge(
+    "scheduler_oldest_overdue_seconds", "Age of the oldest overdue upcoming schedule"
+)
+_tenants_waiting = metrics.gauge("scheduler_due_tenants", "Tenants with due schedules in the last tick")
+
+
+async def _query_pages(
+    db: FirestoreSession,
+    now: datetime,
+    page_size: int,
+    shards: Set[int],
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    last: Dict[str, Any] | None = None
+    while True:
+        page = await db.query(
+            "schedules",
+            filters=[("run_at", "<=", now), ("status", "==", ScheduleState.upcoming)],
+            order_by=["run_at", "__name__"],
+            start_after=last,
+            limit=page_size,
+        )
+        if not page:
+            return
+        yield [s for s in page if coordination.shard_of(s["id"]) in shards]
+        if len(page) < page_size:
+            return
+        last = {"run_at": page[-1]["run_at"], "__name__": page[-1]["id"]}
+
+
+def due_pages(
+    db: FirestoreSession,
+    now: datetime,
+    shards: Set[int],
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Upcoming schedules of `shards` whose run_at has passed, oldest first, a
+    page at a time.  Only the bucket index narrows the read to the shards;
+    it is used once it has been built.
+    """
+    page_size = get_settings().due_page_size
+    if get_settings().due_index == "buckets" and due_buckets.built(db):
+        return due_buckets.due_pages(db, now, page_size, shards)
+    return _query_pages(db, now, page_size, shards)
+
+
+async def _backlog_depth(db: FirestoreSession, now: datetime) -> int | None:
+    """Overdue upcoming schedules, via a count aggregation (no docs are read)."""
+    query = (
+        db.db.collection("schedules")
+        .where("status", "==", ScheduleState.upcoming.value)
+        .where("run_at", "<=", now)
+    )
+    try:
+        # the aggregation is a blocking RPC; keep it off the event loop
+        result = await asyncio.to_thread(query.count().get)
+        return int(result[0][0].value)
+    except Exception as exc:
+        print(f"[scheduler] backlog count failed: {exc}")
+        return None
+
+
+# (schedule id, modified_at) → seconds to start ahead of run_at
+_leads: Dict[Tuple[str, Any], float] = {}
+# schedules that start early, found by the last look beyond the next tick:
+# id → (start time, schedule); re-read every dispatch_lead_scan_seconds
+_early: Dict[str, Tuple[datetime, Dict[str, Any]]] = {}
+_early_scanned_at: datetime | None = None
+
+
+async def predicted_lead(db: FirestoreSession, sched: Dict[str, Any]) -> float:
+    """
+    Seconds before run_at to start `sched` so its slowest platform is
+    expected live on time (dispatch_stats, at dispatch_lead_percentile).
+    """
+    key = (sched["id"], sched.get("modified_at"))
+    if key in _leads:
+        return _leads[key]
+    if len(_leads) > 10_000:
+        _leads.clear()
+
+    lead = 0.0
+    try:
+        product_id = sched.get("product_id")
+        needed = product_id and _needs_product(sched, sched.get("platforms") or [])
+        product = await db.get("products", product_id) if needed else None
+        mc_root = (product or {}).get("marketing_content", {})
+        native = sched.get("native") or {}
+        for raw in sched.get("platforms") or []:
+            platform = PLATFORM_ALIAS.get(raw, raw)
+            if platform in native:
+                continue
+            parts = _parts(sched, platform, mc_root)
+            _, nbytes = await lanes.route(platform, parts["image_url"], parts["video_url"])
+            bucket = _size_bucket(platform, parts, nbytes)
+            lead = max(lead, dispatch_stats.predicted_duration(platform, bucket) or 0.0)
+    except Exception as exc:
+        print(f"[DEBUG] no lead estimate for {sched['id']}: {exc}")
+    lead = min(lead, get_settings().dispatch_max_lead_minutes * 60)
+    _leads[key] = lead
+    return lead
+
+
+# schedule id → timer task for schedules that start before the next tick
+_armed: Dict[str, asyncio.Task] = {}
+_armed_load: Counter = Counter()
+
+_timer_fired = metrics.counter(
+    "scheduler_timer_fired_total", "Dispatches started by a precise timer, by start accuracy"
+)
+_timer_error_sum = metrics.counter(
+    "scheduler_timer_error_seconds_sum", "Summed |actual − target| start time of timer dispatches"
+)
+
+
+def _accuracy(error: float) -> str:
+    for bound, label in ((0.1, "100ms"), (0.5, "500ms"), (1.0, "1s")):
+        if error <= bound:
+            return label
+    return "late"
+
+
+async def _fire(db: FirestoreSession, sched: Dict[str, Any], at: datetime) -> None:
+    await asyncio.sleep(max(0.0, (at - datetime.now(timezone.utc)).total_seconds()))
+    if _draining:
+        return
+    error = abs((datetime.now(timezone.utc) - at).total_seconds())
+    _timer_fired.inc(accuracy=_accuracy(error))
+    _timer_error_sum.inc(error)
+    _start(db, sched)
+
+
+def _arm(db: FirestoreSession, sched: Dict[str, Any], at: datetime) -> None:
+    """Start `sched` at `at` (leased already); later ticks leave it alone meanwhile."""
+    user_id = str(sched.get("user_id"))
+    task = asyncio.create_task(_fire(db, sched, at))
+    _armed[sched["id"]] = task
+    _armed_load[user_id] += 1
+
+    def _done(_t: asyncio.Task, sid: str = sched["id"]) -> None:
+        _armed.pop(sid, None)
+        _armed_load[user_id] -= 1
+        if _armed_load[user_id] <= 0:
+            del _armed_load[user_id]
+
+    task.add_done_callback(_done)
+
+
+def _start(db: FirestoreSession, sched: Dict[str, Any]) -> None:
+    user_id = str(sched.get("user_id"))
+    task = asyncio.create_task(dispatch_schedule(db, sched))
+    _in_flight[sched["id"]] = task
+    _tenant_load[user_id] += 1
+
+    def _done(_t: asyncio.Task, sid: str = sched["id"]) -> None:
+        _in_flight.pop(sid, None)
+        _tenant_load[user_id] -= 1
+        if _tenant_load[user_id] <= 0:
+            del _tenant_load[user_id]
+
+    task.add_done_callback(_done)
+
 
 async def process_due_schedules() -> None:
+    if _draining:
+        return
     db = FirestoreSession()
     now = datetime.now(timezone.utc)
+    settings = get_settings()
     print(f"\n*** Checking due schedules at {now.isoformat()} ***")
 
-    due: List[Dict[str, Any]] = await db.query(
-        "schedules",
-        filters=[("run_at", "<=", now), ("status", "==", ScheduleState.upcoming)],
+    # 1️⃣  Read the oldest due schedules of our shards, up to the scan limit.
+    #     Slow posts (video) are started their predicted duration early;
+    #     those starting before the next tick get a precise timer.  Only
+    #     the next tick's window is read every tick; further out (up to the
+    #     longest predicted duration) every dispatch_lead_scan_seconds.
+    global _early_scanned_at
+    shards = await coordination.owned_shards(db, now)
+    await dispatch_stats.refresh(db)
+    seen = 0
+    oldest: datetime | None = None
+    candidates: List[Dict[str, Any]] = []
+    upcoming: List[Dict[str, Any]] = []
+    starts: Dict[str, datetime] = {}
+    # one second of slack for a late next tick
+    arm_until = now + timedelta(seconds=settings.scheduler_tick_seconds + 1)
+    lookahead = min(dispatch_stats.longest_duration(), settings.dispatch_max_lead_minutes * 60)
+    horizon = now + timedelta(seconds=lookahead)
+    scan_early = horizon > arm_until and (
+        _early_scanned_at is None
+        or (now - _early_scanned_at).total_seconds() >= settings.dispatch_lead_scan_seconds
+    )
+    if scan_early:
+        _early.clear()
+        _early_scanned_at = now
+
+    def consider(sched: Dict[str, Any], start_at: datetime) -> None:
+        nonlocal seen, oldest
+        if start_at > now:
+            if start_at <= arm_until and sched["id"] not in _in_flight:
+                upcoming.append(sched)
+                starts[sched["id"]] = start_at
+            elif start_at > arm_until and scan_early:
+                _early[sched["id"]] = (start_at, sched)
+            return
+        seen += 1
+        oldest = oldest or sched["run_at"]
+        if sched["id"] in _in_flight:
+            return
+        user_id = str(sched.get("user_id"))
+        if catch_up.action_for(sched, now) == "dispatch":
+            # more than a tenant can start is left unread, so one tenant's
+            # backlog cannot fill the scan limit ahead of everyone else
+            if _tenant_load[user_id] + scanned[user_id] >= settings.tenant_max_in_flight:
+                return
+            scanned[user_id] += 1
+        candidates.append(sched)
+
+    scanned: Counter = Counter()
+    read: Set[str] = set()
+    pages = due_pages(db, horizon if scan_early else arm_until, shards)
+    try:
+        async for page in pages:
+            for sched in page:
+                read.add(sched["id"])
+                if sched["id"] in _armed:
+                    continue
+                start_at = sched["run_at"]
+                if start_at > now:
+                    start_at -= timedelta(seconds=await predicted_lead(db, sched))
+                consider(sched, start_at)
+            if len(candidates) >= settings.due_scan_limit:
+                break
+    finally:
+        await pages.aclose()
+    # early starts found by an earlier scan whose time has come
+    for sid, (start_at, sched) in list(_early.items()):
+        if start_at <= arm_until:
+            del _early[sid]
+            if sid not in read and sid not in _armed:
+                consider(sched, start_at)
+
+    # 2️⃣  Long-overdue ones follow the catch-up policy
+    dispatchable: List[Dict[str, Any]] = []
+    for sched in candidates[:settings.due_scan_limit]:
+        action = catch_up.action_for(sched, now)
+        if action == "dispatch":
+            dispatchable.append(sched)
+        else:
+            await catch_up.apply(db, sched, action, now)
+
+    # 3️⃣  Start a fair share per tenant; the tick never waits for an upload
+    picked = fair_queue.pick(
+        dispatchable,
+        _tenant_load,
+        per_tenant=settings.tenant_max_in_flight,
+        limit=settings.due_max_per_tick,
+        quantum=settings.tenant_quantum,
     )
-    print(f"*** Found {len(due)} schedule(s) ***")
+    # another instance may still hold a schedule while ownership moves
+    leased = await asyncio.gather(*(coordination.claim(db, s["id"], now) for s in picked))
+    started = [sched for sched, ok in zip(picked, leased) if ok]
+    if _draining:
+        await asyncio.gather(*(coordination.release(db, s["id"], "draining") for s in started))
+        return
+    for sched in started:
+        _start(db, sched)
 
-    for sched in due:
-        user_id: str = sched["user_id"]
-        product_id: str | None = sched.get("product_id")
+    # 4️⃣  Arm timers for what starts before the next tick, fairly as well
+    to_arm = fair_queue.pick(
+        upcoming,
+        _tenant_load + _armed_load,
+        per_tenant=settings.tenant_max_in_flight,
+        limit=settings.due_max_per_tick,
+        quantum=settings.tenant_quantum,
+    )
+    leased = await asyncio.gather(*(coordination.claim(db, s["id"], now) for s in to_arm))
+    armed = [sched for sched, ok in zip(to_arm, leased) if ok]
+    for sched in armed:
+        _arm(db, sched, starts[sched["id"]])
+
+    depth = await _backlog_depth(db, now)
+    if depth is not None:
+        _backlog.set(depth)
+    _oldest_overdue.set(max(0.0, (now - oldest).total_seconds()) if oldest else 0)
+    _tenants_waiting.set(len({str(s.get("user_id")) for s in dispatchable}))
+    print(
+        f"*** {len(shards)} shard(s): read {seen} due schedule(s), "
+        f"started {len(started)} of {len(dispatchable)} "
+        f"(cap {settings.due_max_per_tick}), armed {len(armed)}, "
+        f"{len(_in_flight)} in flight, backlog {depth} ***"
+    )
 
-        # 1️⃣  Pull the product document
-        product: Dict[str, Any] | None = (
-            await db.get("products", product_id) if product_id else None
+
+# ────────────────────────────────────────────────────────────────────────
+#  Native platform scheduling
+# ────────────────────────────────────────────────────────────────────────
+async def _push_native(
+    db: FirestoreSession,
+    sched: Dict[str, Any],
+    platform: str,
+    parts: Dict[str, Any],
+    conn: Dict[str, Any],
+) -> Dict[str, Any] | None:
+    """Create the post on the platform with a publish time of `run_at`."""
+    run_at: datetime = sched["run_at"]
+    cred = await connections.credential(db, conn, platform)
+    if cred is None:
+        return None
+    cred = await token_refresh.fresh(db, platform, cred)
+
+    message, vid_url, img_url = parts["message"], parts["video_url"], parts["image_url"]
+
+    if platform == "facebook":
+        if vid_url:
+            object_id = await post_video(cred["page_id"], cred["access_token"], vid_url,
+                                         description=message, publish_at=run_at)
+        elif img_url:
+            object_id = await post_photo(cred["page_id"], cred["access_token"], img_url,
+                                         caption=message, publish_at=run_at)
+        else:
+            object_id = await post_feed(cred["page_id"], cred["access_token"], message,
+                                        publish_at=run_at)
+    else:
+        if not vid_url:
+            return None  # leave it to the regular path, which records "no_video"
+        object_id = await upload_youtube_video(
+            cred, vid_url, TMP_DIR / f"{sched['id']}_yt_native.mp4", title=parts["title"],
+            desc=parts["description"], publish_at=run_at,
         )
+
+    return {
+        "id": object_id,
+        "credential_id": cred["id"],
+        "publish_at": run_at,
+        "scheduled_at": datetime.now(timezone.utc),
+    }
+
+
+# transient failures before a platform is left to the regular dispatch
+NATIVE_ATTEMPTS = 5
+
+
+def _permanent(exc: Exception) -> bool:
+    """True if the platform refused the post itself; network, auth and rate errors are worth a retry."""
+    resp = getattr(exc, "response", None) or getattr(exc, "resp", None)
+    code = getattr(resp, "status_code", None) or getattr(resp, "status", None) or getattr(exc, "status", None)
+    return isinstance(code, int) and 400 <= code < 500 and code not in (401, 408, 429)
+
+
+async def _push_pending(db: FirestoreSession, sched: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Push the platforms `sched` still needs natively; returns (doc updates, pushed entries)."""
+    native = sched.get("native") or {}
+    pending = [
+        p for p in (PLATFORM_ALIAS.get(r, r) for r in sched.get("platforms", []))
+        if p in NATIVE_PLATFORMS and p not in native
+        and p not in (sched.get("native_skipped") or [])
+    ]
+    updates: Dict[str, Any] = {}
+    pushed: Dict[str, Any] = {}
+    skipped: List[str] = []
+    if not pending:
+        return updates, pushed
+
+    # the regular dispatch records no_credentials / a missing product at run_at
+    conn = await connections.get(db, sched["user_id"])
+    skipped += [p for p in pending if not connections.credential_id(conn, p)]
+    pending = [p for p in pending if p not in skipped]
+    product_id = sched.get("product_id")
+    product = None
+    if pending and _needs_product(sched, pending):
+        product = await db.get("products", product_id) if product_id else None
         if product is None:
-            await db.update(
-                "schedules",
-                sched["id"],
-                {
-                    "status": ScheduleState.failed,
-                    "results": {"error": "Product not found"},
-                },
-            )
+            skipped += pending
+            pending = []
+    mc_root = (product or {}).get("marketing_content", {})
+
+    attempts: Dict[str, int] = sched.get("native_attempts") or {}
+    for platform in pending:
+        try:
+            entry = await _push_native(db, sched, platform, _parts(sched, platform, mc_root), conn)
+        except Exception as exc:
+            tries = attempts.get(platform, 0) + 1
+            if _permanent(exc) or tries >= NATIVE_ATTEMPTS:
+                print(f"[native] {sched['id']} {platform} not scheduled natively: {exc}")
+                skipped.append(platform)
+            else:
+                print(f"[native] {sched['id']} {platform} failed (attempt {tries}), retrying: {exc}")
+                updates[f"native_attempts.{platform}"] = tries
             continue
+        if entry is None:
+            skipped.append(platform)
+        else:
+            pushed[platform] = entry
+            updates[f"native.{platform}"] = entry
+            print(f"[native] {sched['id']} {platform} scheduled as {entry['id']}")
+
+    if skipped:
+        updates["native_skipped"] = sorted({*(sched.get("native_skipped") or []), *skipped})
+    return updates, pushed
+
+
+async def _schedule_one_natively(db: FirestoreSession, sched: Dict[str, Any]) -> None:
+    # a dispatch of this schedule is running, armed, or held by another instance
+    if sched["id"] in _in_flight or sched["id"] in _armed:
+        return
+    if not await coordination.claim(db, sched["id"], datetime.now(timezone.utc)):
+        return
+
+    lease = asyncio.create_task(coordination.hold(db, sched["id"]))
+    try:
+        updates, pushed = await _push_pending(db, sched)
+    except Exception:
+        lease.cancel()
+        await coordination.hand_back(db, sched["id"])
+        raise
+    lease.cancel()
+
+    def decide(current: Dict[str, Any] | None) -> Dict[str, Any] | None:
+        if not coordination.unchanged(sched, current):
+            return None
+        return {
+            **updates,
+            "native_pending": needs_native(schedule_writes.merged(current, updates)),
+            "lease_expires_at": datetime.now(timezone.utc),
+            "modified_at": datetime.utcnow(),
+        }
 
-        mc_root = product.get("marketing_content", {})
-        # youtube_video_url = product.get("video_url")
-        # print(f"\n*** Processing video URL: {youtube_video_url} ***\n")
-        results: Dict[str, str] = {}
+    if await schedule_writes.update(db, sched["id"], decide) is None:
+        # edited, cancelled or deleted meanwhile: the platform must not publish the old post
+        print(f"[native] {sched['id']} changed while scheduling natively; withdrawing {sorted(pushed)}")
+        await cancel_native(db, {"native": pushed})
+        await coordination.hand_back(db, sched["id"])
 
-        # 2️⃣  Iterate over each requested platform
-        for raw_platform in sched["platforms"]:
-            platform = PLATFORM_ALIAS.get(raw_platform, raw_platform)
+
+async def schedule_natively() -> None:
+    """
+    Hand Facebook / YouTube posts that are far enough ahead to the platform's
+    own scheduler.  `process_due_schedules` then only confirms them at run_at.
+    A platform that cannot be scheduled natively (no credential, no video,
+    post refused) is recorded in `native_skipped` and dispatched at run_at
+    instead; one that failed transiently is tried again next round, up to
+    NATIVE_ATTEMPTS times (`native_attempts`).
+
+    Only schedules flagged `native_pending` are read.  Each is leased while
+    its posts are pushed, and the result is written only if the schedule is
+    unchanged; otherwise the pushed posts are withdrawn again.
+    """
+    if _draining:
+        return
+    db = FirestoreSession()
+    lo, hi = native_window(datetime.now(timezone.utc))
+    candidates: List[Dict[str, Any]] = await db.query(
+        "schedules",
+        filters=[
+            ("native_pending", "==", True),
+            ("status", "==", ScheduleState.upcoming),
+            ("run_at", ">=", lo),
+            ("run_at", "<=", hi),
+        ],
+    )
+
+    for sched in candidates:
+        try:
+            await _schedule_one_natively(db, sched)
+        except Exception as exc:
+            print(f"[native] {sched['id']} not scheduled natively this round: {exc}")
+
+
+# ────────────────────────────────────────────────────────────────────────
+#  Drain on shutdown / recover on startup
+# ────────────────────────────────────────────────────────────────────────
+TEMP_PATTERNS = ("*_tw_image.jpg", "*_yt_video.mp4", "*_yt_native.mp4")
+
+
+def sweep_temp_files(schedule_ids: Set[str] | None = None, older_than: timedelta | None = None) -> int:
+    """Remove dispatch downloads of `schedule_ids` (or all) not touched for `older_than`."""
+    removed = 0
+    cutoff = datetime.now().timestamp() - older_than.total_seconds() if older_than else None
+    for pattern in TEMP_PATTERNS:
+        for path in TMP_DIR.glob(pattern):
+            if schedule_ids is not None and path.name.rsplit("_", 2)[0] not in schedule_ids:
+                continue
             try:
-                block = mc_root.get(platform, {})
-                content = block.get("content", {})
-                
-                cta = content.get("call_to_action", "") or ""
-                caption = content.get("caption", "") or ""
-                description = content.get("description", "") or ""
-                text = content.get("text", "") or ""
-                if len(content.get("hashtags", [])) > 0:
-                    hashtags = content.get("hashtags", [])
-                elif len(content.get("tags", [])) > 0:
-                    hashtags = content.get("tags", [])
-                else:
-                    hashtags = []
-                if isinstance(hashtags, str):
-                    hashtags = hashtags.split()
-                hashtags_str = " ".join(hashtags)
-                
-                print(f"\n*** Processing platform: {platform} ***\n")
-                print(f"*** Caption: {caption} ***")
-                print(f"*** Call to Action: {cta} ***")
-                print(f"*** Hashtags: {hashtags_str} ***")
-                print(f"*** Text: {text} ***")
-                print(f"*** Description: {description} ***")
-                img_url = block.get("image_url")
-                vid_url = block.get("video_url")
-
-                message = f"{caption}\n\n{hashtags_str}".strip()
-                print(f"*** Initial message: {message} ***")
-                if platform == "twitter" or platform == "x" or platform == "facebook":
-                    # Twitter/X has a 280 char limit, truncate if needed
-                    message = ""
-                    message = f"{caption}\n\n{text}\n\n{hashtags_str}".strip()
-                if platform == "youtube":
-                    message = ""
-                    message = f"{caption}\n\n{cta}\n\n{hashtags_str}".strip()
-
-                # ─── Facebook ───────────────────────────────────
-                if platform == "facebook":
-                    creds = await db.query(
-                        "facebook_credentials",
-                        filters=[("user_id", "==", user_id), ("is_active", "==", True)],
-                    )
-                    if not creds:
-                        results[raw_platform] = "no_credentials"
-                        continue
-                    cred = creds[0]
-
-                    if vid_url:
-                        result_from_fb_video = await post_video(cred["page_id"], cred["access_token"], vid_url, description=message)
-                        print(f"***Facebook video post result: {result_from_fb_video}***")
-                        results[raw_platform] = "video_success"
-                    elif img_url:
-                        result_from_fb_img = await post_photo(cred["page_id"], cred["access_token"], img_url, caption=message)
-                        print(f"***Facebook image post result: {result_from_fb_img}***")
-                        results[raw_platform] = "image_success"
-                    else:
-                        result_from_fb_feed = await post_feed(cred["page_id"], cred["access_token"], message)
-                        print(f"***Facebook feed post result: {result_from_fb_feed}***")
-                        results[raw_platform] = "text_success"
-
-                # ─── Instagram ─────────────────────────────────
-                elif platform == "instagram":
-                    
-                    creds = await db.query(
-                        "instagram_credentials",
-                        filters=[("user_id", "==", user_id), ("is_active", "==", True)],
-                    )
-                    if not creds:
-                        results[raw_platform] = "no_credentials"
-                        continue
-                    cred = creds[0]
-                    result_from_post = await post_to_instagram(cred, img_url, vid_url, message)
-                    print(f"***Instagram post result: {result_from_post}***")
-                    results[raw_platform] = "success"
-
-                # ─── Twitter / X ───────────────────────────────
-                elif platform == "twitter":
-                    creds = await db.query(
-                        "twitter_credentials",
-                        filters=[("user_id", "==", user_id), ("is_active", "==", True)],
-                    )
-                    print(f"[DEBUG] Twitter creds for user {user_id}: {creds}")
-                    if not creds:
-                        results[raw_platform] = "no_credentials"
-                        continue
-                    cred = creds[0]
-
-                    media_paths: List[str] = []
-                    if img_url:
-                        tmp = TMP_DIR / f"{product_id}_tw_image.jpg"
-                        print(f"[DEBUG] Downloading Twitter image from {img_url} to {tmp}")
-                        await download_file(img_url, tmp)
-                        media_paths.append(str(tmp))
-
-                    print(f"[DEBUG] Twitter post payload: access_token={cred['access_token'][:6]}..., "
-                        f"access_token_secret={cred['access_token_secret'][:6]}..., "
-                        f"message='{message}', media_paths={media_paths or None}")
-
-                    result_from_tweet = await post_tweet_for_user(
-                        cred["access_token"],
-                        cred["access_token_secret"],
-                        message,
-                        media_paths or None,
-                    )
-                    print(f"***Twitter post result: {result_from_tweet}***")
-                    for p in media_paths:
-                        try:
-                            os.remove(p)
-                            print(f"[DEBUG] Removed temp file {p}")
-                        except FileNotFoundError:
-                            print(f"[DEBUG] Temp file {p} not found for removal")
-
-                    results[raw_platform] = "success"
-
-                # ─── YouTube ───────────────────────────────────
-                elif platform == "youtube":
-                    creds = await db.query(
-                        "youtube_credentials", filters=[("user_id", "==", user_id)]
-                    )
-                    if not creds:
-                        print(f"[DEBUG] No YouTube credentials found for user {user_id}")
-                        results[raw_platform] = "no_credentials"
-                        continue
-                    cred = creds[0]
-                    if not vid_url:
-                        print(f"[DEBUG] YouTube post requires video_url")
-                        results[raw_platform] = "no_video"
-                        continue
-                    
-                    if vid_url:
-                        # YouTube titles must be <= 100 chars and on a single line.
-                        title = " ".join(message.splitlines()).strip()
-                        if len(title) > 100:
-                            title = title[:97] + "..."
-                        if not title:
-                            title = "Untitled Video"
-
-                        tmp_vid = TMP_DIR / f"{product_id}_yt_video.mp4"
-                        await download_file(vid_url, tmp_vid)
-                        print(f"***Here's the message, {message} \n\n[DEBUG] Downloaded YouTube video to {tmp_vid}")
-                        result_from_you = await upload_video_for_user(
-                            cred,
-                            str(tmp_vid),
-                            title=title,
-                            desc=description,
-                        )
-                        print(f"***YouTube upload result: {result_from_you}***")
-                        os.remove(tmp_vid)
-                        results[raw_platform] = "success"
-                    elif img_url:
-                        print(f"[DEBUG] Skipping YouTube upload: image uploads are not supported.")
-                        results[raw_platform] = "image_not_supported"
-                    else:
-                        print(f"[DEBUG] YouTube post requires video_url")
-                        results[raw_platform] = "no_video_or_image"
-                        continue
-
-                # ─── Unknown platform ──────────────────────────
-                else:
-                    results[raw_platform] = "unsupported_platform"
+                if cutoff is None or path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
 
-            except Exception as exc:
-                results[raw_platform] = f"error: {exc}"
 
-        # 3️⃣  Persist status on the schedule document
-        if all(v.startswith(("success", "text_success", "image_success", "video_success"))
-               for v in results.values()):
-            new_state = ScheduleState.published
-        else:
-            new_state = ScheduleState.failed
+async def drain(scheduler: AsyncIOScheduler | None = None) -> None:
+    """
+    Shutdown protocol: stop claiming, give in-flight dispatches
+    `scheduler_drain_seconds` to finish, then cancel the rest and release
+    their leases so any instance resumes them right away.  Platforms they
+    already published are kept in `partial_results` and are not re-posted.
+    """
+    global _draining
+    _draining = True
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
+    db = FirestoreSession()
 
-        await db.update(
-            "schedules",
-            sched["id"],
-            {"status": new_state, "results": results},
-        )
+    # timers that have not fired yet: nothing started, just hand them back
+    timers = dict(_armed)
+    for task in timers.values():
+        task.cancel()
+    await asyncio.gather(*timers.values(), return_exceptions=True)
+    await asyncio.gather(*(coordination.release(db, sid, "drained before start") for sid in timers))
+
+    tasks = dict(_in_flight)
+    if tasks:
+        timeout = get_settings().scheduler_drain_seconds
+        print(f"*** Draining {len(tasks)} dispatch(es), {timeout}s deadline ***")
+        await asyncio.wait(tasks.values(), timeout=timeout)
+
+    unfinished = {sid for sid, task in tasks.items() if not task.done()}
+    for sid in unfinished:
+        tasks[sid].cancel()
+    # cancelled uploads unwind their `downloaded()` blocks here
+    await asyncio.gather(*(tasks[sid] for sid in unfinished), return_exceptions=True)
+    await asyncio.gather(*(coordination.release(db, sid, "drained") for sid in unfinished))
+
+    removed = sweep_temp_files(set(tasks))
+    await dispatch_stats.flush(db, force=True)
+    await coordination.leave(db)
+    print(
+        f"*** Drained: {len(tasks) - len(unfinished)} finished, "
+        f"{len(unfinished)} left resumable, {removed} temp file(s) removed ***"
+    )
+
+
+async def recover_abandoned(db: FirestoreSession) -> int:
+    """
+    Release leases held by instances that are gone without draining, so
+    their schedules are dispatched again (resuming after the platforms
+    already published).  Returns the number of schedules released.
+    """
+    now = datetime.now(timezone.utc)
+    live = {*await coordination.live_members(db, now), coordination.MEMBER_ID}
+    leased = await db.query(
+        "schedules",
+        filters=[("status", "==", ScheduleState.upcoming), ("lease_expires_at", ">", now)],
+    )
+    abandoned = [s for s in leased if s.get("lease_owner") not in live]
+    for sched in abandoned:
+        await coordination.release(db, sched["id"], f"owner {sched.get('lease_owner')} gone")
+
+    # downloads older than any live lease belong to no running dispatch
+    removed = sweep_temp_files(older_than=timedelta(minutes=get_settings().schedule_lease_minutes))
+    print(f"*** Recovered {len(abandoned)} abandoned schedule(s), removed {removed} temp file(s) ***")
+    return len(abandoned)
+
+
+async def refresh_tokens() -> None:
+    """Renew OAuth tokens before they expire (app/services/token_refresh.py)."""
+    await token_refresh.refresh_due(FirestoreSession())
+
+
+async def check_credentials() -> None:
+    """Deactivate revoked credentials (app/services/credential_health.py)."""
+    await credential_health.check_all(FirestoreSession())
+
+
+async def sweep_ephemeral() -> None:
+    """Delete expired ephemeral docs where Firestore TTL does not run (app/services/ephemeral.py)."""
+    await ephemeral.sweep(FirestoreSession())
 
 
 # ────────────────────────────────────────────────────────────────────────
@@ -366,16 +1034,38 @@ async def migrate_run_at_to_timestamp() -> None:
 #  Entry-point
 # ────────────────────────────────────────────────────────────────────────
 async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await recover_abandoned(FirestoreSession())
+
     scheduler = AsyncIOScheduler()
-    scheduler.add_job(process_due_schedules, "interval", seconds=10)
+    scheduler.add_job(process_due_schedules, "interval", seconds=get_settings().scheduler_tick_seconds)
+    scheduler.add_job(
+        schedule_natively, "interval",
+        seconds=get_settings().native_schedule_interval_seconds,
+    )
+    scheduler.add_job(
+        refresh_tokens, "interval",
+        seconds=get_settings().token_refresh_interval_seconds,
+        next_run_time=datetime.now(),
+    )
+    scheduler.add_job(
+        check_credentials, "interval",
+        minutes=get_settings().credential_health_interval_minutes,
+    )
+    if get_settings().ephemeral_sweeper:
+        scheduler.add_job(
+            sweep_ephemeral, "interval",
+            minutes=get_settings().ephemeral_sweep_interval_minutes,
+        )
     scheduler.start()
 
     print("🚀 Scheduler started — press Ctrl-C to stop.")
-    try:
-        while True:
-            await asyncio.sleep(3600)
-    except (KeyboardInterrupt, SystemExit):
-        pass
+    await stop.wait()
+    await drain(scheduler)
 
 
 if __name__ == "__main__":
@@ -383,5 +1073,13 @@ if __name__ == "__main__":
 
     if len(sys.argv) > 1 and sys.argv[1] == "migrate":
         asyncio.run(migrate_run_at_to_timestamp())
+    elif len(sys.argv) > 1 and sys.argv[1] == "rebuild-buckets":
+        indexed = asyncio.run(due_buckets.rebuild(FirestoreSession()))
+        print(f"Indexed {indexed} upcoming schedule(s) in due_buckets.")
+    elif len(sys.argv) > 1 and sys.argv[1] == "lateness-report":
+        print(asyncio.run(dispatch_stats.report(FirestoreSession())))
+    elif len(sys.argv) > 1 and sys.argv[1] == "rebuild-calendar":
+        written = asyncio.run(calendar_counters.rebuild(FirestoreSession()))
+        print(f"Rebuilt {written} calendar day doc(s).")
     else:
         asyncio.run(main())
@@ -0,0 +1,186 @@
+"""
+Per-day schedule counters for the calendar view
+-----------------------------------------------
+
+One doc per user and UTC day in `schedule_calendar`
+(`<user_id>_<yyyymmdd>`), with quarter-hour slots:
+
+    slots.0915.total              = 3
+    slots.0915.platforms.youtube  = 1
+    slots.0915.status.upcoming    = 2
+
+Every schedule write applies the difference between the old and new
+version as `firestore.Increment`s (`ops`), in the same transaction that
+re-reads the schedule (schedule_writes.py), so concurrent writers never
+lose counts and never count from a stale copy.  Quarter hours line up with every UTC offset in use, so a
+month in any timezone is assembled from ~32 UTC-day docs
+(`calendar_days`).
+
+The counters are derived data: `rebuild` recomputes them from the
+schedules (`python -m app.scheduler_worker rebuild-calendar`).
+"""
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from zoneinfo import ZoneInfo
+
+from google.cloud import firestore
+
+from app.models.firestore_db import FirestoreSession
+
+COLLECTION = "schedule_calendar"
+SLOT_MINUTES = 15
+# Firestore batches are limited to 500 writes
+BATCH_SIZE = 500
+
+
+def _value(v: Any) -> Any:
+    return getattr(v, "value", v)
+
+
+def doc_id(user_id: str, day: date) -> str:
+    return f"{user_id}_{day:%Y%m%d}"
+
+
+def _contribution(sched: Dict[str, Any]) -> Tuple[Tuple[str, date], Dict[str, int]] | None:
+    run_at = sched.get("run_at")
+    if not isinstance(run_at, datetime) or not sched.get("user_id"):
+        return None
+    run_at = run_at.astimezone(timezone.utc)
+    slot = f"slots.{run_at.hour:02d}{run_at.minute // SLOT_MINUTES * SLOT_MINUTES:02d}"
+    counts = {f"{slot}.total": 1, f"{slot}.status.{_value(sched.get('status'))}": 1}
+    for platform in sched.get("platforms") or []:
+        counts[f"{slot}.platforms.{_value(platform)}"] = 1
+    return (str(sched["user_id"]), run_at.date()), counts
+
+
+def _nested(counts: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for path, value in counts.items():
+        node = out
+        *parents, leaf = path.split(".")
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = value
+    return out
+
+
+def _writes(
+    db: FirestoreSession,
+    changes: Iterable[Tuple[Dict[str, Any] | None, Dict[str, Any] | None]],
+) -> List[Tuple[Any, Dict[str, Any]]]:
+    deltas: Dict[Tuple[str, date], Counter] = defaultdict(Counter)
+    for before, after in changes:
+        for sched, sign in ((before, -1), (after, 1)):
+            contribution = _contribution(sched) if sched else None
+            if contribution:
+                key, counts = contribution
+                deltas[key].update({path: sign * n for path, n in counts.items()})
+
+    writes = []
+    for (user_id, day), counts in deltas.items():
+        increments = {path: firestore.Increment(n) for path, n in counts.items() if n}
+        if increments:
+            ref = db.db.collection(COLLECTION).document(doc_id(user_id, day))
+            writes.append((ref, {"user_id": user_id, "day": day.isoformat(), **_nested(increments)}))
+    return writes
+
+
+def ops(
+    db: FirestoreSession,
+    before: Dict[str, Any] | None,
+    after: Dict[str, Any] | None,
+) -> List[Callable[[Any], None]]:
+    """Writes moving one schedule's counts from `before` to `after`, for its own batch or transaction."""
+    return [
+        lambda w, ref=ref, data=data: w.set(ref, data, merge=True)
+        for ref, data in _writes(db, [(before, after)])
+    ]
+
+
+async def record_changes(
+    db: FirestoreSession,
+    changes: Iterable[Tuple[Dict[str, Any] | None, Dict[str, Any] | None]],
+) -> None:
+    """Apply the count changes of many schedule writes at once (bulk writes)."""
+    writes = _writes(db, changes)
+    try:
+        for i in range(0, len(writes), BATCH_SIZE):
+            batch = db.db.batch()
+            for ref, data in writes[i:i + BATCH_SIZE]:
+                batch.set(ref, data, merge=True)
+            batch.commit()
+    except Exception as exc:
+        # counters are derived data: never fail the schedule write over them
+        print(f"[calendar] counter update failed, run rebuild-calendar: {exc}")
+
+
+async def calendar_days(
+    db: FirestoreSession,
+    user_id: str,
+    start: date,
+    end: date,
+    tz: ZoneInfo,
+) -> List[Dict[str, Any]]:
+    """Totals per local day in [start, end] for the timezone `tz`."""
+    first_utc = datetime.combine(start, time.min, tz).astimezone(timezone.utc).date()
+    last_utc = datetime.combine(end, time.max, tz).astimezone(timezone.utc).date()
+    refs = [
+        db.db.collection(COLLECTION).document(doc_id(user_id, first_utc + timedelta(days=n)))
+        for n in range((last_utc - first_utc).days + 1)
+    ]
+
+    days = {
+        start + timedelta(days=n): {"total": 0, "platforms": Counter(), "status": Counter()}
+        for n in range((end - start).days + 1)
+    }
+    for snap in db.db.get_all(refs):
+        if not snap.exists:
+            continue
+        utc_day = datetime.strptime(snap.id.rsplit("_", 1)[1], "%Y%m%d").date()
+        for slot, counts in (snap.to_dict().get("slots") or {}).items():
+            at = datetime.combine(utc_day, time(int(slot[:2]), int(slot[2:])), timezone.utc)
+            local = days.get(at.astimezone(tz).date())
+            if local is None:
+                continue
+            local["total"] += counts.get("total", 0)
+            local["platforms"].update(counts.get("platforms") or {})
+            local["status"].update(counts.get("status") or {})
+
+    return [
+        {
+            "date": day.isoformat(),
+            "total": agg["total"],
+            "platforms": {k: v for k, v in agg["platforms"].items() if v},
+            "status": {k: v for k, v in agg["status"].items() if v},
+        }
+        for day, agg in sorted(days.items())
+    ]
+
+
+async def rebuild(db: FirestoreSession) -> int:
+    """Recompute every counter doc from the schedules; returns docs written."""
+    stale = [snap.reference for snap in db.db.collection(COLLECTION).stream()]
+    for i in range(0, len(stale), BATCH_SIZE):
+        batch = db.db.batch()
+        for ref in stale[i:i + BATCH_SIZE]:
+            batch.delete(ref)
+        batch.commit()
+
+    totals: Dict[Tuple[str, date], Counter] = defaultdict(Counter)
+    for sched in await db.query("schedules", filters=[]):
+        contribution = _contribution(sched)
+        if contribution:
+            key, counts = contribution
+            totals[key].update(counts)
+
+    items = list(totals.items())
+    for i in range(0, len(items), BATCH_SIZE):
+        batch = db.db.batch()
+        for (user_id, day), counts in items[i:i + BATCH_SIZE]:
+            ref = db.db.collection(COLLECTION).document(doc_id(user_id, day))
+            batch.set(ref, {"user_id": user_id, "day": day.isoformat(), **_nested(dict(counts))})
+        batch.commit()
+    return len(items)
@@ -0,0 +1,98 @@
+"""
+Catch-up policy for overdue schedules
+-------------------------------------
+
+After a deploy or an outage the worker finds schedules whose run_at is
+well in the past.  Anything later than `catch_up_grace_minutes` is
+handled according to `CATCH_UP_POLICY`:
+
+    publish_late  – dispatch it now, as if it were on time (default)
+    skip          – mark it `skipped`; nothing is posted
+    reschedule    – move run_at to the next occurrence of the same local
+                    wall-clock time (the schedule's own timezone)
+
+Schedules already handed to a platform's own scheduler (`native`) were
+published by the platform on time, so they are always dispatched, which
+only confirms them.  So are interrupted dispatches that already published
+some platforms (`partial_results`): they are finished, not abandoned.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.models.enums import ScheduleState
+from app.models.firestore_db import FirestoreSession
+from app.services import coordination, events, schedule_writes
+from app.utils.datetime_utils import get_zone
+
+POLICIES = ("publish_late", "skip", "reschedule")
+
+_actions = metrics.counter("scheduler_catch_up_total", "Overdue schedules handled by the catch-up policy")
+
+
+def _value(v: Any) -> Any:
+    return getattr(v, "value", v)
+
+
+def action_for(sched: Dict[str, Any], now: datetime) -> str:
+    """"dispatch", "skip" or "reschedule" for one due schedule."""
+    settings = get_settings()
+    policy = settings.catch_up_policy
+    if policy not in POLICIES:
+        print(f"[catch_up] unknown CATCH_UP_POLICY {policy!r}, publishing late")
+        policy = "publish_late"
+    if policy == "publish_late" or sched.get("native") or sched.get("partial_results"):
+        return "dispatch"
+    if now - sched["run_at"] <= timedelta(minutes=settings.catch_up_grace_minutes):
+        return "dispatch"
+    return policy
+
+
+def next_occurrence(sched: Dict[str, Any], now: datetime) -> datetime:
+    """First time after `now` with the same local wall-clock time as run_at."""
+    try:
+        tz = get_zone(sched.get("timezone") or "UTC")
+    except Exception:
+        tz = timezone.utc
+    local = sched["run_at"].astimezone(tz)
+    candidate = datetime.combine(now.astimezone(tz).date(), local.time(), tz)
+    if candidate <= now:
+        candidate = datetime.combine(candidate.date() + timedelta(days=1), local.time(), tz)
+    return candidate.astimezone(timezone.utc)
+
+
+async def apply(db: FirestoreSession, sched: Dict[str, Any], action: str, now: datetime) -> None:
+    """Record a skip or a reschedule on the schedule doc and its derived data."""
+    late_minutes = int((now - sched["run_at"]).total_seconds() // 60)
+    if action == "skip":
+        changes: Dict[str, Any] = {
+            "status": ScheduleState.skipped,
+            "results": {"skipped": f"overdue by {late_minutes} min"},
+        }
+    else:
+        changes = {
+            "run_at": next_occurrence(sched, now),
+            "rescheduled_from": sched["run_at"],
+        }
+
+    def decide(current: Dict[str, Any] | None) -> Dict[str, Any] | None:
+        # the doc may have been edited, dispatched or leased since it was read
+        if (
+            current is None
+            or _value(current.get("status")) != ScheduleState.upcoming.value
+            or current.get("run_at") != sched["run_at"]
+            or coordination.leased_elsewhere(current, now)
+        ):
+            return None
+        return {**changes, "modified_at": datetime.utcnow()}
+
+    written = await schedule_writes.update(db, sched["id"], decide)
+    if written is None:
+        print(f"[catch_up] {sched['id']} changed before {action}; left as it is")
+        return
+    events.publish_schedule(sched["id"], written[1])
+    _actions.inc(action=action)
+    print(f"[catch_up] {sched['id']} overdue by {late_minutes} min → {action}")
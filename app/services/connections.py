@@ -0,0 +1,156 @@
+"""
+Per-user connection document
+----------------------------
+
+Which platforms a user can post to, and with which credential, in one
+point read instead of a query per credential collection:
+
+    user_connections/{uid} = {
+        "user_id": uid,
+        "platforms": {
+            "facebook": {
+                "credential_id": "abc",            # the one posts go through
+                "credentials": {
+                    "abc": {"is_active": True, "account": "My Page",
+                            "expires_at": None, "updated_at": <ts>},
+                },
+            },
+        },
+        "updated_at": <ts>,
+    }
+
+The OAuth callbacks and the credential update / delete endpoints keep it
+in sync (`record`, `forget`).  If that write fails the document is
+deleted instead, and if that fails too the error reaches the caller, so
+the document is never left silently out of date.  `credential_id` is the
+first active credential by ID, the one the per-collection queries used to
+return.  A user without the document (new, or dropped as above) gets it
+rebuilt from the credential collections on the next read.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from google.cloud import firestore
+
+from app.models.firestore_db import FirestoreSession
+
+COLLECTION = "user_connections"
+
+CREDENTIAL_COLLECTIONS = {
+    "facebook": "facebook_credentials",
+    "instagram": "instagram_credentials",
+    "twitter": "twitter_credentials",
+    "youtube": "youtube_credentials",
+}
+
+
+def _meta(cred: Dict[str, Any]) -> Dict[str, Any]:
+    """Token metadata kept for one credential (never the tokens themselves)."""
+    # older YouTube credentials have no is_active flag; they are active while they exist
+    active = cred.get("is_active", True) is not False
+    return {
+        "is_active": active,
+        "inactive_reason": None if active else cred.get("inactive_reason"),
+        "account": cred.get("page_name") or cred.get("account_name") or cred.get("username"),
+        "expires_at": cred.get("expires_at") or cred.get("token_expires_at"),
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+def _default(credentials: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    return next((cid for cid in sorted(credentials) if credentials[cid].get("is_active")), None)
+
+
+def _entry(credentials: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {"credential_id": _default(credentials), "credentials": credentials}
+
+
+def _change(db: FirestoreSession, user_id: str, platform: str, cred_id: str, meta: Dict[str, Any] | None) -> None:
+    ref = db.db.collection(COLLECTION).document(user_id)
+
+    @firestore.transactional
+    def run(transaction: Any) -> None:
+        snap = ref.get(transaction=transaction)
+        doc = (snap.to_dict() or {}) if snap.exists else {}
+        platforms = doc.get("platforms") or {}
+        credentials = dict((platforms.get(platform) or {}).get("credentials") or {})
+        if meta is None:
+            credentials.pop(cred_id, None)
+        else:
+            credentials[cred_id] = meta
+        platforms[platform] = _entry(credentials)
+        transaction.set(ref, {
+            "user_id": user_id,
+            "platforms": platforms,
+            "updated_at": datetime.now(timezone.utc),
+        })
+
+    run(db.db.transaction())
+
+
+async def _apply(db: FirestoreSession, user_id: str, platform: str, cred_id: str, meta: Dict[str, Any] | None) -> None:
+    try:
+        await asyncio.to_thread(_change, db, user_id, platform, cred_id, meta)
+    except Exception as exc:
+        print(f"[connections] could not update {platform}/{cred_id} for {user_id}, dropping the document: {exc}")
+        # the next read rebuilds it from the credential collections; raises if this fails too
+        await asyncio.to_thread(db.db.collection(COLLECTION).document(user_id).delete)
+
+
+async def record(db: FirestoreSession, user_id: str, platform: str, cred_id: str, cred: Dict[str, Any]) -> None:
+    """A credential of `platform` was connected or changed."""
+    await _apply(db, user_id, platform, cred_id, _meta(cred))
+
+
+async def forget(db: FirestoreSession, user_id: str, platform: str, cred_id: str) -> None:
+    """A credential of `platform` was deleted."""
+    await _apply(db, user_id, platform, cred_id, None)
+
+
+async def rebuild(db: FirestoreSession, user_id: str) -> Dict[str, Any]:
+    """The connection document recomputed from the credential collections."""
+    platforms: Dict[str, Any] = {}
+    for platform, collection in CREDENTIAL_COLLECTIONS.items():
+        creds = await db.query(collection, filters=[("user_id", "==", user_id)])
+        platforms[platform] = _entry({c["id"]: _meta(c) for c in creds})
+    doc = {"user_id": user_id, "platforms": platforms, "updated_at": datetime.now(timezone.utc)}
+    db.db.collection(COLLECTION).document(user_id).set(doc)
+    return doc
+
+
+async def get(db: FirestoreSession, user_id: str) -> Dict[str, Any]:
+    """The user's connection document, rebuilt if it does not exist yet."""
+    doc = await db.get(COLLECTION, user_id)
+    return doc if doc is not None else await rebuild(db, user_id)
+
+
+def credential_id(doc: Dict[str, Any], platform: str) -> Optional[str]:
+    """ID of the active credential posts to `platform` go through, or None."""
+    return ((doc.get("platforms") or {}).get(platform) or {}).get("credential_id")
+
+
+def unusable(doc: Dict[str, Any], platform: str) -> Optional[str]:
+    """None if posts to `platform` have a credential, else the result string to record."""
+    if credential_id(doc, platform):
+        return None
+    credentials = ((doc.get("platforms") or {}).get(platform) or {}).get("credentials") or {}
+    reasons = [m["inactive_reason"] for m in credentials.values() if m.get("inactive_reason")]
+    return f"credential_invalid: {reasons[0]}" if reasons else "no_credentials"
+
+
+async def credential(db: FirestoreSession, doc: Dict[str, Any], platform: str) -> Optional[Dict[str, Any]]:
+    """The active credential for `platform` from a connection document, or None."""
+    cred_id = credential_id(doc, platform)
+    if not cred_id or platform not in CREDENTIAL_COLLECTIONS:
+        return None
+    cred = await db.get(CREDENTIAL_COLLECTIONS[platform], cred_id)
+    if not cred:
+        # deleted behind our back; drop it so the next read is right
+        await forget(db, doc.get("user_id"), platform, cred_id)
+        return None
+    if cred.get("user_id") != doc.get("user_id") or cred.get("is_active") is False:
+        return None
+    return cred
@@ -0,0 +1,256 @@
+"""
+Several scheduler instances, one owner per schedule
+---------------------------------------------------
+
+Membership
+    Every instance upserts `scheduler_members/{member_id}` with
+    `heartbeat_at` at the start of each tick; members whose heartbeat is
+    older than `scheduler_member_ttl_seconds` are gone.  An instance that
+    shuts down deletes its doc (`leave`) so the others take over on their
+    next tick.
+
+Shards
+    Schedules fall into `scheduler_shards` shards by a hash of their ID.
+    Shards are placed on a consistent-hash ring of the live members (with
+    virtual nodes), so a join or leave only moves the shards next to that
+    member.  Ownership is recomputed every tick; the worker reads only the
+    due buckets of its own shards.
+
+Leases
+    Two members can briefly both own a shard while their views of the
+    membership differ.  Before dispatching, a member takes a lease on the
+    schedule in a transaction (`lease_owner`, `lease_expires_at`); a
+    schedule leased by another live lease is left alone.  A lease ends
+    when it expires or is released (`release`) by a draining instance or
+    on behalf of one that is gone.  A dispatch may start well before
+    run_at and run long, so its lease is renewed while it runs (`hold`).
+
+    The schedule dict a dispatch started with may go stale while it waits
+    for run_at.  `current` re-reads it before each platform post and the
+    outcome is written in a transaction that checks `unchanged`; both give
+    up when the schedule was edited, retimed, cancelled or deleted since
+    (status, run_at, modified_at) or the lease passed to another instance,
+    and a changed schedule is handed back (`hand_back`).
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Set
+
+from google.cloud import firestore
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.models.enums import ScheduleState
+from app.models.firestore_db import FirestoreSession
+
+COLLECTION = "scheduler_members"
+# ring points per member; more = more even split
+VNODES = 64
+
+MEMBER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+_started_at = datetime.now(timezone.utc)
+_owned: Set[int] | None = None
+
+_members_gauge = metrics.gauge("scheduler_members", "Live scheduler instances")
+_shards_gauge = metrics.gauge("scheduler_owned_shards", "Shards owned by this scheduler instance")
+_lease_conflicts = metrics.counter(
+    "scheduler_lease_conflicts_total", "Schedules skipped because another instance holds the lease"
+)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+def shard_count() -> int:
+    return max(1, get_settings().scheduler_shards)
+
+
+def shard_of(schedule_id: str) -> int:
+    return _hash(schedule_id) % shard_count()
+
+
+def assign(members: List[str], member: str, shards: int) -> Set[int]:
+    """Shards `member` owns on the ring of `members`."""
+    ring = sorted((_hash(f"{m}#{v}"), m) for m in set(members) for v in range(VNODES))
+    if not ring:
+        return set()
+    points = [point for point, _ in ring]
+    owned: Set[int] = set()
+    for shard in range(shards):
+        i = bisect.bisect_left(points, _hash(f"shard-{shard}")) % len(ring)
+        if ring[i][1] == member:
+            owned.add(shard)
+    return owned
+
+
+async def live_members(db: FirestoreSession, now: datetime) -> Set[str]:
+    cutoff = now - timedelta(seconds=get_settings().scheduler_member_ttl_seconds)
+    query = db.db.collection(COLLECTION).where("heartbeat_at", ">=", cutoff)
+    return {snap.id for snap in query.stream()}
+
+
+async def owned_shards(db: FirestoreSession, now: datetime) -> Set[int]:
+    """Heartbeat, then this instance's shards for the current membership."""
+    global _owned
+    settings = get_settings()
+    coll = db.db.collection(COLLECTION)
+    try:
+        coll.document(MEMBER_ID).set({
+            "member_id": MEMBER_ID,
+            "zone": settings.scheduler_zone,
+            "started_at": _started_at,
+            "heartbeat_at": now,
+        })
+        members = await live_members(db, now)
+    except Exception as exc:
+        # keep the last known shards rather than stall or double-dispatch
+        print(f"[coordination] membership check failed: {exc}")
+        return _owned if _owned is not None else set(range(shard_count()))
+
+    members = sorted({*members, MEMBER_ID})
+    owned = assign(members, MEMBER_ID, shard_count())
+    if owned != _owned:
+        print(f"[coordination] {MEMBER_ID}: {len(members)} member(s), owning shards {sorted(owned)}")
+    _owned = owned
+    _members_gauge.set(len(members))
+    _shards_gauge.set(len(owned))
+    return owned
+
+
+async def leave(db: FirestoreSession) -> None:
+    """Drop out of the membership so the others pick up our shards right away."""
+    try:
+        db.db.collection(COLLECTION).document(MEMBER_ID).delete()
+    except Exception as exc:
+        print(f"[coordination] leave failed: {exc}")
+
+
+def leased_elsewhere(doc: Dict[str, Any], now: datetime) -> bool:
+    """True while another instance holds a live lease on the schedule `doc`."""
+    owner, expires = doc.get("lease_owner"), doc.get("lease_expires_at")
+    return bool(owner and owner != MEMBER_ID and expires and expires > now)
+
+
+def _claim(db: FirestoreSession, schedule_id: str, now: datetime) -> bool:
+    ref = db.db.collection("schedules").document(schedule_id)
+    until = now + timedelta(minutes=get_settings().schedule_lease_minutes)
+
+    @firestore.transactional
+    def run(transaction: Any) -> bool:
+        snap = ref.get(transaction=transaction)
+        if not snap.exists:
+            return False
+        doc = snap.to_dict()
+        if getattr(doc.get("status"), "value", doc.get("status")) != ScheduleState.upcoming.value:
+            return False
+        if leased_elsewhere(doc, now):
+            return False
+        transaction.update(ref, {"lease_owner": MEMBER_ID, "lease_expires_at": until})
+        return True
+
+    return run(db.db.transaction())
+
+
+async def release(db: FirestoreSession, schedule_id: str, reason: str) -> None:
+    """End the lease on a schedule that was not finished, so any instance can resume it."""
+    now = datetime.now(timezone.utc)
+    try:
+        db.db.collection("schedules").document(schedule_id).update({
+            "lease_expires_at": now,
+            "interrupted": {"at": now, "by": MEMBER_ID, "reason": reason},
+        })
+    except Exception as exc:
+        print(f"[coordination] releasing {schedule_id} failed: {exc}")
+
+
+def _status(doc: Dict[str, Any]) -> Any:
+    return getattr(doc.get("status"), "value", doc.get("status"))
+
+
+def unchanged(sched: Dict[str, Any], doc: Dict[str, Any] | None) -> bool:
+    """`doc` is still the upcoming schedule `sched` was read as, leased by us."""
+    return (
+        doc is not None
+        and _status(doc) == ScheduleState.upcoming.value
+        and doc.get("run_at") == sched.get("run_at")
+        and doc.get("modified_at") == sched.get("modified_at")
+        and doc.get("lease_owner") == MEMBER_ID
+    )
+
+
+async def current(db: FirestoreSession, sched: Dict[str, Any]) -> bool:
+    """False if the schedule changed since `sched` was read; its dispatch must stop."""
+    try:
+        doc = await db.get("schedules", sched["id"])
+    except Exception as exc:
+        print(f"[coordination] re-reading {sched['id']} failed: {exc}")
+        return False
+    return unchanged(sched, doc)
+
+
+def _hand_back(db: FirestoreSession, schedule_id: str) -> None:
+    ref = db.db.collection("schedules").document(schedule_id)
+
+    @firestore.transactional
+    def run(transaction: Any) -> None:
+        snap = ref.get(transaction=transaction)
+        if snap.exists and (snap.to_dict() or {}).get("lease_owner") == MEMBER_ID:
+            transaction.update(ref, {"lease_expires_at": datetime.now(timezone.utc)})
+
+    run(db.db.transaction())
+
+
+async def hand_back(db: FirestoreSession, schedule_id: str) -> None:
+    """End our lease on a schedule that changed under us, so it is dispatched as it is now."""
+    try:
+        await asyncio.to_thread(_hand_back, db, schedule_id)
+    except Exception as exc:
+        print(f"[coordination] handing back {schedule_id} failed: {exc}")
+
+
+def _renew(db: FirestoreSession, schedule_id: str) -> bool:
+    ref = db.db.collection("schedules").document(schedule_id)
+    until = datetime.now(timezone.utc) + timedelta(minutes=get_settings().schedule_lease_minutes)
+
+    @firestore.transactional
+    def run(transaction: Any) -> bool:
+        snap = ref.get(transaction=transaction)
+        if not snap.exists or (snap.to_dict() or {}).get("lease_owner") != MEMBER_ID:
+            return False
+        transaction.update(ref, {"lease_expires_at": until})
+        return True
+
+    return run(db.db.transaction())
+
+
+async def hold(db: FirestoreSession, schedule_id: str) -> None:
+    """Renew our lease on a schedule every third of its length until cancelled or lost."""
+    interval = get_settings().schedule_lease_minutes * 60 / 3
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await asyncio.to_thread(_renew, db, schedule_id):
+                print(f"[coordination] lease on {schedule_id} lost")
+                return
+        except Exception as exc:
+            print(f"[coordination] renewing lease on {schedule_id} failed: {exc}")
+
+
+async def claim(db: FirestoreSession, schedule_id: str, now: datetime) -> bool:
+    """Lease one schedule for dispatch by this instance."""
+    try:
+        leased = await asyncio.to_thread(_claim, db, schedule_id, now)
+    except Exception as exc:
+        print(f"[coordination] lease on {schedule_id} failed: {exc}")
+        return False
+    if not leased:
+        _lease_conflicts.inc()
+    return leased
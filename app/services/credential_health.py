@@ -0,0 +1,182 @@
+"""
+Credential health checks
+------------------------
+
+Revoked or expired credentials are found by a periodic job instead of by
+a failed post:
+
+    facebook, instagram   Graph `debug_token`, 50 tokens per batch request
+    twitter               `users/me` with the user's token
+    youtube               Google `tokeninfo`; a dead access token is
+                          refreshed, a rejected refresh token is dead
+
+A credential the platform rejects is marked `is_active=False` with
+`inactive_reason` / `inactive_at`, and user_connections is updated, so
+the scheduler records `credential_invalid: <reason>` up front without a
+dispatch or a platform call.  Network errors and rate limits prove
+nothing and leave the credential as it is.  Reconnecting through OAuth
+makes it active again.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from urllib.parse import quote
+
+import httpx
+import tweepy
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.models.firestore_db import FirestoreSession
+from app.services import connections, token_refresh
+from app.services.twitter_service import get_client_for_user
+
+GRAPH_URL = "https://graph.facebook.com/v23.0"
+GOOGLE_TOKENINFO_URL = "https://oauth2.googleapis.com/tokeninfo"
+# Graph API limit on requests per batch call
+GRAPH_BATCH = 50
+
+_checked = metrics.counter("credential_health_total", "Credential health checks, by platform and outcome")
+
+# credential id → None (valid) or the reason it is dead; unknowns are left out
+Verdicts = Dict[str, str | None]
+
+
+async def _active(db: FirestoreSession, platform: str) -> List[Dict[str, Any]]:
+    """All active credentials of `platform`, a page at a time."""
+    collection = connections.CREDENTIAL_COLLECTIONS[platform]
+    page_size = get_settings().credential_health_page_size
+    # older YouTube credentials have no is_active flag, so filter here
+    filters = [] if platform == "youtube" else [("is_active", "==", True)]
+    creds: List[Dict[str, Any]] = []
+    last: Dict[str, Any] | None = None
+    while True:
+        page = await db.query(collection, filters=filters, order_by="__name__", start_after=last, limit=page_size)
+        creds += [c for c in page if c.get("is_active", True) is not False]
+        if len(page) < page_size:
+            return creds
+        last = {"__name__": page[-1]["id"]}
+
+
+async def _graph(creds: List[Dict[str, Any]]) -> Verdicts:
+    settings = get_settings()
+    app_token = f"{settings.facebook_app_id}|{settings.facebook_app_secret}"
+    verdicts: Verdicts = {}
+    async with httpx.AsyncClient(timeout=60) as client:
+        for i in range(0, len(creds), GRAPH_BATCH):
+            chunk = creds[i:i + GRAPH_BATCH]
+            batch = [
+                {"method": "GET", "relative_url": f"debug_token?input_token={quote(c['access_token'], safe='')}"}
+                for c in chunk
+            ]
+            try:
+                r = await client.post(GRAPH_URL, data={
+                    "access_token": app_token,
+                    "batch": json.dumps(batch),
+                    "include_headers": "false",
+                })
+                r.raise_for_status()
+                answers = r.json()
+            except Exception as exc:
+                print(f"[credential_health] Graph batch failed: {exc}")
+                continue
+            for cred, answer in zip(chunk, answers):
+                if not answer or answer.get("code") != 200:
+                    continue  # timed out inside the batch; try next round
+                data = json.loads(answer.get("body") or "{}").get("data") or {}
+                if data.get("is_valid"):
+                    verdicts[cred["id"]] = None
+                else:
+                    verdicts[cred["id"]] = (data.get("error") or {}).get("message") or "token is not valid"
+    return verdicts
+
+
+async def _twitter(cred: Dict[str, Any]) -> str | None:
+    client = get_client_for_user(cred["access_token"], cred["access_token_secret"])
+    try:
+        await asyncio.to_thread(client.get_me)
+    except tweepy.Unauthorized as exc:
+        return f"Twitter rejected the token: {exc}"
+    return None
+
+
+async def _youtube(db: FirestoreSession, cred: Dict[str, Any]) -> str | None:
+    async with httpx.AsyncClient(timeout=30) as client:
+        r = await client.get(GOOGLE_TOKENINFO_URL, params={"access_token": cred.get("access_token")})
+    if r.status_code == 200:
+        return None
+    if r.status_code != 400:
+        r.raise_for_status()
+    # access token dead (usually just expired): the refresh token decides
+    try:
+        changes = await token_refresh.REFRESHERS["youtube"](cred)
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code in (400, 401):
+            body = exc.response.json() if exc.response.content else {}
+            return f"Google rejected the refresh token: {body.get('error_description') or body.get('error') or exc}"
+        raise
+    except KeyError:
+        return "no refresh token stored"
+    await token_refresh.save(db, "youtube", cred, changes)
+    return None
+
+
+async def _individually(db: FirestoreSession, platform: str, creds: List[Dict[str, Any]]) -> Verdicts:
+    gate = asyncio.Semaphore(max(1, get_settings().credential_health_concurrency))
+    verdicts: Verdicts = {}
+
+    async def one(cred: Dict[str, Any]) -> None:
+        async with gate:
+            try:
+                if platform == "twitter":
+                    verdicts[cred["id"]] = await _twitter(cred)
+                else:
+                    verdicts[cred["id"]] = await _youtube(db, cred)
+            except Exception as exc:
+                print(f"[credential_health] {platform}/{cred['id']} check inconclusive: {exc}")
+
+    await asyncio.gather(*(one(c) for c in creds))
+    return verdicts
+
+
+async def _mark(db: FirestoreSession, platform: str, cred: Dict[str, Any], reason: str | None, now: datetime) -> None:
+    collection = connections.CREDENTIAL_COLLECTIONS[platform]
+    if reason is None:
+        if "is_active" not in cred:
+            await db.update(collection, cred["id"], {"is_active": True})
+        _checked.inc(platform=platform, outcome="valid")
+        return
+    changes = {"is_active": False, "inactive_reason": reason, "inactive_at": now}
+    await db.update(collection, cred["id"], changes)
+    await connections.record(db, cred["user_id"], platform, cred["id"], {**cred, **changes})
+    _checked.inc(platform=platform, outcome="invalid")
+    print(f"[credential_health] {platform}/{cred['id']} of {cred['user_id']} deactivated: {reason}")
+
+
+async def check_all(db: FirestoreSession) -> Dict[str, int]:
+    """Validate every active credential; returns the number deactivated per platform."""
+    now = datetime.now(timezone.utc)
+    deactivated: Dict[str, int] = {}
+    for platform in connections.CREDENTIAL_COLLECTIONS:
+        try:
+            creds = await _active(db, platform)
+        except Exception as exc:
+            print(f"[credential_health] reading {platform} credentials failed: {exc}")
+            continue
+        if platform in ("facebook", "instagram"):
+            verdicts = await _graph(creds)
+        else:
+            verdicts = await _individually(db, platform, creds)
+        by_id = {c["id"]: c for c in creds}
+        for cred_id, reason in verdicts.items():
+            try:
+                await _mark(db, platform, by_id[cred_id], reason, now)
+            except Exception as exc:
+                print(f"[credential_health] recording {platform}/{cred_id} failed: {exc}")
+        _checked.inc(len(creds) - len(verdicts), platform=platform, outcome="unknown")
+        deactivated[platform] = sum(1 for r in verdicts.values() if r is not None)
+    print(f"[credential_health] deactivated {deactivated}")
+    return deactivated
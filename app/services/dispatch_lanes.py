@@ -0,0 +1,72 @@
+"""
+Dispatch lanes for the scheduler worker
+---------------------------------------
+
+Every (schedule, platform) pair is routed to one of three lanes so that a
+text tweet never waits behind a YouTube upload:
+
+    light  – text posts, images and small videos we transfer ourselves
+    video  – large videos we download + upload (YouTube, Twitter)
+    poll   – Meta-side fetches we only wait on (Instagram containers,
+             Facebook `file_url` videos)
+
+Each lane has its own worker count and byte budget; a unit holds a worker
+slot plus its media size from the budget while it runs.  The process-wide
+memory/disk budget in media_budget.py still applies on top of that.
+"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Tuple
+
+from app.core.config import get_settings
+from app.services.media_budget import ByteBudget, content_length
+
+settings = get_settings()
+
+MB = 1024 * 1024
+
+
+class Lane:
+    def __init__(self, name: str, workers: int, memory_bytes: int):
+        self.name = name
+        self.workers = asyncio.Semaphore(workers)
+        self.budget = ByteBudget(memory_bytes, name=f"lane_{name}")
+
+    @asynccontextmanager
+    async def slot(self, nbytes: int) -> AsyncIterator[None]:
+        async with self.workers:
+            held = await self.budget.acquire(nbytes)
+            try:
+                yield
+            finally:
+                await self.budget.release(held)
+
+
+light = Lane("light", settings.lane_light_workers, settings.lane_light_memory_mb * MB)
+video = Lane("video", settings.lane_video_workers, settings.lane_video_memory_mb * MB)
+poll = Lane("poll", settings.lane_poll_workers, settings.lane_poll_memory_mb * MB)
+
+
+async def route(platform: str, image_url: str | None, video_url: str | None) -> Tuple[Lane, int]:
+    """Pick the lane for one platform dispatch and the bytes it will buffer."""
+    if platform == "instagram" or (platform == "facebook" and video_url):
+        # Meta pulls the media itself; we only create + poll.
+        return poll, 0
+    if platform == "facebook":
+        return light, 0  # photo by URL / text post
+
+    if platform == "youtube" and not video_url:
+        return light, 0  # fails fast with "no_video"
+    # YouTube uploads the video; Twitter attaches the image only
+    media_url = video_url if platform == "youtube" else image_url
+    if not media_url:
+        return light, 0
+
+    size = await content_length(media_url)
+    if size is None:
+        size = settings.media_unknown_size_mb * MB if platform == "youtube" else 0
+    if size > settings.lane_light_max_media_mb * MB:
+        return video, size
+    return light, size
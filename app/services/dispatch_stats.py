@@ -0,0 +1,185 @@
+"""
+Dispatch durations learned from history
+---------------------------------------
+
+Every successful platform dispatch records how long it took from the
+start of the dispatch to the platform accepting the post, keyed by
+platform and media size bucket:
+
+    dispatch_stats/youtube_video_m  {"samples": [{"duration": 212.4,
+                                                  "late": 3.1,
+                                                  "predicted_late": -0.6}, …]}
+
+Only the last `WINDOW` samples are kept, so the quantiles follow the
+platforms as they speed up or slow down.  Samples are collected in memory
+and appended to their doc at most every `FLUSH_SECONDS` (`flush`, also on
+drain), one transaction per doc, so busy platforms do not contend on a
+write per dispatch.  The worker starts a schedule
+`predicted_duration(…)` ahead of run_at (at `dispatch_lead_percentile`)
+so it is expected to be live on time; `late` / `predicted_late` record how
+that worked out (`python -m app.scheduler_worker lateness-report`).
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from google.cloud import firestore
+
+from app.core.config import get_settings
+from app.models.firestore_db import FirestoreSession
+
+COLLECTION = "dispatch_stats"
+# samples kept per platform / bucket
+WINDOW = 500
+# how often the local copy of the estimates is re-read
+REFRESH_SECONDS = 300
+# how often samples collected here are written out
+FLUSH_SECONDS = 60
+
+MB = 1024 * 1024
+
+_durations: Dict[str, List[float]] = {}
+_loaded_at = 0.0
+# platform_bucket → samples not written yet
+_pending: Dict[str, List[Dict[str, Any]]] = {}
+_flushed_at = time.monotonic()
+
+
+def size_bucket(image_url: str | None, video_url: str | None, nbytes: int) -> str:
+    """text / image / video (platform pulls it) / video_s / video_m / video_l."""
+    if video_url:
+        if not nbytes:
+            return "video"
+        if nbytes <= get_settings().lane_light_max_media_mb * MB:
+            return "video_s"
+        return "video_m" if nbytes <= 256 * MB else "video_l"
+    return "image" if image_url else "text"
+
+
+def _key(platform: str, bucket: str) -> str:
+    return f"{platform}_{bucket}"
+
+
+def quantile(values: List[float], q: float) -> float | None:
+    """Nearest-rank quantile, or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def predicted_duration(platform: str, bucket: str) -> float | None:
+    """Seconds a dispatch takes at `dispatch_lead_percentile`; None until enough history."""
+    settings = get_settings()
+    samples = _durations.get(_key(platform, bucket)) or []
+    if len(samples) < settings.dispatch_stats_min_samples:
+        return None
+    return quantile(samples, settings.dispatch_lead_percentile)
+
+
+def longest_duration() -> float:
+    """The largest `predicted_duration` of any platform / bucket, 0 without history."""
+    return max(
+        (predicted_duration(*key.split("_", 1)) or 0.0 for key in _durations),
+        default=0.0,
+    )
+
+
+async def refresh(db: FirestoreSession, force: bool = False) -> None:
+    """Write out our samples, then reload the estimates written by all scheduler instances."""
+    global _loaded_at
+    await flush(db, force)
+    if not force and time.monotonic() - _loaded_at < REFRESH_SECONDS:
+        return
+    _loaded_at = time.monotonic()
+    try:
+        docs = list(db.db.collection(COLLECTION).stream())
+    except Exception as exc:
+        print(f"[dispatch_stats] refresh failed: {exc}")
+        return
+    for snap in docs:
+        samples = (snap.to_dict().get("samples") or []) + _pending.get(snap.id, [])
+        _durations[snap.id] = [s["duration"] for s in samples][-WINDOW:]
+
+
+def _append(db: FirestoreSession, key: str, new: List[Dict[str, Any]]) -> None:
+    ref = db.db.collection(COLLECTION).document(key)
+
+    @firestore.transactional
+    def run(transaction: Any) -> None:
+        snap = ref.get(transaction=transaction)
+        samples = (snap.to_dict() or {}).get("samples", []) if snap.exists else []
+        transaction.set(ref, {"samples": (samples + new)[-WINDOW:]})
+
+    run(db.db.transaction())
+
+
+async def flush(db: FirestoreSession, force: bool = False) -> None:
+    """Append the samples collected since the last flush to their docs."""
+    global _flushed_at
+    if not _pending or (not force and time.monotonic() - _flushed_at < FLUSH_SECONDS):
+        return
+    _flushed_at = time.monotonic()
+    batches = dict(_pending)
+    _pending.clear()
+    for key, samples in batches.items():
+        try:
+            await asyncio.to_thread(_append, db, key, samples)
+        except Exception as exc:
+            print(f"[dispatch_stats] could not record {len(samples)} sample(s) of {key}: {exc}")
+            # retried with the next flush
+            _pending[key] = (samples + _pending.get(key, []))[-WINDOW:]
+
+
+async def record(
+    db: FirestoreSession,
+    platform: str,
+    bucket: str,
+    started: datetime,
+    run_at: datetime,
+) -> None:
+    """One successful dispatch of `platform` that started at `started`."""
+    now = datetime.now(timezone.utc)
+    duration = (now - started).total_seconds()
+    predicted = predicted_duration(platform, bucket)
+    sample = {
+        "duration": round(duration, 1),
+        "late": round((now - run_at).total_seconds(), 1),
+        "predicted_late": (
+            round((started - run_at).total_seconds() + predicted, 1) if predicted is not None else None
+        ),
+        "at": now,
+    }
+    key = _key(platform, bucket)
+    _durations[key] = (_durations.get(key, []) + [sample["duration"]])[-WINDOW:]
+    _pending.setdefault(key, []).append(sample)
+    await flush(db)
+
+
+async def report(db: FirestoreSession) -> str:
+    """Predicted vs actual lateness per platform / bucket, as a text table."""
+    qs = (0.5, 0.9, 0.99)
+
+    def row(values: List[float]) -> str:
+        return " ".join(
+            f"{v:>8.1f}" if (v := quantile(values, q)) is not None else f"{'-':>8}" for q in qs
+        )
+
+    header = "p50 p90 p99"
+    lines = [
+        f"{'platform_bucket':<22}{'n':>6}  {'duration ' + header:>26}  "
+        f"{'predicted late ' + header:>26}  {'actual late ' + header:>26}"
+    ]
+    for snap in sorted(db.db.collection(COLLECTION).stream(), key=lambda s: s.id):
+        samples = snap.to_dict().get("samples") or []
+        lines.append(
+            f"{snap.id:<22}{len(samples):>6}  "
+            f"{row([s['duration'] for s in samples]):>26}  "
+            f"{row([s['predicted_late'] for s in samples if s.get('predicted_late') is not None]):>26}  "
+            f"{row([s['late'] for s in samples]):>26}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,216 @@
+"""
+Minute buckets of due schedules
+-------------------------------
+
+Every upcoming schedule is listed in `due_buckets/{yyyyMMddHHmm}_{shard}`
+(UTC minute of its run_at, scheduler shard of its ID – see
+coordination.py):
+
+    due_buckets/202611011000_07  {"minute": <ts>, "shard": 7, "ids": ["abc", "def"]}
+
+Schedule writes move IDs between buckets with ArrayUnion / ArrayRemove –
+in the same batch or transaction as the schedule write (`ops`; see
+schedule_writes.py for single schedules).  The worker reads
+only buckets of its own shards whose minute has arrived (`due_pages`),
+so its hot query is a range over a handful of small docs instead of a
+composite index over every schedule.
+
+Entries that no longer match their schedule (deleted, published, moved)
+are dropped as the buckets are read; empty buckets are deleted.
+`python -m app.scheduler_worker rebuild-buckets` rebuilds the whole index
+from `schedules` and then marks it built (`scheduler_meta/due_buckets`);
+until then the worker finds due schedules with the status + run_at query
+(`built`), so schedules written before the index existed still run.
+"""
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Set
+
+from google.cloud import firestore
+
+from app.models.enums import ScheduleState
+from app.models.firestore_db import FirestoreSession
+from app.services.coordination import shard_count, shard_of
+
+COLLECTION = "due_buckets"
+# Firestore's limit on writes per batch / practical get_all size
+BATCH_SIZE = 500
+# Firestore's limit on values in an `in` filter
+MAX_IN = 30
+# marker written once the index has been built
+META_COLLECTION, META_DOC = "scheduler_meta", "due_buckets"
+# how often an instance looks for the marker while it is missing
+BUILT_RECHECK_SECONDS = 60
+
+_built = False
+_built_checked_at: float | None = None
+
+
+def _value(v: Any) -> Any:
+    return getattr(v, "value", v)
+
+
+def bucket_id(run_at: datetime, shard: int) -> str:
+    return f"{run_at.astimezone(timezone.utc):%Y%m%d%H%M}_{shard:02d}"
+
+
+def _minute(run_at: datetime) -> datetime:
+    return run_at.astimezone(timezone.utc).replace(second=0, microsecond=0)
+
+
+def _bucket_of(schedule_id: str, sched: Dict[str, Any] | None) -> str | None:
+    """Bucket a schedule belongs in, or None when it is not waiting to run."""
+    if not sched or _value(sched.get("status")) != ScheduleState.upcoming.value:
+        return None
+    run_at = sched.get("run_at")
+    return bucket_id(run_at, shard_of(schedule_id)) if isinstance(run_at, datetime) else None
+
+
+def _fields(schedule_id: str, sched: Dict[str, Any]) -> Dict[str, Any]:
+    return {"minute": _minute(sched["run_at"]), "shard": shard_of(schedule_id)}
+
+
+def ops(
+    db: FirestoreSession,
+    schedule_id: str,
+    before: Dict[str, Any] | None,
+    after: Dict[str, Any] | None,
+) -> List[Callable[[Any], None]]:
+    """WriteBatch operations that move `schedule_id` from its old to its new bucket."""
+    old, new = _bucket_of(schedule_id, before), _bucket_of(schedule_id, after)
+    if old == new:
+        return []
+    coll = db.db.collection(COLLECTION)
+    out: List[Callable[[Any], None]] = []
+    if old:
+        out.append(lambda batch: batch.set(
+            coll.document(old),
+            {"ids": firestore.ArrayRemove([schedule_id]), **_fields(schedule_id, before)},
+            merge=True,
+        ))
+    if new:
+        out.append(lambda batch: batch.set(
+            coll.document(new),
+            {"ids": firestore.ArrayUnion([schedule_id]), **_fields(schedule_id, after)},
+            merge=True,
+        ))
+    return out
+
+
+async def _resolve(db: FirestoreSession, buckets: List[Any]) -> List[Dict[str, Any]]:
+    """Schedules listed in `buckets` that still belong there; stale IDs are removed."""
+    listed = [(snap, sid) for snap in buckets for sid in (snap.to_dict().get("ids") or [])]
+
+    schedules: Dict[str, Dict[str, Any]] = {}
+    coll = db.db.collection("schedules")
+    ids = list(dict.fromkeys(sid for _, sid in listed))
+    for i in range(0, len(ids), BATCH_SIZE):
+        for snap in db.db.get_all([coll.document(sid) for sid in ids[i:i + BATCH_SIZE]]):
+            if snap.exists:
+                schedules[snap.id] = {"id": snap.id, **snap.to_dict()}
+
+    due: List[Dict[str, Any]] = []
+    stale: Dict[str, List[str]] = defaultdict(list)
+    for snap, sid in listed:
+        sched = schedules.get(sid)
+        if sched and _bucket_of(sid, sched) == snap.id:
+            due.append(sched)
+        else:
+            stale[snap.id].append(sid)
+
+    for snap in buckets:
+        live = [sid for sid in snap.to_dict().get("ids") or [] if sid not in stale[snap.id]]
+        try:
+            if not live:
+                # only if nobody added an ID since we read it
+                snap.reference.delete(option=db.db.write_option(last_update_time=snap.update_time))
+            elif stale[snap.id]:
+                snap.reference.update({"ids": firestore.ArrayRemove(stale[snap.id])})
+        except Exception as exc:
+            print(f"[due_buckets] cleanup of bucket {snap.id} skipped: {exc}")
+
+    return sorted(due, key=lambda s: (s["run_at"], s["id"]))
+
+
+async def due_pages(
+    db: FirestoreSession,
+    now: datetime,
+    page_size: int,
+    shards: Set[int],
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Upcoming schedules of `shards` whose run_at is at or before `now`,
+    oldest first, read `page_size` buckets at a time.  The bucket of
+    `now`'s minute also lists later schedules; they are left out.  Stop
+    iterating to stop reading.
+    """
+    if not shards:
+        return
+    base = db.db.collection(COLLECTION).where("minute", "<=", now)
+    if len(shards) < shard_count() and len(shards) <= MAX_IN:
+        base = base.where("shard", "in", sorted(shards))
+    base = base.order_by("minute").order_by("__name__")
+
+    last = None
+    while True:
+        query = base.start_after(last) if last is not None else base
+        page = list(query.limit(page_size).stream())
+        if not page:
+            return
+        # unfiltered reads (more shards than `in` allows) are narrowed here
+        buckets = [snap for snap in page if snap.to_dict().get("shard") in shards]
+        yield [s for s in await _resolve(db, buckets) if s["run_at"] <= now]
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+
+def built(db: FirestoreSession) -> bool:
+    """True once `rebuild` has indexed every schedule; rechecked every minute until then."""
+    global _built, _built_checked_at
+    if _built:
+        return True
+    now = time.monotonic()
+    if _built_checked_at is not None and now - _built_checked_at < BUILT_RECHECK_SECONDS:
+        return False
+    _built_checked_at = now
+    try:
+        _built = db.db.collection(META_COLLECTION).document(META_DOC).get().exists
+    except Exception as exc:
+        print(f"[due_buckets] index marker check failed: {exc}")
+    if not _built:
+        print("[due_buckets] index not built yet (run rebuild-buckets); using the run_at query")
+    return _built
+
+
+async def rebuild(db: FirestoreSession) -> int:
+    """Re-create every bucket from the upcoming schedules; returns schedules indexed."""
+    marker = db.db.collection(META_COLLECTION).document(META_DOC)
+    marker.delete()
+    stale = [snap.reference for snap in db.db.collection(COLLECTION).stream()]
+    for i in range(0, len(stale), BATCH_SIZE):
+        batch = db.db.batch()
+        for ref in stale[i:i + BATCH_SIZE]:
+            batch.delete(ref)
+        batch.commit()
+
+    buckets: Dict[str, Dict[str, Any]] = {}
+    upcoming = await db.query("schedules", filters=[("status", "==", ScheduleState.upcoming)])
+    for sched in upcoming:
+        bucket = _bucket_of(sched["id"], sched)
+        if bucket:
+            entry = buckets.setdefault(bucket, {**_fields(sched["id"], sched), "ids": []})
+            entry["ids"].append(sched["id"])
+
+    items = list(buckets.items())
+    for i in range(0, len(items), BATCH_SIZE):
+        batch = db.db.batch()
+        for bucket, data in items[i:i + BATCH_SIZE]:
+            batch.set(db.db.collection(COLLECTION).document(bucket), data)
+        batch.commit()
+    indexed = sum(len(data["ids"]) for data in buckets.values())
+    marker.set({"built_at": datetime.now(timezone.utc), "schedules": indexed})
+    return indexed
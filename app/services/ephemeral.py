@@ -0,0 +1,72 @@
+"""
+Ephemeral collections
+---------------------
+
+Short-lived records are keyed by their natural ID, so every lookup is a
+point read, and carry `expires_at`:
+
+    twitter_oauth_state/{state}   pending Twitter OAuth exchange, 10 min
+    video_uploads/{video_id}      Facebook video processing status, 7 days
+    tombstones/{auto}             sync deletions, sync_tombstone_ttl_days
+    upload_sessions/{auto}        resumable uploads, upload_session_ttl_hours
+
+In production Firestore TTL policies on `expires_at` delete them
+(fieldOverrides in firestore.indexes.json).  TTL deletion can lag by up
+to a day, so readers still check `expired()`.  The emulator has no TTL;
+there (or with EPHEMERAL_SWEEPER=true) the scheduler runs `sweep()`,
+which deletes expired docs in batches.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from app.models.firestore_db import FirestoreSession
+
+TTL_FIELD = "expires_at"
+TTL_COLLECTIONS = ("twitter_oauth_state", "video_uploads", "tombstones", "upload_sessions")
+# Firestore batch write limit
+BATCH = 500
+
+
+def expires_in(ttl: timedelta) -> datetime:
+    return datetime.now(timezone.utc) + ttl
+
+
+def expired(doc: Dict[str, Any] | None, now: datetime | None = None) -> bool:
+    """True if `doc` is missing or past its expiry (TTL may not have removed it yet)."""
+    if not doc:
+        return True
+    expires = doc.get(TTL_FIELD)
+    if not isinstance(expires, datetime):
+        return False
+    if expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    return expires <= (now or datetime.now(timezone.utc))
+
+
+async def sweep(db: FirestoreSession) -> Dict[str, int]:
+    """Delete expired docs of every TTL collection; returns the count per collection."""
+    now = datetime.now(timezone.utc)
+    deleted: Dict[str, int] = {}
+    for collection in TTL_COLLECTIONS:
+        query = db.db.collection(collection).where(TTL_FIELD, "<=", now).limit(BATCH)
+        total = 0
+        try:
+            while True:
+                snaps = list(query.stream())
+                if not snaps:
+                    break
+                batch = db.db.batch()
+                for snap in snaps:
+                    batch.delete(snap.reference)
+                batch.commit()
+                total += len(snaps)
+                if len(snaps) < BATCH:
+                    break
+        except Exception as exc:
+            print(f"[ephemeral] sweeping {collection} failed: {exc}")
+        deleted[collection] = total
+    if any(deleted.values()):
+        print(f"[ephemeral] swept {deleted}")
+    return deleted
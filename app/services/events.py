@@ -0,0 +1,225 @@
+"""
+Live schedule / job events
+--------------------------
+
+Fan-out for GET /scheduler/events (Server-Sent Events):
+
+    async with broker.subscribe(user_id) as queue:   # one queue per connection
+        event = await queue.get()
+
+Producers call `publish_schedule` / `publish_job`.  In the API process that
+covers jobs; schedule dispatch happens in the scheduler service, so the
+API also runs a `FirestoreBridge`: one listener per collection over docs
+whose `modified_at` moved since the listener was armed.  Either way the
+cost is one delivery per change per connected client, however many
+clients there are.
+
+The broker remembers the last event per schedule / job and drops exact
+repeats, so a change seen both in-process and through the listener – or
+twice while a listener is re-armed – reaches clients once.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Set, Tuple
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# entities whose last event is remembered for de-duplication
+REMEMBERED = 4096
+
+_subscribers = metrics.gauge("events_subscribers", "Connected event stream clients")
+_delivered = metrics.counter("events_delivered_total", "Events queued to stream clients")
+_dropped = metrics.counter("events_dropped_total", "Events dropped for slow stream clients")
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class EventBroker:
+    """Per-user queues; `publish` is safe to call from any thread."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subs: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._last: OrderedDict[str, str] = OrderedDict()
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: str) -> AsyncIterator[asyncio.Queue]:
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subs[user_id].add(queue)
+        _subscribers.inc()
+        try:
+            yield queue
+        finally:
+            _subscribers.dec()
+            self._subs[user_id].discard(queue)
+            if not self._subs[user_id]:
+                del self._subs[user_id]
+
+    def publish(self, user_id: str, event: Dict[str, Any]) -> None:
+        loop = self._loop
+        if loop is None or user_id not in self._subs:
+            return
+        try:
+            same_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            same_loop = False
+        if same_loop:
+            self._deliver(user_id, event)
+        else:
+            loop.call_soon_threadsafe(self._deliver, user_id, event)
+
+    def _deliver(self, user_id: str, event: Dict[str, Any]) -> None:
+        entity, fingerprint = f"{event['type']}:{event['id']}", _encode(event)
+        if self._last.get(entity) == fingerprint:
+            return
+        self._last[entity] = fingerprint
+        self._last.move_to_end(entity)
+        while len(self._last) > REMEMBERED:
+            self._last.popitem(last=False)
+
+        for queue in list(self._subs.get(user_id, ())):
+            if queue.full():
+                # slow client: drop its oldest event rather than block producers
+                queue.get_nowait()
+                _dropped.inc()
+            queue.put_nowait(event)
+            _delivered.inc()
+
+
+broker = EventBroker(settings.events_queue_size)
+
+
+# ────────────────────────────────────────────────────────────────────
+# event payloads
+# ────────────────────────────────────────────────────────────────────
+def _value(v: Any) -> Any:
+    return getattr(v, "value", v)
+
+
+def schedule_event(schedule_id: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "schedule",
+        "id": schedule_id,
+        "status": _value(doc.get("status")),
+        "results": doc.get("results"),
+        "run_at": doc.get("run_at"),
+        "platforms": [_value(p) for p in doc.get("platforms") or []],
+    }
+
+
+def job_event(job_id: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "job",
+        "id": job_id,
+        "kind": doc.get("kind"),
+        "status": doc.get("status"),
+        "progress": doc.get("progress"),
+        "progress_message": doc.get("progress_message"),
+        "result": doc.get("result"),
+        "error": doc.get("error"),
+    }
+
+
+def publish_schedule(schedule_id: str, doc: Dict[str, Any]) -> None:
+    if doc.get("user_id"):
+        broker.publish(str(doc["user_id"]), schedule_event(schedule_id, doc))
+
+
+def publish_job(job_id: str, doc: Dict[str, Any]) -> None:
+    if doc.get("user_id"):
+        broker.publish(str(doc["user_id"]), job_event(job_id, doc))
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {_encode(event)}\n\n"
+
+
+# ────────────────────────────────────────────────────────────────────
+# Firestore listener
+# ────────────────────────────────────────────────────────────────────
+class _Watch:
+    """One on_snapshot listener; its initial snapshot is swallowed."""
+
+    def __init__(self, client, collection: str, since: datetime,
+                 to_event: Callable[[str, Dict[str, Any]], Dict[str, Any]]):
+        self.ready = threading.Event()
+        self.to_event = to_event
+        query = client.collection(collection).where(filter=FieldFilter("modified_at", ">=", since))
+        self._watch = query.on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, _docs, changes, _read_time) -> None:
+        if not self.ready.is_set():
+            self.ready.set()
+            return
+        for change in changes:
+            doc = change.document.to_dict() or {}
+            if not doc.get("user_id"):
+                continue
+            if change.type.name == "REMOVED":
+                event = {"type": f"{self.to_event(change.document.id, doc)['type']}_deleted",
+                         "id": change.document.id}
+            else:
+                event = self.to_event(change.document.id, doc)
+            broker.publish(str(doc["user_id"]), event)
+
+    def close(self) -> None:
+        self._watch.unsubscribe()
+
+
+class FirestoreBridge:
+    COLLECTIONS: Dict[str, Callable[[str, Dict[str, Any]], Dict[str, Any]]] = {
+        "schedules": schedule_event,
+        "jobs": job_event,
+    }
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    def ensure_started(self) -> None:
+        if settings.events_firestore_bridge and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    def _arm(self, client, since: datetime) -> Tuple[_Watch, ...]:
+        return tuple(_Watch(client, c, since, fn) for c, fn in self.COLLECTIONS.items())
+
+    async def _run(self) -> None:
+        from app.core.firebase import get_firestore_client
+
+        client = get_firestore_client()
+        current: Tuple[_Watch, ...] = ()
+        try:
+            while True:
+                # overlap the old listeners' window; repeats are de-duplicated
+                since = datetime.now(timezone.utc) - timedelta(seconds=30)
+                fresh = await asyncio.to_thread(self._arm, client, since)
+                for watch in fresh:
+                    await asyncio.to_thread(watch.ready.wait, 60)
+                for watch in current:
+                    watch.close()
+                current = fresh
+                await asyncio.sleep(settings.events_listener_rearm_minutes * 60)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            print(f"[events] Firestore listener stopped: {exc}")
+        finally:
+            for watch in current:
+                watch.close()
+
+
+bridge = FirestoreBridge()
@@ -1,10 +1,15 @@
+import asyncio
 import httpx
+import time
+from datetime import datetime
+from typing import Awaitable, BinaryIO, Callable
 from app.core.config import get_settings
 settings = get_settings()
 
 import json
 
 GRAPH = "https://graph.facebook.com/v23.0"
+GRAPH_VIDEO = "https://graph-video.facebook.com/v23.0"
 
 async def exchange_code_for_token(code: str) -> str:
     """Step-1: code → short-lived token"""
@@ -53,9 +58,22 @@ async def page_id_and_token(long_user_token: str) -> tuple[str, str]:
     return page_id, page_token
 
 # ----------  post helpers ---------- #
-async def post_feed(page_id: str, page_token: str, message: str, link: str | None = None):
+def _schedule_fields(publish_at: datetime | None) -> dict:
+    """
+    Graph params for native Page scheduling: the post is created unpublished
+    and Facebook flips it live at `publish_at` (10 min – 30 days ahead).
+    """
+    if publish_at is None:
+        return {}
+    return {
+        "published": "false",
+        "scheduled_publish_time": str(int(publish_at.timestamp())),
+    }
+
+async def post_feed(page_id: str, page_token: str, message: str, link: str | None = None,
+                    publish_at: datetime | None = None):
     url = f"{GRAPH}/{page_id}/feed"
-    data = {"message": message, "access_token": page_token}
+    data = {"message": message, "access_token": page_token, **_schedule_fields(publish_at)}
     if link:
         data["link"] = link
     async with httpx.AsyncClient() as c:
@@ -63,9 +81,11 @@ async def post_feed(page_id: str, page_token: str, message: str, link: str | Non
     r.raise_for_status()
     return r.json()["id"]
 
-async def post_photo(page_id: str, page_token: str, image_url: str, caption: str | None):
+async def post_photo(page_id: str, page_token: str, image_url: str, caption: str | None,
+                     publish_at: datetime | None = None):
     url = f"{GRAPH}/{page_id}/photos"
-    data = {"url": image_url, "caption": caption or "", "access_token": page_token}
+    data = {"url": image_url, "caption": caption or "", "access_token": page_token,
+            **_schedule_fields(publish_at)}
     async with httpx.AsyncClient(timeout= 30.0) as c:
         r = await c.post(url, data=data)
     r.raise_for_status()
@@ -77,9 +97,11 @@ async def post_video(
     page_token: str,
     video_url: str,
     description: str | None = None,
+    publish_at: datetime | None = None,
 ) -> str:
     """
     Publish a small/medium video to a Facebook Page using file_url.
+    Pass `publish_at` to let Facebook publish it natively at that time.
     Returns the video ID (e.g. '12345_67890')
     """
     url = f"{GRAPH}/{page_id}/videos"
@@ -88,6 +110,7 @@ async def post_video(
         "description": description or "",
         "access_token": page_token,
         # optional: "published": "true" (default)
+        **_schedule_fields(publish_at),
     }
     async with httpx.AsyncClient(timeout = 120.0) as c:  # 2-minute budget
         r = await c.post(url, data=data)
@@ -95,6 +118,42 @@ async def post_video(
     return r.json()["id"]                      # { "id": "{page_id}_{video_id}" }
 
 
+async def upload_video_file(
+    page_id: str,
+    page_token: str,
+    fh: BinaryIO,
+    filename: str,
+    description: str | None = None,
+    content_type: str = "video/mp4",
+) -> str:
+    """
+    Publish a video from an open file; httpx streams it into the multipart
+    body so the file is never held in memory.  Returns the video ID.
+    """
+    url = f"{GRAPH_VIDEO}/{page_id}/videos"
+    data = {"description": description or "", "access_token": page_token}
+    async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, write=600.0)) as c:
+        r = await c.post(url, data=data, files={"source": (filename, fh, content_type)})
+    r.raise_for_status()
+    return r.json()["id"]
+
+
+async def upload_photo_file(
+    page_id: str,
+    page_token: str,
+    fh: BinaryIO,
+    filename: str,
+    caption: str | None = None,
+    content_type: str = "image/jpeg",
+) -> str:
+    url = f"{GRAPH}/{page_id}/photos"
+    data = {"caption": caption or "", "access_token": page_token}
+    async with httpx.AsyncClient(timeout=120.0) as c:
+        r = await c.post(url, data=data, files={"source": (filename, fh, content_type)})
+    r.raise_for_status()
+    return r.json()["id"]
+
+
 # app/services/facebook_service.py
 async def post_video_as_feed(page_id: str,
                              page_token: str,
@@ -130,3 +189,50 @@ async def post_video_as_feed(page_id: str,
         post = await c.post(feed_url, data=feed_data)
     post.raise_for_status()
     return post.json()["id"]          # "{page-id}_{post-id}"
+
+
+async def wait_for_video(
+    video_id: str,
+    page_token: str,
+    on_progress: Callable[[int], Awaitable[None]] | None = None,
+) -> str:
+    """
+    Poll a video until Meta has processed it.  Returns the final
+    `video_status` ("ready", "error" or "expired"); raises TimeoutError after
+    `fb_video_timeout_minutes`.  `on_progress` gets processing_progress (0–100).
+    """
+    deadline = time.monotonic() + settings.fb_video_timeout_minutes * 60
+    while True:
+        info = await get_object(video_id, page_token, fields="status")
+        status = info.get("status", {})
+        video_status = status.get("video_status", "processing")
+        if video_status in ("ready", "error", "expired"):
+            return video_status
+        if on_progress:
+            await on_progress(status.get("processing_progress", 0))
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"video {video_id} still {video_status} after "
+                               f"{settings.fb_video_timeout_minutes} min")
+        await asyncio.sleep(settings.fb_video_poll_seconds)
+
+
+# ----------  natively scheduled objects ---------- #
+async def get_object(object_id: str, page_token: str, fields: str = "id") -> dict:
+    """Fetch a Graph object (post / photo / video); raises on 4xx/5xx."""
+    async with httpx.AsyncClient(timeout=15.0) as c:
+        r = await c.get(f"{GRAPH}/{object_id}",
+                        params={"fields": fields, "access_token": page_token})
+    r.raise_for_status()
+    return r.json()
+
+async def reschedule_object(object_id: str, page_token: str, publish_at: datetime) -> None:
+    """Move an unpublished, scheduled Page object to a new publish time."""
+    async with httpx.AsyncClient(timeout=15.0) as c:
+        r = await c.post(f"{GRAPH}/{object_id}",
+                         data={"access_token": page_token, **_schedule_fields(publish_at)})
+    r.raise_for_status()
+
+async def delete_object(object_id: str, page_token: str) -> None:
+    async with httpx.AsyncClient(timeout=15.0) as c:
+        r = await c.delete(f"{GRAPH}/{object_id}", params={"access_token": page_token})
+    r.raise_for_status()
@@ -0,0 +1,59 @@
+"""
+Fair share of scheduler ticks across tenants
+--------------------------------------------
+
+Due schedules arrive oldest first, so one account with 2,000 posts at the
+top of the hour would fill a whole tick ahead of everyone else due at the
+same minute.  `pick` orders a tick's candidates by deficit round-robin
+over `user_id` instead:
+
+• every round, each tenant with work earns `quantum` credits and starts
+  its oldest schedules while their cost (one per platform) fits;
+• a tenant never has more than `per_tenant` schedules in flight,
+  counting those still running from earlier ticks;
+• tenants take turns in the order of their oldest due schedule.
+"""
+from __future__ import annotations
+
+from collections import Counter, OrderedDict, deque
+from typing import Any, Deque, Dict, List
+
+
+def cost(sched: Dict[str, Any]) -> int:
+    return max(1, len(sched.get("platforms") or []))
+
+
+def pick(
+    candidates: List[Dict[str, Any]],
+    running: Counter,
+    per_tenant: int,
+    limit: int,
+    quantum: int,
+) -> List[Dict[str, Any]]:
+    """
+    Up to `limit` of `candidates` (oldest first) in fair start order.
+    `running` counts in-flight schedules per user_id and is not modified.
+    """
+    queues: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+    for sched in candidates:
+        queues.setdefault(str(sched.get("user_id")), deque()).append(sched)
+
+    quantum = max(1, quantum)
+    load = Counter(running)
+    deficit: Counter = Counter()
+    picked: List[Dict[str, Any]] = []
+    while queues and len(picked) < limit:
+        for user_id in list(queues):
+            queue = queues[user_id]
+            deficit[user_id] += quantum
+            while queue and cost(queue[0]) <= deficit[user_id]:
+                if load[user_id] >= per_tenant or len(picked) >= limit:
+                    queue.clear()
+                    break
+                sched = queue.popleft()
+                deficit[user_id] -= cost(sched)
+                load[user_id] += 1
+                picked.append(sched)
+            if not queue:
+                del queues[user_id]
+    return picked
@@ -0,0 +1,202 @@
+"""
+Background jobs
+---------------
+
+Slow posting work (video uploads, waiting on Meta's processing) runs
+outside the request.  The endpoint persists a `jobs` doc and answers 202;
+clients poll GET /api/v1/jobs/{id} for progress and the result:
+
+    async def run(job: JobContext) -> dict:
+        await job.progress(0.5, "uploading")
+        return {"video_id": ...}
+
+    job_id = await jobs.submit(db, user_id, "youtube_upload", run)
+    return jobs.accepted(job_id)
+
+Resources the job takes over from the request (open files, temp copies)
+are released by `cleanup`, which runs exactly once however the job ends:
+finished, failed, cancelled while queued, or never started because the
+job could not be recorded.
+
+An in-process pool runs at most `job_workers` jobs at a time; the rest
+stay "queued".  Jobs run in the instance that accepted them, so every job
+refreshes `heartbeat_at` while it is alive and one whose heartbeat stops
+(instance restarted or scaled in) is reported as failed when next read.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.models.firestore_db import FirestoreSession
+from app.services import events
+
+settings = get_settings()
+
+COLLECTION = "jobs"
+ACTIVE = ("queued", "running")
+# progress is written at most this often (seconds)
+PROGRESS_INTERVAL = 2.0
+
+_jobs_active = metrics.gauge("jobs_active", "Background jobs queued or running in this process")
+_jobs_finished = metrics.counter("jobs_finished_total", "Background jobs finished, by outcome")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobContext:
+    """Handed to the job function for progress reporting."""
+
+    def __init__(self, db: FirestoreSession, job_id: str, job: Dict[str, Any]):
+        self.db = db
+        self.id = job_id
+        self.job = job
+        self._last_write = 0.0
+
+    async def progress(self, fraction: float, message: str | None = None, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        await _record(self.db, self.id, self.job, {
+            "progress": round(min(max(fraction, 0.0), 1.0), 4),
+            "progress_message": message,
+            "heartbeat_at": _now(),
+        })
+
+
+async def _record(db: FirestoreSession, job_id: str, job: Dict[str, Any], changes: Dict[str, Any]) -> None:
+    """Persist a job change and push it to the user's event stream."""
+    await db.update(COLLECTION, job_id, changes)
+    job.update(changes)
+    events.publish_job(job_id, job)
+
+
+JobFn = Callable[[JobContext], Awaitable[Dict[str, Any]]]
+Cleanup = Callable[[], Awaitable[Any]]
+
+_slots = asyncio.Semaphore(settings.job_workers)
+# keeps job tasks referenced until they finish
+_tasks: set[asyncio.Task] = set()
+
+
+async def submit(
+    db: FirestoreSession,
+    user_id: str,
+    kind: str,
+    fn: JobFn,
+    params: Dict[str, Any] | None = None,
+    cleanup: Cleanup | None = None,
+) -> str:
+    """Persist a queued job and start it in the background; returns the job ID."""
+    job = {
+        "user_id": user_id,
+        "kind": kind,
+        "params": params or {},
+        "status": "queued",
+        "progress": 0.0,
+        "heartbeat_at": _now(),
+    }
+    try:
+        job_id = await db.add(COLLECTION, dict(job))
+    except BaseException:
+        if cleanup is not None:
+            await cleanup()
+        raise
+    events.publish_job(job_id, job)
+    task = asyncio.create_task(_run(db, job_id, job, fn, cleanup))
+    _tasks.add(task)
+    _jobs_active.set(len(_tasks))
+    task.add_done_callback(_forget)
+    return job_id
+
+
+def _forget(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    _jobs_active.set(len(_tasks))
+
+
+def accepted(job_id: str) -> Dict[str, str]:
+    """Body for the 202 response of an endpoint that submitted a job."""
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/v1/jobs/{job_id}"}
+
+
+async def _heartbeat(db: FirestoreSession, job_id: str) -> None:
+    while True:
+        await asyncio.sleep(settings.job_heartbeat_seconds)
+        try:
+            await db.update(COLLECTION, job_id, {"heartbeat_at": _now()})
+        except Exception as exc:
+            print(f"[jobs] heartbeat for {job_id} failed: {exc}")
+
+
+async def _run(
+    db: FirestoreSession,
+    job_id: str,
+    job: Dict[str, Any],
+    fn: JobFn,
+    cleanup: Cleanup | None = None,
+) -> None:
+    kind = job["kind"]
+    beat = asyncio.create_task(_heartbeat(db, job_id))
+    try:
+        async with _slots:
+            await _record(db, job_id, job, {"status": "running", "started_at": _now()})
+            try:
+                result = await fn(JobContext(db, job_id, job))
+            except Exception as exc:
+                # HTTPException from shared endpoint helpers carries its text in .detail
+                error = str(getattr(exc, "detail", "") or exc) or type(exc).__name__
+                print(f"[jobs] {kind} {job_id} failed: {error}")
+                _jobs_finished.inc(kind=kind, outcome="failed")
+                await _record(db, job_id, job, {
+                    "status": "failed", "error": error, "finished_at": _now(),
+                })
+            else:
+                _jobs_finished.inc(kind=kind, outcome="succeeded")
+                await _record(db, job_id, job, {
+                    "status": "succeeded", "progress": 1.0, "result": result or {},
+                    "finished_at": _now(),
+                })
+    except Exception as exc:
+        print(f"[jobs] could not record the outcome of {job_id}: {exc}")
+    finally:
+        beat.cancel()
+        if cleanup is not None:
+            try:
+                await cleanup()
+            except Exception as exc:
+                print(f"[jobs] cleanup of {job_id} failed: {exc}")
+
+
+async def get_job(db: FirestoreSession, job_id: str) -> Dict[str, Any] | None:
+    """Load a job, failing it first if the instance running it went away."""
+    job = await db.get(COLLECTION, job_id)
+    if not job or job["status"] not in ACTIVE:
+        return job
+    stale_after = timedelta(seconds=3 * settings.job_heartbeat_seconds)
+    heartbeat = job.get("heartbeat_at")
+    if heartbeat and _now() - heartbeat > stale_after:
+        interrupted = {
+            "status": "failed",
+            "error": "interrupted: the instance running this job stopped",
+            "finished_at": _now(),
+        }
+        await db.update(COLLECTION, job_id, interrupted)
+        job.update(interrupted)
+    return job
+
+
+def scratch_path(suffix: str = ".job") -> Path:
+    """Temp file for request bodies that must outlive the request."""
+    path = Path(settings.upload_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path / f"{uuid.uuid4().hex}{suffix}"
@@ -0,0 +1,276 @@
+"""
+Process-wide memory + disk budget for media transfers
+-----------------------------------------------------
+
+The scheduler (`downloaded`) streams media to a temp file and the posting
+endpoints stream Starlette's spooled upload straight on to the platform,
+both in fixed-size chunks.  Before a transfer starts it must be admitted by
+the budget – multipart request bodies by `UploadAdmission`, before
+Starlette spools them:
+
+    • disk   – its Content-Length (or a default for unknown sizes) is held
+               for as long as the temp file exists,
+    • memory – one chunk buffer is held while bytes are moving.
+
+A transfer larger than the whole disk budget is refused with
+`MediaBudgetExceeded` – the scheduler copies YouTube videos that large
+straight from their source instead (`exceeds_disk`,
+youtube_service.upload_video_from_url), holding only memory budget.
+Everything else waits until enough budget is free,
+so a burst of large videos queues instead of OOM-killing the container
+(on Cloud Run /tmp is RAM-backed, size the disk budget accordingly).
+
+Budget levels are published as `media_budget_*` metrics.
+"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO
+
+import aiohttp
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+
+MB = 1024 * 1024
+CHUNK_SIZE = settings.media_chunk_kb * 1024
+
+
+class MediaBudgetExceeded(RuntimeError):
+    """The transfer can never fit in the configured budget."""
+
+
+class ByteBudget:
+    """Counting semaphore over bytes; a request larger than the whole budget
+    is clamped to it, so it still runs – alone."""
+
+    def __init__(self, capacity: int, name: str | None = None):
+        self.capacity = capacity
+        self.available = capacity
+        self.name = name
+        self._cond = asyncio.Condition()
+        self._publish()
+
+    def _publish(self) -> None:
+        if self.name:
+            metrics.gauge(
+                "media_budget_bytes_available", "Free bytes in the media transfer budget"
+            ).set(self.available, resource=self.name)
+            metrics.gauge(
+                "media_budget_bytes_capacity", "Size of the media transfer budget"
+            ).set(self.capacity, resource=self.name)
+
+    async def acquire(self, nbytes: int) -> int:
+        nbytes = min(max(nbytes, 0), self.capacity)
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.available >= nbytes)
+            self.available -= nbytes
+            self._publish()
+        return nbytes
+
+    async def try_acquire(self, nbytes: int) -> bool:
+        async with self._cond:
+            if self.available < nbytes:
+                return False
+            self.available -= nbytes
+            self._publish()
+            return True
+
+    async def release(self, nbytes: int) -> None:
+        async with self._cond:
+            self.available += nbytes
+            self._publish()
+            self._cond.notify_all()
+
+
+memory = ByteBudget(settings.media_memory_budget_mb * MB, name="memory")
+disk = ByteBudget(settings.media_disk_budget_mb * MB, name="disk")
+
+_waiting = metrics.gauge("media_budget_waiting_transfers", "Transfers waiting for budget")
+_rejected = metrics.counter("media_budget_rejected_total", "Transfers refused by the budget")
+
+
+class Reservation:
+    """Disk bytes held for one temp file; grows while streaming unknown sizes."""
+
+    def __init__(self, held: int):
+        self.held = held
+        self.written = 0
+
+    async def account(self, nbytes: int) -> None:
+        self.written += nbytes
+        if self.written > self.held:
+            extra = max(self.written - self.held, CHUNK_SIZE)
+            if not await disk.try_acquire(extra):
+                _rejected.inc()
+                raise MediaBudgetExceeded(
+                    f"media exceeded its {self.held} B budget and no more disk budget is free"
+                )
+            self.held += extra
+
+
+@asynccontextmanager
+async def reserve(content_length: int | None) -> AsyncIterator[Reservation]:
+    """Admit one media transfer of `content_length` bytes (None = unknown)."""
+    wanted = content_length if content_length is not None else settings.media_unknown_size_mb * MB
+    if wanted > disk.capacity:
+        _rejected.inc()
+        raise MediaBudgetExceeded(
+            f"media of {wanted} B exceeds the {disk.capacity} B transfer budget"
+        )
+    _waiting.inc()
+    try:
+        held = await disk.acquire(wanted)
+    finally:
+        _waiting.dec()
+    res = Reservation(held)
+    try:
+        yield res
+    finally:
+        await disk.release(res.held)
+
+
+def exceeds_disk(content_length: int | None) -> bool:
+    """True for media that can never get a temp file; it must be streamed through."""
+    return content_length is not None and content_length > disk.capacity
+
+
+@asynccontextmanager
+async def chunk_buffer(nbytes: int = CHUNK_SIZE) -> AsyncIterator[None]:
+    held = await memory.acquire(nbytes)
+    try:
+        yield
+    finally:
+        await memory.release(held)
+
+
+async def stream_url_to_file(url: str, dest: Path, res: Reservation) -> Path:
+    """Download `url` to `dest` chunk by chunk inside an admitted reservation."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"Failed to download {url}: HTTP {resp.status}")
+            async with chunk_buffer():
+                with dest.open("wb") as fh:
+                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                        await res.account(len(chunk))
+                        fh.write(chunk)
+    return dest
+
+
+class UploadAdmission:
+    """
+    ASGI middleware that admits multipart request bodies before they are read.
+
+    Starlette spools a multipart body into /tmp while it parses the form,
+    before any endpoint or dependency runs, so the body is reserved here
+    from its Content-Length: one larger than the whole disk budget is
+    answered 413 unread, the others wait for budget and hold it until the
+    request is done.  A body without a Content-Length, or one running past
+    it, grows its reservation as it arrives and gets a 413 if it cannot.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        headers = Headers(scope=scope) if scope["type"] == "http" else None
+        if headers is None or not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+        length = headers.get("content-length", "")
+        exceeded: MediaBudgetExceeded | None = None
+        try:
+            async with reserve(int(length) if length.isdigit() else None) as res:
+                async def counted() -> Message:
+                    nonlocal exceeded
+                    message = await receive()
+                    if message["type"] == "http.request" and exceeded is None:
+                        try:
+                            await res.account(len(message.get("body", b"")))
+                        except MediaBudgetExceeded as exc:
+                            exceeded = exc
+                    # the app sees a disconnect and stops reading the body
+                    return {"type": "http.disconnect"} if exceeded else message
+
+                async def answer(message: Message) -> None:
+                    if exceeded is None:
+                        await send(message)
+
+                try:
+                    await self.app(scope, counted, answer)
+                except Exception:
+                    if exceeded is None:
+                        raise
+        except MediaBudgetExceeded as exc:
+            exceeded = exc
+        if exceeded is not None:
+            response = JSONResponse({"detail": str(exceeded)}, status_code=413)
+            await response(scope, receive, send)
+
+
+@asynccontextmanager
+async def admitted_upload(file: UploadFile) -> AsyncIterator[BinaryIO]:
+    """
+    Yield a multipart upload's file object, rewound.
+
+    Starlette has already streamed the request body into a private
+    SpooledTemporaryFile (RAM up to 1 MB, then an anonymous temp file),
+    within the budget `UploadAdmission` reserved for the request, so
+    callers read from it in chunks and never make a second copy.  The
+    spooled file is closed – and thereby deleted – on exit.
+    """
+    try:
+        await file.seek(0)
+        yield file.file
+    finally:
+        await file.close()
+
+
+@asynccontextmanager
+async def persisted_upload(file: UploadFile, dest: Path) -> AsyncIterator[Path]:
+    """
+    Copy a multipart upload to `dest` so it outlives the request (background
+    jobs).  The spooled original is closed as soon as it is copied; the
+    copy's own disk budget is held and `dest` removed on exit.
+    """
+    async with reserve(file.size) as res:
+        try:
+            try:
+                await file.seek(0)
+                async with chunk_buffer():
+                    with dest.open("wb") as fh:
+                        while chunk := await read_chunk(file.file):
+                            await res.account(len(chunk))
+                            fh.write(chunk)
+            finally:
+                await file.close()
+            yield dest
+        finally:
+            dest.unlink(missing_ok=True)
+
+
+async def read_chunk(fh: BinaryIO, size: int = CHUNK_SIZE) -> bytes:
+    """Read from a (possibly disk-backed) file without blocking the loop."""
+    return await asyncio.to_thread(fh.read, size)
+
+
+async def content_length(url: str) -> int | None:
+    """Content-Length of `url` via HEAD, or None if the server won't say."""
+    try:
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.head(url, allow_redirects=True) as resp:
+                if resp.status == 200 and resp.content_length is not None:
+                    return resp.content_length
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass
+    return None
@@ -0,0 +1,197 @@
+"""
+Media object storage with signed URLs
+-------------------------------------
+
+Clients upload media straight to a bucket with a short-lived signed PUT
+URL; posting endpoints and the scheduler then work with the object name
+instead of a request body:
+
+    storage = get_media_storage()
+    storage.signed_upload(name, content_type)   → {"url", "method", "headers"}
+    storage.signed_download_url(name)           → URL Meta / our worker can GET
+    with storage.open(name) as (fh, size): ...  → chunked reader
+
+`GCSMediaStorage` is the production backend (google-cloud-storage, V4
+signatures).  `LocalMediaStorage` keeps objects under a directory and signs
+URLs with an HMAC served by /api/v1/media/local/…, for tests and local runs.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, ContextManager, Dict, Iterator, List, Protocol, Tuple
+from urllib.parse import quote, urlencode
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class MediaObjectNotFound(LookupError):
+    pass
+
+
+class MediaAccessDenied(PermissionError):
+    """A media object outside the user's `users/<uid>/` prefix."""
+
+
+class MediaStorage(Protocol):
+    def signed_upload(self, object_name: str, content_type: str) -> Dict[str, object]: ...
+    def signed_download_url(self, object_name: str) -> str: ...
+    def open(self, object_name: str) -> ContextManager[Tuple[BinaryIO, int]]: ...
+    def delete(self, object_name: str) -> None: ...
+
+
+def _expiry() -> timedelta:
+    return timedelta(minutes=settings.media_signed_url_minutes)
+
+
+class GCSMediaStorage:
+    def __init__(self, bucket_name: str):
+        from google.cloud import storage
+
+        self.client = storage.Client()
+        self.bucket = self.client.bucket(bucket_name)
+
+    def _signing_kwargs(self) -> Dict[str, str]:
+        """
+        On Cloud Run the default credentials carry no private key; V4
+        signing then goes through IAM signBlob with the service account's
+        e-mail + a fresh access token.
+        """
+        import google.auth.credentials
+        import google.auth.transport.requests
+
+        creds = self.client._credentials
+        if isinstance(creds, google.auth.credentials.Signing):
+            return {}
+
+        creds.refresh(google.auth.transport.requests.Request())
+        return {
+            "service_account_email": creds.service_account_email,
+            "access_token": creds.token,
+        }
+
+    def signed_upload(self, object_name: str, content_type: str) -> Dict[str, object]:
+        url = self.bucket.blob(object_name).generate_signed_url(
+            version="v4",
+            expiration=_expiry(),
+            method="PUT",
+            content_type=content_type,
+            **self._signing_kwargs(),
+        )
+        return {"url": url, "method": "PUT", "headers": {"Content-Type": content_type}}
+
+    def signed_download_url(self, object_name: str) -> str:
+        return self.bucket.blob(object_name).generate_signed_url(
+            version="v4", expiration=_expiry(), method="GET", **self._signing_kwargs(),
+        )
+
+    @contextmanager
+    def open(self, object_name: str) -> Iterator[Tuple[BinaryIO, int]]:
+        blob = self.bucket.get_blob(object_name)
+        if blob is None:
+            raise MediaObjectNotFound(object_name)
+        # BlobReader fetches ranged chunks on demand and supports seek()
+        with blob.open("rb", chunk_size=settings.media_chunk_kb * 1024) as fh:
+            yield fh, blob.size
+
+    def delete(self, object_name: str) -> None:
+        self.bucket.blob(object_name).delete()
+
+
+class LocalMediaStorage:
+    """Filesystem stand-in: same interface, HMAC-signed URLs to our own API."""
+
+    def __init__(self, root: Path, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, object_name: str) -> Path:
+        path = (self.root / object_name).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise MediaObjectNotFound(object_name)
+        return path
+
+    @staticmethod
+    def signature(method: str, object_name: str, expires: int) -> str:
+        msg = f"{method}\n{object_name}\n{expires}".encode()
+        return hmac.new(settings.secret_key.encode(), msg, hashlib.sha256).hexdigest()
+
+    @classmethod
+    def verify(cls, method: str, object_name: str, expires: int, signature: str) -> bool:
+        return expires >= time.time() and hmac.compare_digest(
+            cls.signature(method, object_name, expires), signature
+        )
+
+    def _signed_url(self, method: str, object_name: str) -> str:
+        expires = int(time.time() + _expiry().total_seconds())
+        query = urlencode({"expires": expires, "signature": self.signature(method, object_name, expires)})
+        return f"{self.base_url}/api/v1/media/local/{quote(object_name)}?{query}"
+
+    def signed_upload(self, object_name: str, content_type: str) -> Dict[str, object]:
+        return {
+            "url": self._signed_url("PUT", object_name),
+            "method": "PUT",
+            "headers": {"Content-Type": content_type},
+        }
+
+    def signed_download_url(self, object_name: str) -> str:
+        return self._signed_url("GET", object_name)
+
+    @contextmanager
+    def open(self, object_name: str) -> Iterator[Tuple[BinaryIO, int]]:
+        path = self.path(object_name)
+        if not path.is_file():
+            raise MediaObjectNotFound(object_name)
+        with path.open("rb") as fh:
+            yield fh, path.stat().st_size
+
+    def delete(self, object_name: str) -> None:
+        self.path(object_name).unlink(missing_ok=True)
+
+
+@lru_cache
+def get_media_storage() -> MediaStorage:
+    if settings.media_storage_backend == "local":
+        return LocalMediaStorage(Path(settings.media_local_dir), settings.media_public_base_url)
+    return GCSMediaStorage(settings.media_bucket)
+
+
+def user_prefix(user_id: str) -> str:
+    return f"users/{user_id}/"
+
+
+def owns_object(user_id: str, object_name: str) -> bool:
+    return object_name.startswith(user_prefix(user_id)) and ".." not in object_name
+
+
+def foreign_objects(block: Dict[str, object], user_id: str) -> List[str]:
+    """`*_object` references of a marketing_content block that `user_id` does not own."""
+    return [
+        str(name) for name in (block.get("image_object"), block.get("video_object"))
+        if name and not owns_object(user_id, str(name))
+    ]
+
+
+def resolve_media_url(block: Dict[str, object], kind: str, user_id: str) -> str | None:
+    """
+    `<kind>_url` of a marketing_content block, or a signed download URL for
+    its `<kind>_object` when the media was uploaded to the bucket.  Objects
+    outside `user_id`'s prefix raise MediaAccessDenied.
+    """
+    url = block.get(f"{kind}_url")
+    if url:
+        return url
+    object_name = block.get(f"{kind}_object")
+    if object_name:
+        if not owns_object(user_id, str(object_name)):
+            raise MediaAccessDenied(str(object_name))
+        return get_media_storage().signed_download_url(object_name)
+    return None
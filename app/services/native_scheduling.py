@@ -0,0 +1,146 @@
+"""
+Native platform scheduling
+--------------------------
+
+Facebook Pages (`scheduled_publish_time`) and YouTube (`status.publishAt`)
+can publish a post at a given time on their own.  The scheduler worker uses
+that for schedules far enough in the future (`native_pending`) and records
+what it pushed on the schedule document:
+
+    native = {
+        "facebook": {"id": "<page-post-id>", "credential_id": "...",
+                     "publish_at": <datetime>, "scheduled_at": <datetime>},
+        "youtube":  {...},
+    }
+
+The helpers below keep those platform-side objects in step with the
+schedule (confirm at run_at, move when run_at changes, remove on delete).
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+import httpx
+
+from app.core.config import get_settings
+from app.models.firestore_db import FirestoreSession
+from app.services import facebook_service as fb
+from app.services import token_refresh
+from app.services import youtube_service as yt
+
+settings = get_settings()
+
+NATIVE_PLATFORMS = {
+    "facebook": "facebook_credentials",
+    "youtube": "youtube_credentials",
+}
+
+
+# minutes between the furthest early start of a dispatch and the window
+EARLY_START_MARGIN_MINUTES = 10
+
+
+def _value(v: Any) -> Any:
+    return getattr(v, "value", v)
+
+
+def native_window(now: datetime) -> tuple[datetime, datetime]:
+    """`run_at` range for which native scheduling is attempted; it starts after any early dispatch start."""
+    min_lead = max(
+        settings.native_schedule_min_lead_minutes,
+        settings.dispatch_max_lead_minutes + EARLY_START_MARGIN_MINUTES,
+    )
+    return (
+        now + timedelta(minutes=min_lead),
+        now + timedelta(days=settings.native_schedule_max_lead_days),
+    )
+
+
+def needs_native(schedule: Dict[str, Any]) -> bool:
+    """
+    True while a platform of `schedule` is neither scheduled natively nor
+    skipped.  Stored as `native_pending`, so the worker only reads schedules
+    that still have something to hand over.
+    """
+    done = {*(schedule.get("native") or {}), *(schedule.get("native_skipped") or [])}
+    return any(
+        _value(p) in NATIVE_PLATFORMS and _value(p) not in done
+        for p in schedule.get("platforms") or []
+    )
+
+
+async def _credential(db: FirestoreSession, platform: str, entry: Dict[str, Any]) -> Dict[str, Any] | None:
+    cred = await db.get(NATIVE_PLATFORMS[platform], entry["credential_id"])
+    return await token_refresh.fresh(db, platform, cred) if cred else None
+
+
+async def confirm_native(db: FirestoreSession, platform: str, entry: Dict[str, Any]) -> str:
+    """
+    Run-time check for a natively scheduled post: the platform publishes it,
+    we only make sure the object is still there.  Returns a result string in
+    the same vocabulary as the regular dispatch path.
+    """
+    cred = await _credential(db, platform, entry)
+    if not cred:
+        return "no_credentials"
+    try:
+        if platform == "facebook":
+            await fb.get_object(entry["id"], cred["access_token"])
+        else:
+            status = await yt.get_video_status(cred, entry["id"])
+            if status is None or status.get("uploadStatus") in ("failed", "rejected", "deleted"):
+                return f"error: native video {entry['id']} missing or rejected"
+    except httpx.HTTPStatusError as exc:
+        return f"error: native post {entry['id']} not found ({exc.response.status_code})"
+    return "native_success"
+
+
+async def retime_native(db: FirestoreSession, schedule: Dict[str, Any], run_at: datetime) -> Dict[str, Any]:
+    """
+    Move natively scheduled posts to `run_at`.  Entries that can no longer be
+    scheduled natively (run_at too close or too far) are withdrawn so the
+    worker dispatches those platforms itself.  Returns the new `native` map.
+    """
+    native: Dict[str, Any] = dict(schedule.get("native") or {})
+    if not native:
+        return native
+
+    lo, hi = native_window(datetime.now(timezone.utc))
+    keep = lo <= run_at <= hi
+    for platform, entry in list(native.items()):
+        cred = await _credential(db, platform, entry)
+        try:
+            if cred and keep and platform == "facebook":
+                await fb.reschedule_object(entry["id"], cred["access_token"], run_at)
+            elif cred and keep:
+                await yt.set_publish_at(cred, entry["id"], run_at)
+            elif cred and platform == "facebook":
+                await fb.delete_object(entry["id"], cred["access_token"])
+            elif cred:
+                await yt.delete_video(cred, entry["id"])
+        except Exception as exc:
+            print(f"[native] failed to retime {platform} {entry['id']}: {exc}")
+            keep_entry = False
+        else:
+            keep_entry = keep and cred is not None
+        if keep_entry:
+            native[platform] = {**entry, "publish_at": run_at}
+        else:
+            native.pop(platform)
+    return native
+
+
+async def cancel_native(db: FirestoreSession, schedule: Dict[str, Any]) -> None:
+    """Best-effort removal of every natively scheduled post of `schedule`."""
+    for platform, entry in (schedule.get("native") or {}).items():
+        cred = await _credential(db, platform, entry)
+        if not cred:
+            continue
+        try:
+            if platform == "facebook":
+                await fb.delete_object(entry["id"], cred["access_token"])
+            else:
+                await yt.delete_video(cred, entry["id"])
+        except Exception as exc:
+            print(f"[native] failed to cancel {platform} {entry['id']}: {exc}")
@@ -0,0 +1,115 @@
+"""
+Dispatch payloads snapshotted onto schedules
+--------------------------------------------
+
+When a schedule is created or updated, the product's marketing_content is
+rendered once per platform (app/services/rendering.py) and stored on the
+schedule with the media references it needs:
+
+    payload = {
+        "version": 1,
+        "rendered_at": <ts>,
+        "product_modified_at": <ts>,
+        "platforms": {
+            "twitter": {"message": "...", "title": None, "description": "",
+                        "hashtags": [...], "media": {"image_object": "..."}},
+        },
+    }
+
+The worker dispatches from the payload without reading the product, so a
+product edited or deleted after scheduling no longer breaks the post.
+Media stay references (`*_url` / `*_object`); objects are signed at
+dispatch time, and only objects under the scheduling user's prefix are
+accepted (`check_media`) or signed.  Payloads of another `VERSION` are ignored and the
+product is read as before – bump it when rendering changes.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable
+
+from app.models.firestore_db import FirestoreSession
+from app.services.media_storage import MediaAccessDenied, foreign_objects, resolve_media_url
+from app.services.rendering import ALIASES, render
+
+VERSION = 1
+MEDIA_KEYS = ("image_url", "image_object", "video_url", "video_object")
+
+
+def _platform(raw: Any) -> str:
+    name = str(getattr(raw, "value", raw))
+    return ALIASES.get(name, name)
+
+
+def snapshot(product: Dict[str, Any], platforms: Iterable[Any]) -> Dict[str, Any]:
+    """Payload for `platforms` rendered from `product`."""
+    mc_root = product.get("marketing_content") or {}
+    rendered: Dict[str, Any] = {}
+    for raw in platforms:
+        platform = _platform(raw)
+        block = mc_root.get(platform) or {}
+        rendered[platform] = {
+            **render(platform, block),
+            "media": {key: block[key] for key in MEDIA_KEYS if block.get(key)},
+        }
+    return {
+        "version": VERSION,
+        "rendered_at": datetime.now(timezone.utc),
+        "product_modified_at": product.get("modified_at"),
+        "platforms": rendered,
+    }
+
+
+def check_media(product: Dict[str, Any], platforms: Iterable[Any], user_id: str) -> None:
+    """Raise MediaAccessDenied if a block to be posted references another user's media."""
+    mc_root = product.get("marketing_content") or {}
+    for raw in platforms:
+        foreign = foreign_objects(mc_root.get(_platform(raw)) or {}, user_id)
+        if foreign:
+            raise MediaAccessDenied(foreign[0])
+
+
+async def build(
+    db: FirestoreSession,
+    product_id: str | None,
+    platforms: Iterable[Any],
+    user_id: str,
+) -> Dict[str, Any] | None:
+    """Payload from the stored product, or None when there is no product."""
+    product = await db.get("products", product_id) if product_id else None
+    if not product:
+        return None
+    platforms = list(platforms)
+    check_media(product, platforms, user_id)
+    return snapshot(product, platforms)
+
+
+def covers(payload: Dict[str, Any] | None, platform: str) -> bool:
+    return bool(
+        payload
+        and payload.get("version") == VERSION
+        and platform in (payload.get("platforms") or {})
+    )
+
+
+def changed(old: Dict[str, Any] | None, new: Dict[str, Any] | None, platform: str) -> bool:
+    """True if `new` renders `platform` differently from `old` (or drops it); no `new` is no change."""
+    if not new:
+        return False
+    return (new.get("platforms") or {}).get(platform) != ((old or {}).get("platforms") or {}).get(platform)
+
+
+def parts_for(payload: Dict[str, Any] | None, platform: str, user_id: str) -> Dict[str, Any] | None:
+    """compose_message-style parts for `platform`, or None if the payload can't serve it."""
+    if not covers(payload, platform):
+        return None
+    entry = payload["platforms"][platform]
+    media = entry.get("media") or {}
+    return {
+        "message": entry.get("message", ""),
+        "title": entry.get("title"),
+        "description": entry.get("description", ""),
+        "hashtags": entry.get("hashtags", []),
+        "image_url": resolve_media_url(media, "image", user_id),
+        "video_url": resolve_media_url(media, "video", user_id),
+    }
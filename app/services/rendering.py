@@ -0,0 +1,222 @@
+"""
+Per-platform message rendering
+------------------------------
+
+One declarative template per platform turns a `marketing_content[platform]`
+block into the text we post:
+
+    twitter    caption · text · hashtags      280, weighted (twitter-text)
+    facebook   caption · text · hashtags      63,206 characters
+    instagram  caption · hashtags             2,200 characters, 30 hashtags
+    youtube    caption · call_to_action · hashtags, title of 100 characters
+
+Hashtags are normalised (`#tag`, punctuation stripped) and deduplicated
+case-insensitively.  Text over the limit loses trailing hashtags first,
+then is cut at a grapheme boundary (never inside an emoji or a URL) with
+an ellipsis.  Rendering is memoised by a hash of the block, so the
+scheduler, native scheduling and the posting endpoints share one result.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+ELLIPSIS = "…"
+# rendered blocks kept in memory
+CACHE_SIZE = 2048
+
+_URL = re.compile(r"https?://\S+")
+
+
+# ────────────────────────────────────────────────────────────────────
+# graphemes and length
+# ────────────────────────────────────────────────────────────────────
+def _extends(ch: str) -> bool:
+    """True for code points that attach to the previous grapheme."""
+    cp = ord(ch)
+    return (
+        unicodedata.combining(ch) != 0
+        or unicodedata.category(ch) in ("Mn", "Me", "Mc")
+        or 0xFE00 <= cp <= 0xFE0F          # variation selectors
+        or 0x1F3FB <= cp <= 0x1F3FF        # skin tones
+        or 0xE0020 <= cp <= 0xE007F        # tag sequences (flags)
+        or cp == 0x20E3                    # keycap
+    )
+
+
+def _regional(ch: str) -> bool:
+    return 0x1F1E6 <= ord(ch) <= 0x1F1FF
+
+
+def graphemes(text: str) -> List[str]:
+    """User-perceived characters: combining marks, ZWJ emoji and flags stay whole."""
+    out: List[str] = []
+    i = 0
+    while i < len(text):
+        cluster = text[i]
+        i += 1
+        if _regional(cluster) and i < len(text) and _regional(text[i]):
+            cluster += text[i]
+            i += 1
+        while i < len(text):
+            if _extends(text[i]):
+                cluster += text[i]
+                i += 1
+            elif text[i] == "\u200d" and i + 1 < len(text):
+                cluster += text[i:i + 2]
+                i += 2
+            else:
+                break
+        out.append(cluster)
+    return out
+
+
+def _tokens(text: str) -> List[str]:
+    """Graphemes, with each URL kept as one token."""
+    out: List[str] = []
+    pos = 0
+    for match in _URL.finditer(text):
+        out.extend(graphemes(text[pos:match.start()]))
+        out.append(match.group())
+        pos = match.end()
+    out.extend(graphemes(text[pos:]))
+    return out
+
+
+# twitter-text: these ranges weigh 1, everything else 2, URLs 23
+_LIGHT = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+
+
+def _twitter_weight(token: str) -> int:
+    if _URL.fullmatch(token):
+        return 23
+    if len(token) > 1 and any(
+        ord(c) >= 0x1F000 or c in "\u200d\ufe0f" or _regional(c) for c in token
+    ):
+        return 2  # emoji sequence
+    return sum(1 if any(lo <= ord(c) <= hi for lo, hi in _LIGHT) else 2 for c in token)
+
+
+def _char_weight(token: str) -> int:
+    return 1
+
+
+def length(text: str, weight: Callable[[str], int] = _char_weight) -> int:
+    return sum(weight(t) for t in _tokens(text))
+
+
+def truncate(text: str, limit: int, weight: Callable[[str], int] = _char_weight) -> str:
+    """`text` cut to `limit` at a token boundary, with an ellipsis when cut."""
+    tokens = _tokens(text)
+    if sum(weight(t) for t in tokens) <= limit:
+        return text
+    budget = limit - weight(ELLIPSIS)
+    kept: List[str] = []
+    for token in tokens:
+        budget -= weight(token)
+        if budget < 0:
+            break
+        kept.append(token)
+    return "".join(kept).rstrip() + ELLIPSIS
+
+
+# ────────────────────────────────────────────────────────────────────
+# templates
+# ────────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class Template:
+    sections: Tuple[str, ...]              # content fields, in order
+    limit: int
+    weight: Callable[[str], int] = _char_weight
+    max_hashtags: int | None = None
+    title_limit: int | None = None
+
+
+TEMPLATES: Dict[str, Template] = {
+    "twitter": Template(("caption", "text"), 280, weight=_twitter_weight),
+    "facebook": Template(("caption", "text"), 63206),
+    "instagram": Template(("caption",), 2200, max_hashtags=30),
+    "youtube": Template(("caption", "call_to_action"), 5000, title_limit=100),
+}
+DEFAULT_TEMPLATE = Template(("caption",), 63206)
+ALIASES = {"x": "twitter"}
+
+
+def template_for(platform: str) -> Template:
+    return TEMPLATES.get(ALIASES.get(platform, platform), DEFAULT_TEMPLATE)
+
+
+def normalize_hashtags(raw: Any, limit: int | None = None) -> List[str]:
+    """`#tag` list from a list or a whitespace / comma separated string, deduplicated."""
+    items = raw.replace(",", " ").split() if isinstance(raw, str) else list(raw or [])
+    tags: List[str] = []
+    seen = set()
+    for item in items:
+        tag = re.sub(r"\W", "", unicodedata.normalize("NFC", str(item)))
+        key = tag.casefold()
+        if not tag or tag.isdigit() or key in seen:
+            continue
+        seen.add(key)
+        tags.append(f"#{tag}")
+    return tags[:limit] if limit is not None else tags
+
+
+def fit_text(platform: str, text: str) -> str:
+    """Free text (posting endpoints) cut to the platform's limit."""
+    tpl = template_for(platform)
+    return truncate(text, tpl.limit, tpl.weight)
+
+
+def fit_title(platform: str, text: str) -> str:
+    """Single-line title within the platform's title limit."""
+    tpl = template_for(platform)
+    title = " ".join(text.split())
+    return truncate(title, tpl.title_limit, tpl.weight) if tpl.title_limit else title
+
+
+def _render(platform: str, block: Dict[str, Any]) -> Dict[str, Any]:
+    tpl = template_for(platform)
+    content = block.get("content", {}) or {}
+    body = "\n\n".join(
+        s for s in ((content.get(name) or "").strip() for name in tpl.sections) if s
+    )
+    hashtags = normalize_hashtags(content.get("hashtags") or content.get("tags"), tpl.max_hashtags)
+
+    # over the limit: drop trailing hashtags first, then cut the text
+    kept = list(hashtags)
+    message = "\n\n".join(p for p in (body, " ".join(kept)) if p)
+    while kept and length(message, tpl.weight) > tpl.limit:
+        kept.pop()
+        message = "\n\n".join(p for p in (body, " ".join(kept)) if p)
+    message = truncate(message, tpl.limit, tpl.weight)
+
+    return {
+        "message": message,
+        "title": (fit_title(platform, message) or "Untitled Video") if tpl.title_limit else None,
+        "description": (content.get("description") or "").strip(),
+        "hashtags": kept,
+    }
+
+
+_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def render(platform: str, block: Dict[str, Any]) -> Dict[str, Any]:
+    """Text parts for one marketing_content block (message, title, description, hashtags)."""
+    digest = hashlib.sha256(
+        json.dumps([platform, block.get("content")], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    hit = _cache.get(digest)
+    if hit is not None:
+        _cache.move_to_end(digest)
+        return dict(hit)
+    rendered = _render(platform, block)
+    _cache[digest] = rendered
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return dict(rendered)
@@ -0,0 +1,356 @@
+"""
+Resumable client uploads (tus-style)
+------------------------------------
+
+    POST  /uploads            → open a session for `length` bytes
+    PATCH /uploads/{id}       → append bytes at `Upload-Offset`
+    HEAD  /uploads/{id}       → current `Upload-Offset` (resume point)
+
+Bytes are assembled in `<upload_dir>/<id>.part` on local disk; the session
+(offset, target, status) lives in a session store – Firestore in
+production, JSON files under `upload_dir` for tests / local runs.  When the
+last byte arrives the file is handed to the YouTube, Facebook or Twitter
+upload path and the session records the outcome.
+
+The assembled file only exists on the instance that received the PATCHes,
+so deployments with several API instances need session affinity.  PATCHes
+to one upload are serialised on that instance (`_exclusive`).
+
+Sessions expire `upload_session_ttl_hours` after they were opened: an
+expired upload answers 410 and the next sweep (started by uploads opened
+on the instance, at most every `upload_sweep_interval_minutes`) deletes
+the session and its `.part` file.  Firestore TTL removes expired session
+docs whose instance is gone (ephemeral.py).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Protocol
+
+from app.core.config import get_settings
+from app.models.firestore_db import FirestoreSession
+from app.services import facebook_service as fb
+from app.services import connections, media_budget
+from app.services.twitter_service import post_tweet_for_user
+from app.services.youtube_service import upload_stream
+
+settings = get_settings()
+
+COLLECTION = "upload_sessions"
+
+
+class UploadOffsetMismatch(ValueError):
+    """PATCH sent with an offset that is not the session's current offset."""
+
+
+class UploadTooLarge(ValueError):
+    """PATCH would write past the declared upload length."""
+
+
+class UploadExpired(ValueError):
+    """The session's expires_at has passed."""
+
+
+class UploadClosed(ValueError):
+    """PATCH to an upload that is no longer receiving bytes."""
+
+
+# ────────────────────────────────────────────────────────────────────
+# session stores
+# ────────────────────────────────────────────────────────────────────
+class UploadSessionStore(Protocol):
+    async def create(self, data: Dict[str, Any]) -> str: ...
+    async def get(self, upload_id: str) -> Dict[str, Any] | None: ...
+    async def update(self, upload_id: str, data: Dict[str, Any]) -> None: ...
+    async def delete(self, upload_id: str) -> None: ...
+
+
+class FirestoreUploadSessionStore:
+    def __init__(self, db: FirestoreSession):
+        self.db = db
+
+    async def create(self, data: Dict[str, Any]) -> str:
+        return await self.db.add(COLLECTION, data)
+
+    async def get(self, upload_id: str) -> Dict[str, Any] | None:
+        return await self.db.get(COLLECTION, upload_id)
+
+    async def update(self, upload_id: str, data: Dict[str, Any]) -> None:
+        await self.db.update(COLLECTION, upload_id, data)
+
+    async def delete(self, upload_id: str) -> None:
+        await self.db.delete(COLLECTION, upload_id)
+
+
+class LocalUploadSessionStore:
+    """Sessions as `<root>/<id>.json` – for tests and running without Firestore."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.json"
+
+    async def create(self, data: Dict[str, Any]) -> str:
+        upload_id = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        self._write(upload_id, {**data, "created_at": now, "modified_at": now})
+        return upload_id
+
+    async def get(self, upload_id: str) -> Dict[str, Any] | None:
+        path = self._path(upload_id)
+        if not path.exists():
+            return None
+        raw = json.loads(path.read_text())
+        for key in ("created_at", "modified_at", "expires_at"):
+            if raw.get(key):
+                raw[key] = datetime.fromisoformat(raw[key])
+        return {"id": upload_id, **raw}
+
+    async def update(self, upload_id: str, data: Dict[str, Any]) -> None:
+        current = await self.get(upload_id) or {}
+        current.pop("id", None)
+        self._write(upload_id, {**current, **data, "modified_at": datetime.now(timezone.utc)})
+
+    async def delete(self, upload_id: str) -> None:
+        self._path(upload_id).unlink(missing_ok=True)
+
+    def _write(self, upload_id: str, data: Dict[str, Any]) -> None:
+        tmp = self._path(upload_id).with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, default=lambda v: v.isoformat()))
+        tmp.replace(self._path(upload_id))
+
+
+def upload_dir() -> Path:
+    path = Path(settings.upload_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def part_path(upload_id: str) -> Path:
+    return upload_dir() / f"{upload_id}.part"
+
+
+def expired(session: Dict[str, Any], now: datetime | None = None) -> bool:
+    expires = session.get("expires_at")
+    return isinstance(expires, datetime) and expires <= (now or datetime.now(timezone.utc))
+
+
+# upload id → lock held by the PATCH writing it, and how many PATCHes use it
+_locks: Dict[str, asyncio.Lock] = {}
+_lock_users: Counter = Counter()
+
+
+@asynccontextmanager
+async def _exclusive(upload_id: str) -> AsyncIterator[None]:
+    lock = _locks.setdefault(upload_id, asyncio.Lock())
+    _lock_users[upload_id] += 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _lock_users[upload_id] -= 1
+        if _lock_users[upload_id] <= 0:
+            del _lock_users[upload_id]
+            _locks.pop(upload_id, None)
+
+
+# ────────────────────────────────────────────────────────────────────
+# protocol operations
+# ────────────────────────────────────────────────────────────────────
+async def create_upload(store: UploadSessionStore, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    if data["length"] > media_budget.disk.capacity:
+        raise media_budget.MediaBudgetExceeded(
+            f"upload of {data['length']} B exceeds the {media_budget.disk.capacity} B transfer budget"
+        )
+    session = {
+        **data,
+        "user_id": user_id,
+        "offset": 0,
+        "status": "uploading",
+        "expires_at": datetime.now(timezone.utc) + timedelta(hours=settings.upload_session_ttl_hours),
+    }
+    upload_id = await store.create(session)
+    part_path(upload_id).touch()
+    return {**session, "id": upload_id}
+
+
+async def append_chunk(
+    store: UploadSessionStore,
+    session: Dict[str, Any],
+    offset: int,
+    body: AsyncIterator[bytes],
+) -> int:
+    """
+    Append `body` at `offset` and persist the new offset.  Whatever arrived
+    before a client disconnect is kept, so the client resumes from there.
+    The PATCH that completes the upload moves it to "publishing".
+    """
+    async with _exclusive(session["id"]):
+        # a PATCH that held the lock before us may have moved the session on
+        session = await store.get(session["id"]) or session
+        if expired(session):
+            raise UploadExpired(f"upload expired at {session['expires_at'].isoformat()}")
+        if session["status"] != "uploading":
+            raise UploadClosed(f"upload is already {session['status']}")
+        if offset != session["offset"]:
+            raise UploadOffsetMismatch(f"expected offset {session['offset']}, got {offset}")
+
+        path = part_path(session["id"])
+        written = offset
+        try:
+            async with media_budget.chunk_buffer():
+                with path.open("r+b" if path.exists() else "wb") as fh:
+                    fh.truncate(offset)  # drop bytes from an unacknowledged PATCH
+                    fh.seek(offset)
+                    async for chunk in body:
+                        if written + len(chunk) > session["length"]:
+                            raise UploadTooLarge(
+                                f"upload is {session['length']} B, PATCH runs past the end"
+                            )
+                        fh.write(chunk)
+                        written += len(chunk)
+        finally:
+            changes: Dict[str, Any] = {}
+            if written != offset:
+                changes["offset"] = written
+            if written == session["length"]:
+                changes["status"] = "publishing"
+            if changes:
+                await store.update(session["id"], changes)
+    return written
+
+
+async def publish_upload(db: FirestoreSession, store: UploadSessionStore, session: Dict[str, Any]) -> None:
+    """Hand a completed upload to its platform and record the outcome."""
+    upload_id = session["id"]
+    await store.update(upload_id, {"status": "publishing"})
+    path = part_path(upload_id)
+    try:
+        result = await _publish(db, session, path)
+    except Exception as exc:
+        print(f"[uploads] publishing {upload_id} to {session['target']} failed: {exc}")
+        await store.update(upload_id, {"status": "failed", "error": str(exc)})
+    else:
+        await store.update(upload_id, {"status": "published", "result": result})
+    finally:
+        path.unlink(missing_ok=True)
+
+
+async def _active_credential(db: FirestoreSession, platform: str, user_id: str) -> Dict[str, Any]:
+    cred = await connections.credential(db, await connections.get(db, user_id), platform)
+    if cred is None:
+        raise RuntimeError(f"no {platform} account connected")
+    return cred
+
+
+async def _publish(db: FirestoreSession, session: Dict[str, Any], path: Path) -> Dict[str, Any]:
+    user_id, params = session["user_id"], session.get("params") or {}
+    target, filename, content_type = session["target"], session["filename"], session["content_type"]
+
+    if target == "youtube":
+        cred = await _active_credential(db, "youtube", user_id)
+        with path.open("rb") as fh:
+            video = await upload_stream(
+                cred["access_token"], fh, session["length"],
+                metadata={
+                    "snippet": {
+                        "title": params.get("title") or filename,
+                        "description": params.get("description", ""),
+                        "categoryId": "22",
+                    },
+                    "status": {"privacyStatus": "public"},
+                },
+                mimetype=content_type,
+            )
+        return {"video_id": video["id"]}
+
+    if target == "facebook":
+        cred = await _active_credential(db, "facebook", user_id)
+        with path.open("rb") as fh:
+            if content_type.startswith("video/"):
+                object_id = await fb.upload_video_file(
+                    cred["page_id"], cred["access_token"], fh, filename,
+                    description=params.get("message"), content_type=content_type,
+                )
+            else:
+                object_id = await fb.upload_photo_file(
+                    cred["page_id"], cred["access_token"], fh, filename,
+                    caption=params.get("message"), content_type=content_type,
+                )
+        return {"post_id": object_id}
+
+    cred = await _active_credential(db, "twitter", user_id)
+    with path.open("rb") as fh:
+        tweet_id = await post_tweet_for_user(
+            cred["access_token"], cred["access_token_secret"],
+            params.get("text", ""), media_files=[(filename, fh)],
+        )
+    return {"tweet_id": tweet_id}
+
+
+def get_upload_store() -> UploadSessionStore:
+    """FastAPI dependency: the configured session store."""
+    if settings.upload_store_backend == "local":
+        return LocalUploadSessionStore(upload_dir() / "sessions")
+    return FirestoreUploadSessionStore(FirestoreSession())
+
+
+async def sweep_expired(store: UploadSessionStore) -> int:
+    """Delete this instance's expired uploads (session and .part); returns how many."""
+    now = datetime.now(timezone.utc)
+    removed = 0
+    for path in upload_dir().glob("*.part"):
+        upload_id = path.stem
+        if upload_id in _locks:
+            continue  # a PATCH is writing it
+        session = await store.get(upload_id)
+        if session is not None and not (session["status"] == "uploading" and expired(session, now)):
+            continue
+        path.unlink(missing_ok=True)
+        if session is not None:
+            await store.delete(upload_id)
+        removed += 1
+    if removed:
+        print(f"[uploads] swept {removed} expired upload(s)")
+    return removed
+
+
+# keeps hand-off and sweep tasks referenced until they finish
+_background: set[asyncio.Task] = set()
+_swept_at: float | None = None
+
+
+def _spawn(coro: Any) -> None:
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def schedule_publish(db: FirestoreSession, store: UploadSessionStore, session: Dict[str, Any]) -> None:
+    _spawn(publish_upload(db, store, session))
+
+
+async def _sweep(store: UploadSessionStore) -> None:
+    try:
+        await sweep_expired(store)
+    except Exception as exc:
+        print(f"[uploads] sweeping expired uploads failed: {exc}")
+
+
+def schedule_sweep(store: UploadSessionStore) -> None:
+    """Sweep expired uploads in the background, at most every upload_sweep_interval_minutes."""
+    global _swept_at
+    now = time.monotonic()
+    if _swept_at is not None and now - _swept_at < settings.upload_sweep_interval_minutes * 60:
+        return
+    _swept_at = now
+    _spawn(_sweep(store))
@@ -0,0 +1,249 @@
+"""
+Bulk schedule writes
+--------------------
+
+Backs POST /scheduler/bulk, /bulk/status and /bulk/delete.  Items are
+validated one by one, written in Firestore batches of at most 500
+operations, and each item gets its own result; a batch that fails to
+commit fails only its own items.  Calendar counters, sync tombstones and
+live events are kept in step exactly as for single-schedule writes; the
+due-bucket index is updated in the same batch as the schedule itself.
+Created schedules carry the same payload snapshot as single creates.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from pydantic import ValidationError
+
+from app.models.enums import ScheduleState
+from app.models.firestore_db import FirestoreSession
+from app.models.schedule import ScheduleCreate
+from app.services import calendar_counters, due_buckets, events, payloads, sync
+from app.services.media_storage import MediaAccessDenied
+from app.services.native_scheduling import cancel_native, needs_native
+
+COLLECTION = "schedules"
+# Firestore's limit on writes per batch
+BATCH_SIZE = 500
+
+# one item's writes: (request index, doc id, ops applied to a WriteBatch)
+Op = Callable[[Any], None]
+Item = Tuple[int, str, List[Op]]
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'item'}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def _result(index: int, doc_id: str | None = None, error: str | None = None) -> Dict[str, Any]:
+    return {"index": index, "id": doc_id, "ok": error is None, "error": error}
+
+
+def _summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ok = sum(1 for r in results if r["ok"])
+    return {"results": results, "succeeded": ok, "failed": len(results) - ok}
+
+
+def _commit(db: FirestoreSession, items: List[Item], results: List[Dict[str, Any] | None]) -> List[Item]:
+    """Write items in batches without splitting one item's ops; returns the committed items."""
+    committed: List[Item] = []
+    chunks: List[List[Item]] = [[]]
+    size = 0
+    for item in items:
+        if size + len(item[2]) > BATCH_SIZE:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(item)
+        size += len(item[2])
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        batch = db.db.batch()
+        for _, _, ops in chunk:
+            for op in ops:
+                op(batch)
+        try:
+            batch.commit()
+        except Exception as exc:
+            print(f"[bulk] batch of {len(chunk)} item(s) failed: {exc}")
+            for index, doc_id, _ in chunk:
+                results[index] = _result(index, doc_id, f"write failed: {exc}")
+        else:
+            for index, doc_id, _ in chunk:
+                results[index] = _result(index, doc_id)
+            committed.extend(chunk)
+    return committed
+
+
+async def _load_owned(
+    db: FirestoreSession,
+    user_id: str,
+    ids: List[str],
+    results: List[Dict[str, Any] | None],
+) -> Dict[int, Dict[str, Any]]:
+    """Fetch the schedules behind `ids`; unknown, foreign or repeated IDs get an error result."""
+    coll = db.db.collection(COLLECTION)
+    unique = list(dict.fromkeys(ids))
+    found: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(unique), BATCH_SIZE):
+        for snap in db.db.get_all([coll.document(doc_id) for doc_id in unique[i:i + BATCH_SIZE]]):
+            if snap.exists:
+                found[snap.id] = {"id": snap.id, **snap.to_dict()}
+
+    owned: Dict[int, Dict[str, Any]] = {}
+    seen: set[str] = set()
+    for index, doc_id in enumerate(ids):
+        sched = found.get(doc_id)
+        if doc_id in seen:
+            results[index] = _result(index, doc_id, "duplicate id in request")
+        elif sched is None:
+            results[index] = _result(index, doc_id, "schedule not found")
+        elif sched.get("user_id") != user_id:
+            results[index] = _result(index, doc_id, "not authorized")
+        else:
+            owned[index] = sched
+        seen.add(doc_id)
+    return owned
+
+
+def _products(db: FirestoreSession, ids: Set[str]) -> Dict[str, Dict[str, Any]]:
+    coll = db.db.collection("products")
+    ordered = sorted(ids)
+    found: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(ordered), BATCH_SIZE):
+        for snap in db.db.get_all([coll.document(pid) for pid in ordered[i:i + BATCH_SIZE]]):
+            if snap.exists:
+                found[snap.id] = snap.to_dict()
+    return found
+
+
+# ────────────────────────────────────────────────────────────────────
+# operations
+# ────────────────────────────────────────────────────────────────────
+async def create_many(db: FirestoreSession, user_id: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    results: List[Dict[str, Any] | None] = [None] * len(items)
+    coll = db.db.collection(COLLECTION)
+    docs: Dict[str, Dict[str, Any]] = {}
+    writes: List[Item] = []
+
+    valid: List[Tuple[int, ScheduleCreate]] = []
+    for index, raw in enumerate(items):
+        try:
+            valid.append((index, ScheduleCreate.model_validate(raw)))
+        except ValidationError as exc:
+            results[index] = _result(index, error=_validation_message(exc))
+
+    # one read per distinct product for the payload snapshots
+    products = _products(db, {str(data.product_id) for _, data in valid if data.product_id})
+
+    for index, data in valid:
+        doc = data.model_dump()
+        doc["product_id"] = str(data.product_id) if data.product_id else None
+        doc["user_id"] = user_id
+        doc["status"] = ScheduleState.upcoming
+        doc["created_at"] = datetime.utcnow()
+        doc["modified_at"] = datetime.utcnow()
+        product = products.get(doc["product_id"])
+        if product:
+            try:
+                payloads.check_media(product, data.platforms, user_id)
+            except MediaAccessDenied as exc:
+                results[index] = _result(index, error=f"not authorized to use media object {exc}")
+                continue
+            doc["payload"] = payloads.snapshot(product, data.platforms)
+        doc["native_pending"] = needs_native(doc)
+
+        ref = coll.document()
+        docs[ref.id] = doc
+        writes.append((index, ref.id, [
+            lambda batch, ref=ref, doc=doc: batch.set(ref, doc),
+            *due_buckets.ops(db, ref.id, None, doc),
+        ]))
+
+    committed = _commit(db, writes, results)
+    await calendar_counters.record_changes(db, [(None, docs[doc_id]) for _, doc_id, _ in committed])
+    for _, doc_id, _ in committed:
+        events.publish_schedule(doc_id, docs[doc_id])
+    return _summary(results)
+
+
+async def update_status_many(
+    db: FirestoreSession,
+    user_id: str,
+    ids: List[str],
+    status: ScheduleState,
+) -> Dict[str, Any]:
+    results: List[Dict[str, Any] | None] = [None] * len(ids)
+    owned = await _load_owned(db, user_id, ids, results)
+    coll = db.db.collection(COLLECTION)
+
+    # schedules leaving `upcoming` must not be published by the platform either
+    leaving = [
+        sched for sched in owned.values()
+        if sched.get("native") and sched.get("status") == ScheduleState.upcoming
+        and status != ScheduleState.upcoming
+    ]
+    await asyncio.gather(*(cancel_native(db, sched) for sched in leaving))
+    cancelled = {sched["id"] for sched in leaving}
+
+    # every doc gets its own modified_at so sync cursors can page through them
+    now = datetime.utcnow()
+    changes: Dict[int, Dict[str, Any]] = {}
+    for n, (index, sched) in enumerate(owned.items()):
+        change = {
+            "status": status,
+            "modified_at": now + timedelta(microseconds=n),
+            **({"native": {}} if sched["id"] in cancelled else {}),
+        }
+        change["native_pending"] = needs_native({**sched, **change})
+        changes[index] = change
+
+    writes: List[Item] = [
+        (index, sched["id"], [
+            lambda batch, ref=coll.document(sched["id"]), data=changes[index]: batch.update(ref, data),
+            *due_buckets.ops(db, sched["id"], sched, {**sched, **changes[index]}),
+        ])
+        for index, sched in owned.items()
+    ]
+    committed = _commit(db, writes, results)
+    await calendar_counters.record_changes(
+        db, [(owned[index], {**owned[index], **changes[index]}) for index, _, _ in committed]
+    )
+    for index, doc_id, _ in committed:
+        events.publish_schedule(doc_id, {**owned[index], **changes[index]})
+    return _summary(results)
+
+
+async def delete_many(db: FirestoreSession, user_id: str, ids: List[str]) -> Dict[str, Any]:
+    results: List[Dict[str, Any] | None] = [None] * len(ids)
+    owned = await _load_owned(db, user_id, ids, results)
+
+    # withdraw platform-side scheduled posts first, as delete_schedule does
+    await asyncio.gather(*(
+        cancel_native(db, sched) for sched in owned.values()
+        if sched.get("native") and sched.get("status") == ScheduleState.upcoming
+    ))
+
+    coll = db.db.collection(COLLECTION)
+    tombstones = db.db.collection(sync.TOMBSTONES)
+    writes: List[Item] = [
+        (index, sched["id"], [
+            lambda batch, ref=coll.document(sched["id"]): batch.delete(ref),
+            lambda batch, doc_id=sched["id"]: batch.set(
+                tombstones.document(), sync.tombstone(COLLECTION, doc_id, user_id)
+            ),
+            *due_buckets.ops(db, sched["id"], sched, None),
+        ])
+        for index, sched in owned.items()
+    ]
+    committed = _commit(db, writes, results)
+    await calendar_counters.record_changes(db, [(owned[index], None) for index, _, _ in committed])
+    for _, doc_id, _ in committed:
+        events.broker.publish(user_id, {"type": "schedule_deleted", "id": doc_id})
+    return _summary(results)
@@ -0,0 +1,121 @@
+"""
+Single-schedule writes with their index entries
+-----------------------------------------------
+
+A schedule's entry in the due-bucket index (due_buckets.py) and its
+calendar counts (calendar_counters.py) are written in the same batch or
+transaction as the schedule itself, as the bulk writes do, so a failed
+index write can never leave a schedule that the worker does not find:
+
+    create(db, doc)                   batch: set + index ops
+    update(db, schedule_id, decide)   transaction: re-read, update + index ops
+    delete(db, schedule_id, also)     transaction: re-read, delete + index ops
+
+`update` and `delete` derive these changes from the document as the
+transaction reads it, not from an earlier copy.  `decide(current)` gets
+that document (None if it is gone) and returns the changes to write, or
+None to write nothing.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Dict, List, Tuple
+
+from google.cloud import firestore
+
+from app.models.firestore_db import FirestoreSession
+from app.services import calendar_counters, due_buckets
+
+COLLECTION = "schedules"
+
+# one write applied to a WriteBatch or Transaction
+Op = Callable[[Any], None]
+Decide = Callable[[Dict[str, Any] | None], Dict[str, Any] | None]
+Change = Tuple[Dict[str, Any], Dict[str, Any]]
+
+
+def merged(doc: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    """`doc` with `changes` applied, dotted field paths included."""
+    out = dict(doc)
+    for path, value in changes.items():
+        node = out
+        *parents, leaf = path.split(".")
+        for key in parents:
+            node[key] = dict(node.get(key) or {})
+            node = node[key]
+        node[leaf] = value
+    return out
+
+
+def derived_ops(
+    db: FirestoreSession,
+    schedule_id: str,
+    before: Dict[str, Any] | None,
+    after: Dict[str, Any] | None,
+) -> List[Op]:
+    """Writes of derived data that go with moving a schedule from `before` to `after`."""
+    return [
+        *due_buckets.ops(db, schedule_id, before, after),
+        *calendar_counters.ops(db, before, after),
+    ]
+
+
+def _create(db: FirestoreSession, doc: Dict[str, Any]) -> str:
+    ref = db.db.collection(COLLECTION).document()
+    batch = db.db.batch()
+    batch.set(ref, doc)
+    for op in derived_ops(db, ref.id, None, doc):
+        op(batch)
+    batch.commit()
+    return ref.id
+
+
+async def create(db: FirestoreSession, doc: Dict[str, Any]) -> str:
+    """Write a new schedule; returns its ID."""
+    return await asyncio.to_thread(_create, db, doc)
+
+
+def _update(db: FirestoreSession, schedule_id: str, decide: Decide) -> Change | None:
+    ref = db.db.collection(COLLECTION).document(schedule_id)
+
+    @firestore.transactional
+    def run(transaction: Any) -> Change | None:
+        snap = ref.get(transaction=transaction)
+        before = {"id": snap.id, **snap.to_dict()} if snap.exists else None
+        changes = decide(before)
+        if before is None or not changes:
+            return None
+        after = merged(before, changes)
+        transaction.update(ref, changes)
+        for op in derived_ops(db, schedule_id, before, after):
+            op(transaction)
+        return before, after
+
+    return run(db.db.transaction())
+
+
+async def update(db: FirestoreSession, schedule_id: str, decide: Decide) -> Change | None:
+    """Apply `decide`'s changes to the current schedule; returns (before, after), or None if nothing was written."""
+    return await asyncio.to_thread(_update, db, schedule_id, decide)
+
+
+def _delete(db: FirestoreSession, schedule_id: str, also: List[Op]) -> Dict[str, Any] | None:
+    ref = db.db.collection(COLLECTION).document(schedule_id)
+
+    @firestore.transactional
+    def run(transaction: Any) -> Dict[str, Any] | None:
+        snap = ref.get(transaction=transaction)
+        if not snap.exists:
+            return None
+        before = {"id": snap.id, **snap.to_dict()}
+        transaction.delete(ref)
+        for op in [*derived_ops(db, schedule_id, before, None), *also]:
+            op(transaction)
+        return before
+
+    return run(db.db.transaction())
+
+
+async def delete(db: FirestoreSession, schedule_id: str, also: List[Op] | None = None) -> Dict[str, Any] | None:
+    """Delete a schedule together with `also`; returns it as deleted, or None if it was gone."""
+    return await asyncio.to_thread(_delete, db, schedule_id, also or [])
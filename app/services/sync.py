@@ -0,0 +1,164 @@
+"""
+Incremental "changes since" sync
+--------------------------------
+
+List endpoints hand out an opaque cursor (`X-Sync-Cursor` header on a full
+listing, `cursor` in every change set).  Calling them again with
+`?since=<cursor>` returns only the user's docs whose `modified_at` is at or
+after the cursor, plus the IDs deleted since then (from `tombstones`):
+
+    {"changes": [...], "deleted": ["id", ...], "cursor": "...", "has_more": false}
+
+The cursor holds a `(modified_at, doc id)` position per stream (changes
+and tombstones); pages are ordered by `modified_at, __name__` and resume
+with `start_after`, so any number of docs sharing one timestamp (a bulk
+update) are paged through instead of returning the same page forever.
+
+`modified_at` is stamped by the writing instance, not by Firestore, so a
+new cursor trails "now" by `sync_overlap_seconds`: a write that commits a
+little after its timestamp is still picked up, at the price of clients
+occasionally seeing a doc twice (apply changes as upserts).
+
+Queries use the (user_id, modified_at) composite indexes in
+firestore.indexes.json.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.models.firestore_db import FirestoreSession
+
+settings = get_settings()
+
+TOMBSTONES = "tombstones"
+
+# (modified_at, last doc id returned at that timestamp, or None = from the start of it)
+Position = Tuple[datetime, Optional[str]]
+# stream ("changes" / "deleted") → position
+Cursor = Dict[str, Position]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorExpired(ValueError):
+    """The cursor predates the tombstone retention; resync in full."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _at(ts: datetime) -> Cursor:
+    return {"changes": (ts, None), "deleted": (ts, None)}
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    raw = {
+        stream: [ts.astimezone(timezone.utc).isoformat(), doc_id]
+        for stream, (ts, doc_id) in cursor.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+
+
+def _timestamp(value: str) -> datetime:
+    ts = datetime.fromisoformat(value)
+    if ts.tzinfo is None:
+        raise ValueError("naive timestamp")
+    return ts
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        text = base64.urlsafe_b64decode(cursor.encode()).decode()
+        if text.startswith("{"):
+            raw = json.loads(text)
+            decoded: Cursor = {
+                stream: (_timestamp(raw[stream][0]), raw[stream][1]) for stream in ("changes", "deleted")
+            }
+        else:
+            # cursors handed out before positions carried a doc id
+            decoded = _at(_timestamp(text))
+    except (ValueError, KeyError, IndexError, TypeError) as exc:
+        raise InvalidCursor("malformed sync cursor") from exc
+    oldest = min(ts for ts, _ in decoded.values())
+    if oldest < _now() - timedelta(days=settings.sync_tombstone_ttl_days):
+        raise CursorExpired("sync cursor is too old, list everything again")
+    return decoded
+
+
+def current_cursor() -> str:
+    """Cursor to hand out with a full listing."""
+    return encode_cursor(_at(_now() - timedelta(seconds=settings.sync_overlap_seconds)))
+
+
+def tombstone(collection: str, doc_id: str, user_id: str) -> Dict[str, Any]:
+    """Tombstone doc for a deletion (also used by batched writers)."""
+    return {
+        "collection": collection,
+        "doc_id": doc_id,
+        "user_id": user_id,
+        "expires_at": _now() + timedelta(days=settings.sync_tombstone_ttl_days),
+        "created_at": datetime.utcnow(),
+        "modified_at": datetime.utcnow(),
+    }
+
+
+async def record_deletion(db: FirestoreSession, collection: str, doc_id: str, user_id: str) -> None:
+    await db.add(TOMBSTONES, tombstone(collection, doc_id, user_id))
+
+
+async def _page(
+    db: FirestoreSession,
+    collection: str,
+    filters: List[Tuple[str, str, Any]],
+    position: Position,
+    limit: int,
+) -> List[Dict[str, Any]]:
+    ts, doc_id = position
+    return await db.query(
+        collection,
+        filters=[*filters, ("modified_at", ">=", ts)],
+        order_by=["modified_at", "__name__"],
+        start_after={"modified_at": ts, "__name__": doc_id} if doc_id else None,
+        limit=limit,
+    )
+
+
+async def changes_since(
+    db: FirestoreSession,
+    collection: str,
+    user_id: str,
+    since: Cursor,
+) -> Dict[str, Any]:
+    limit = settings.sync_page_size
+    changed = await _page(db, collection, [("user_id", "==", user_id)], since["changes"], limit)
+    tombstones = await _page(
+        db, TOMBSTONES,
+        [("user_id", "==", user_id), ("collection", "==", collection)],
+        since["deleted"], limit,
+    )
+
+    # a full page means that stream may have more: it continues after its
+    # last doc; a stream that returned everything moves up to now (less the
+    # overlap)
+    caught_up = _now() - timedelta(seconds=settings.sync_overlap_seconds)
+    cursor: Cursor = {}
+    for stream, rows in (("changes", changed), ("deleted", tombstones)):
+        if len(rows) == limit:
+            cursor[stream] = (rows[-1]["modified_at"], rows[-1]["id"])
+        else:
+            ts, doc_id = since[stream]
+            cursor[stream] = (caught_up, None) if caught_up > ts else (ts, doc_id)
+
+    return {
+        "changes": changed,
+        "deleted": [t["doc_id"] for t in tombstones],
+        "cursor": encode_cursor(cursor),
+        "has_more": len(changed) == limit or len(tombstones) == limit,
+    }
@@ -0,0 +1,253 @@
+"""
+Proactive OAuth token refresh
+-----------------------------
+
+Tokens are renewed in the background before they expire and written back
+to their credential doc (and user_connections), so a dispatch always
+finds a live token:
+
+    youtube    access token, 1 h     refresh_token grant     expires_at
+    instagram  long-lived, 60 days   fb_exchange_token        token_expires_at
+
+Every `token_refresh_interval_seconds` the scheduler reads the active
+credentials whose expiry falls inside the margin, soonest first (index on
+is_active + expiry field), until it has `token_refresh_batch` to refresh
+per collection, and refreshes them with at most
+`token_refresh_concurrency` requests in flight.  Older YouTube
+credentials without an is_active flag get it from their first health
+check (credential_health.py).
+
+A refresh that fails is recorded on the credential (`refresh_error`,
+`refresh_failed_at`, `refresh_failures`) and retried after a backoff that
+doubles per failure, from `token_refresh_backoff_minutes` up to
+`token_refresh_backoff_max_minutes`.  A grant the platform rejects for
+good (Google `invalid_grant`, Graph error 190) deactivates the credential
+like a failed health check (credential_health.py); reconnecting through
+OAuth makes it active again.
+
+`fresh()` covers the gap for a dispatch that still meets a token about to
+expire (e.g. right after a deploy): it refreshes inline and saves.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.models.firestore_db import FirestoreSession
+from app.services import connections
+
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+GRAPH_TOKEN_URL = "https://graph.facebook.com/v23.0/oauth/access_token"
+
+# platform → (credential collection, expiry field)
+EXPIRY_FIELDS = {
+    "youtube": ("youtube_credentials", "expires_at"),
+    "instagram": ("instagram_credentials", "token_expires_at"),
+}
+
+# Graph API error code of an expired / revoked access token
+GRAPH_INVALID_TOKEN = 190
+
+_refreshed = metrics.counter("oauth_token_refresh_total", "OAuth token refreshes, by platform and outcome")
+
+
+def _expiry(value: Any) -> datetime | None:
+    """Expiry as an aware UTC datetime; older YouTube credentials store ISO strings."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _margin(platform: str) -> timedelta:
+    settings = get_settings()
+    if platform == "youtube":
+        return timedelta(minutes=settings.youtube_refresh_margin_minutes)
+    return timedelta(days=settings.instagram_refresh_margin_days)
+
+
+async def _youtube(cred: Dict[str, Any]) -> Dict[str, Any]:
+    settings = get_settings()
+    async with httpx.AsyncClient(timeout=30) as client:
+        r = await client.post(GOOGLE_TOKEN_URL, data={
+            "client_id": settings.youtube_client_id,
+            "client_secret": settings.youtube_client_secret,
+            "refresh_token": cred["refresh_token"],
+            "grant_type": "refresh_token",
+        })
+    r.raise_for_status()
+    data = r.json()
+    changes = {
+        "access_token": data["access_token"],
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=data.get("expires_in", 3600)),
+    }
+    if data.get("refresh_token"):
+        changes["refresh_token"] = data["refresh_token"]
+    return changes
+
+
+async def _instagram(cred: Dict[str, Any]) -> Dict[str, Any]:
+    settings = get_settings()
+    async with httpx.AsyncClient(timeout=30) as client:
+        r = await client.get(GRAPH_TOKEN_URL, params={
+            "grant_type": "fb_exchange_token",
+            "client_id": settings.facebook_app_id,
+            "client_secret": settings.facebook_app_secret,
+            "fb_exchange_token": cred["access_token"],
+        })
+    r.raise_for_status()
+    data = r.json()
+    return {
+        "access_token": data["access_token"],
+        "token_expires_at": datetime.now(timezone.utc) + timedelta(seconds=data.get("expires_in", 60 * 86400)),
+    }
+
+
+REFRESHERS = {"youtube": _youtube, "instagram": _instagram}
+
+
+def _revoked(platform: str, exc: Exception) -> bool:
+    """True if the platform rejected the grant itself, so retrying cannot help."""
+    if not isinstance(exc, httpx.HTTPStatusError) or exc.response.status_code not in (400, 401):
+        return False
+    try:
+        body = exc.response.json()
+    except ValueError:
+        return False
+    if platform == "youtube":
+        return body.get("error") == "invalid_grant"
+    return (body.get("error") or {}).get("code") == GRAPH_INVALID_TOKEN
+
+
+def _backoff(failures: int) -> timedelta:
+    settings = get_settings()
+    minutes = settings.token_refresh_backoff_minutes * 2 ** max(0, failures - 1)
+    return timedelta(minutes=min(minutes, settings.token_refresh_backoff_max_minutes))
+
+
+def _backing_off(cred: Dict[str, Any], now: datetime) -> bool:
+    failed_at = _expiry(cred.get("refresh_failed_at"))
+    failures = cred.get("refresh_failures") or 0
+    return bool(failed_at and failures and failed_at + _backoff(failures) > now)
+
+
+async def _deactivate(db: FirestoreSession, platform: str, cred: Dict[str, Any], reason: str) -> None:
+    collection, _ = EXPIRY_FIELDS[platform]
+    changes = {"is_active": False, "inactive_reason": reason, "inactive_at": datetime.now(timezone.utc)}
+    await db.update(collection, cred["id"], changes)
+    if cred.get("user_id"):
+        await connections.record(db, cred["user_id"], platform, cred["id"], {**cred, **changes})
+    print(f"[token_refresh] {platform}/{cred['id']} of {cred.get('user_id')} deactivated: {reason}")
+
+
+async def refresh(db: FirestoreSession, platform: str, cred: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Refresh one credential and save it; returns the updated credential, or None on failure."""
+    collection, _ = EXPIRY_FIELDS[platform]
+    now = datetime.now(timezone.utc)
+    try:
+        changes = await REFRESHERS[platform](cred)
+    except Exception as exc:
+        detail = exc.response.text[:200] if isinstance(exc, httpx.HTTPStatusError) else str(exc)
+        print(f"[token_refresh] {platform}/{cred['id']} failed: {detail}")
+        try:
+            if _revoked(platform, exc):
+                _refreshed.inc(platform=platform, outcome="revoked")
+                await _deactivate(db, platform, cred, f"token refresh rejected: {detail}")
+            else:
+                _refreshed.inc(platform=platform, outcome="error")
+                await db.update(collection, cred["id"], {
+                    "refresh_error": detail,
+                    "refresh_failed_at": now,
+                    "refresh_failures": (cred.get("refresh_failures") or 0) + 1,
+                })
+        except Exception as write_exc:
+            print(f"[token_refresh] recording the failure of {platform}/{cred['id']} failed: {write_exc}")
+        return None
+
+    return await save(db, platform, cred, changes)
+
+
+async def save(db: FirestoreSession, platform: str, cred: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Write a refreshed token to the credential and user_connections."""
+    collection, _ = EXPIRY_FIELDS[platform]
+    now = datetime.now(timezone.utc)
+    changes = {**changes, "refreshed_at": now, "updated_at": now, "refresh_error": None, "refresh_failures": 0}
+    await db.update(collection, cred["id"], changes)
+    updated = {**cred, **changes}
+    if cred.get("user_id"):
+        await connections.record(db, cred["user_id"], platform, cred["id"], updated)
+    _refreshed.inc(platform=platform, outcome="ok")
+    return updated
+
+
+async def _pages(db: FirestoreSession, collection: str, field: str, cutoff: Any, now: datetime) -> List[Dict[str, Any]]:
+    """Active credentials expiring by `cutoff`, soonest first, skipping those backing off."""
+    limit = get_settings().token_refresh_batch
+    due: List[Dict[str, Any]] = []
+    last: Dict[str, Any] | None = None
+    while len(due) < limit:
+        page = await db.query(
+            collection,
+            filters=[("is_active", "==", True), (field, "<=", cutoff)],
+            order_by=[field, "__name__"], start_after=last, limit=limit,
+        )
+        due += [c for c in page if not _backing_off(c, now)]
+        if len(page) < limit:
+            break
+        last = {field: page[-1][field], "__name__": page[-1]["id"]}
+    return due[:limit]
+
+
+async def _due(db: FirestoreSession, platform: str, now: datetime) -> List[Dict[str, Any]]:
+    collection, field = EXPIRY_FIELDS[platform]
+    cutoff = now + _margin(platform)
+    due = await _pages(db, collection, field, cutoff, now)
+    if platform == "youtube":
+        # credentials written before expiry was a timestamp hold an ISO string,
+        # which sorts apart from timestamps; a refresh rewrites them as one
+        due += await _pages(db, collection, field, cutoff.replace(tzinfo=None).isoformat(), now)
+    return due
+
+
+async def refresh_due(db: FirestoreSession) -> int:
+    """Refresh every token expiring within its margin; returns how many were renewed."""
+    now = datetime.now(timezone.utc)
+    gate = asyncio.Semaphore(max(1, get_settings().token_refresh_concurrency))
+
+    async def one(platform: str, cred: Dict[str, Any]) -> bool:
+        async with gate:
+            try:
+                return await refresh(db, platform, cred) is not None
+            except Exception as exc:
+                print(f"[token_refresh] saving {platform}/{cred['id']} failed: {exc}")
+                return False
+
+    jobs = []
+    for platform in EXPIRY_FIELDS:
+        try:
+            jobs += [one(platform, cred) for cred in await _due(db, platform, now)]
+        except Exception as exc:
+            print(f"[token_refresh] reading {platform} credentials failed: {exc}")
+    renewed = sum(await asyncio.gather(*jobs))
+    if jobs:
+        print(f"[token_refresh] renewed {renewed}/{len(jobs)} token(s)")
+    return renewed
+
+
+async def fresh(db: FirestoreSession, platform: str, cred: Dict[str, Any]) -> Dict[str, Any]:
+    """`cred`, refreshed first if its token expires within a minute."""
+    if platform not in EXPIRY_FIELDS:
+        return cred
+    expires = _expiry(cred.get(EXPIRY_FIELDS[platform][1]))
+    if expires is None or expires > datetime.now(timezone.utc) + timedelta(minutes=1):
+        return cred
+    return await refresh(db, platform, cred) or cred
@@ -1,5 +1,6 @@
+import asyncio
 import os
-from typing import Optional, List
+from typing import BinaryIO, Optional, List, Tuple
 import tweepy
 from app.core.config import get_settings
 
@@ -24,16 +25,33 @@ async def post_tweet_for_user(
     access_token: str,
     access_token_secret: str,
     text: str,
-    media_paths: Optional[List[str]] = None
+    media_paths: Optional[List[str]] = None,
+    media_files: Optional[List[Tuple[str, BinaryIO]]] = None,
 ) -> str:
     """
     Posts a Tweet (and optional media) via Twitter API v2.
-    Returns the created Tweet ID.
+    Media is given either as paths or as open (filename, file) pairs, which
+    Tweepy reads in chunks – videos go through the chunked upload endpoint.
+    Returns the created Tweet ID.  Tweepy is blocking, so the work runs in a
+    thread and other dispatches keep going meanwhile.
     """
+    return await asyncio.to_thread(
+        _post_tweet_blocking, access_token, access_token_secret, text,
+        media_paths, media_files,
+    )
+
+
+def _post_tweet_blocking(
+    access_token: str,
+    access_token_secret: str,
+    text: str,
+    media_paths: Optional[List[str]] = None,
+    media_files: Optional[List[Tuple[str, BinaryIO]]] = None,
+) -> str:
     client = get_client_for_user(access_token, access_token_secret)
 
     media_ids = []
-    if media_paths:
+    if media_paths or media_files:
         # Media uploads still use v1.1 under the hood
         twitter_api = tweepy.API(
             tweepy.OAuth1UserHandler(
@@ -43,9 +61,12 @@ async def post_tweet_for_user(
                 access_token_secret
             )
         )
-        for path in media_paths:
+        for path in media_paths or []:
             res = twitter_api.media_upload(path)
             media_ids.append(res.media_id)
+        for filename, fh in media_files or []:
+            res = twitter_api.media_upload(filename, file=fh)
+            media_ids.append(res.media_id)
     
     # Create the tweet
     if media_ids:
@@ -1,12 +1,21 @@
+import asyncio
+import aiohttp
 import httpx, json, pathlib, mimetypes, os
+from datetime import datetime, timezone
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build           # pip install google-api-python-client
 from googleapiclient.http import MediaFileUpload
 from httpx import Timeout
+from typing import Awaitable, BinaryIO, Callable
 from app.core.config import get_settings
+from app.services import media_budget
 
 settings = get_settings()
 
+UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+# resumable chunks must be multiples of 256 KiB
+CHUNK_SIZE = max(1, media_budget.CHUNK_SIZE // (256 * 1024)) * 256 * 1024
+
 def creds_from_tokens(token, refresh, client_id, client_secret):
     return Credentials(token,
                     refresh_token=refresh,
@@ -41,16 +50,33 @@ def creds_from_tokens(token, refresh, client_id, client_secret):
 #         if response and "id" in response:
 #             return response["id"]
 
-async def upload_video_for_user(cred, file_path: str, title: str, desc: str):
+def _youtube_for(cred):
     creds = creds_from_tokens(cred.get("access_token"), cred.get("refresh_token"),
                         settings.youtube_client_id, settings.youtube_client_secret)
-    print(f"***Using credentials: {creds}\n")
-    # creds = cred.get("access_token",""
-    # print(f"Using access token: {creds}")
-    youtube = build("youtube", "v3", credentials=creds)
+    return build("youtube", "v3", credentials=creds)
+
+
+def _rfc3339(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _status_body(publish_at: datetime | None) -> dict:
+    if publish_at is None:
+        return {"privacyStatus": "public"}
+    return {"privacyStatus": "private", "publishAt": _rfc3339(publish_at)}
+
+
+async def upload_video_for_user(cred, file_path: str, title: str, desc: str,
+                                publish_at: datetime | None = None):
+    """
+    Upload `file_path` and return the video ID.  With `publish_at` the video
+    is uploaded private and YouTube flips it public at that time
+    (`status.publishAt`), so nothing has to happen on our side at run_at.
+    """
+    youtube = _youtube_for(cred)
 
     media = MediaFileUpload(file_path,
-                            chunksize=-1,
+                            chunksize=CHUNK_SIZE,
                             resumable=True,
                             mimetype=mimetypes.guess_type(file_path)[0])
     
@@ -60,13 +86,139 @@ async def upload_video_for_user(cred, file_path: str, title: str, desc: str):
         part="snippet,status",
         body={
             "snippet": {"title": title, "description": desc},
-            "status": {"privacyStatus": "public"},
+            "status": _status_body(publish_at),
         },
         media_body=media,
     )
 
-    # resumable loop
-    while True:
-        status, response = request.next_chunk()
-        if response and "id" in response:
-            return response["id"]
+    # resumable loop – googleapiclient is blocking, keep it off the event loop
+    def _upload():
+        while True:
+            status, response = request.next_chunk()
+            if response and "id" in response:
+                return response["id"]
+
+    return await asyncio.to_thread(_upload)
+
+
+async def get_video_status(cred, video_id: str) -> dict | None:
+    """Return the `status` resource of a video, or None if it no longer exists."""
+    youtube = _youtube_for(cred)
+    resp = await asyncio.to_thread(youtube.videos().list(part="status", id=video_id).execute)
+    items = resp.get("items", [])
+    return items[0]["status"] if items else None
+
+
+async def set_publish_at(cred, video_id: str, publish_at: datetime) -> None:
+    youtube = _youtube_for(cred)
+    request = youtube.videos().update(
+        part="status",
+        body={"id": video_id,
+              "status": {"privacyStatus": "private", "publishAt": _rfc3339(publish_at)}},
+    )
+    await asyncio.to_thread(request.execute)
+
+
+async def delete_video(cred, video_id: str) -> None:
+    await asyncio.to_thread(_youtube_for(cred).videos().delete(id=video_id).execute)
+
+
+async def _open_session(client: httpx.AsyncClient, headers: dict, size: int, metadata: dict, mimetype: str) -> str:
+    init = await client.post(
+        UPLOAD_URL,
+        params={"uploadType": "resumable", "part": ",".join(metadata)},
+        headers={
+            **headers,
+            "X-Upload-Content-Length": str(size),
+            "X-Upload-Content-Type": mimetype,
+        },
+        json=metadata,
+    )
+    init.raise_for_status()
+    return init.headers["Location"]
+
+
+async def _send_chunk(
+    client: httpx.AsyncClient, headers: dict, session_url: str, chunk: bytes, offset: int, size: int,
+) -> dict | int:
+    """PUT `chunk` at `offset`; returns the video resource once complete, else the next offset."""
+    if not chunk:
+        raise RuntimeError(f"Upload source ended at byte {offset} of {size}")
+    end = offset + len(chunk) - 1
+    r = await client.put(
+        session_url,
+        headers={**headers, "Content-Range": f"bytes {offset}-{end}/{size}"},
+        content=chunk,
+    )
+    if r.status_code in (200, 201):
+        return r.json()
+    if r.status_code != 308:
+        r.raise_for_status()
+        raise RuntimeError(f"Unexpected resumable upload response: {r.status_code}")
+    # 308 Resume Incomplete – continue after the last byte Google stored
+    received = r.headers.get("Range")
+    return int(received.rsplit("-", 1)[1]) + 1 if received else 0
+
+
+async def upload_stream(
+    access_token: str,
+    fh: BinaryIO,
+    size: int,
+    metadata: dict,
+    mimetype: str = "video/mp4",
+    on_progress: Callable[[int], Awaitable[None]] | None = None,
+) -> dict:
+    """
+    Upload `size` bytes from `fh` with the resumable upload protocol, one
+    CHUNK_SIZE piece at a time, and return the created video resource.
+    Only one chunk is ever held in memory.  `on_progress` is awaited with
+    the number of bytes Google has stored after every chunk.
+    """
+    headers = {"Authorization": f"Bearer {access_token}"}
+    async with httpx.AsyncClient(timeout=Timeout(60.0, read=300.0)) as client:
+        session_url = await _open_session(client, headers, size, metadata, mimetype)
+        offset = 0
+        while True:
+            fh.seek(offset)
+            async with media_budget.chunk_buffer():
+                chunk = await media_budget.read_chunk(fh, CHUNK_SIZE)
+                result = await _send_chunk(client, headers, session_url, chunk, offset, size)
+            if isinstance(result, dict):
+                return result
+            offset = result
+            if on_progress:
+                await on_progress(offset)
+
+
+async def upload_video_from_url(cred, url: str, size: int, title: str, desc: str,
+                                publish_at: datetime | None = None) -> str:
+    """
+    Like `upload_video_for_user`, but copies `size` bytes from `url` straight
+    into a resumable upload, without a local file – for videos larger than
+    the disk budget.  Up to two chunks are buffered: a chunk Google stored
+    only in part is completed from the next piece of the download.
+    """
+    headers = {"Authorization": f"Bearer {cred['access_token']}"}
+    metadata = {"snippet": {"title": title, "description": desc}, "status": _status_body(publish_at)}
+    print(f"Uploading video from {url} ({size} B) with title: {title}")
+    async with httpx.AsyncClient(timeout=Timeout(60.0, read=300.0)) as client, \
+            aiohttp.ClientSession() as session:
+        session_url = await _open_session(client, headers, size, metadata, "video/mp4")
+        async with session.get(url) as src, media_budget.chunk_buffer(3 * CHUNK_SIZE):
+            if src.status != 200:
+                raise RuntimeError(f"Failed to download {url}: HTTP {src.status}")
+            buf, offset = bytearray(), 0
+            async for piece in src.content.iter_chunked(CHUNK_SIZE):
+                buf += piece
+                while len(buf) >= CHUNK_SIZE:
+                    result = await _send_chunk(client, headers, session_url, bytes(buf[:CHUNK_SIZE]), offset, size)
+                    if isinstance(result, dict):
+                        return result["id"]
+                    del buf[:result - offset]
+                    offset = result
+            while True:
+                result = await _send_chunk(client, headers, session_url, bytes(buf), offset, size)
+                if isinstance(result, dict):
+                    return result["id"]
+                del buf[:result - offset]
+                offset = result
@@ -5,12 +5,19 @@ explicit offset and always returns a tz-aware **UTC** datetime.
 """
 
 from datetime import datetime, timezone
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
 _ISO_NO_SECONDS_T = "%Y-%m-%dT%H:%M"   # 2025-07-01T14:30
 _ISO_NO_SECONDS_S = "%Y-%m-%d %H:%M"   # 2025-07-01 14:30
 
 
+@lru_cache(maxsize=512)
+def get_zone(tz_str: str) -> ZoneInfo:
+    """ZoneInfo lookup, memoised for bulk parsing."""
+    return ZoneInfo(tz_str)
+
+
 def parse_run_at(raw: str, tz_str: str | None) -> datetime:
     """
     Parse `raw` and return an aware datetime in UTC.
@@ -38,7 +45,7 @@ def parse_run_at(raw: str, tz_str: str | None) -> datetime:
     if dt.tzinfo is None:
         if not tz_str:
             raise ValueError("Timezone missing: supply the ‘timezone’ field")
-        dt = dt.replace(tzinfo=ZoneInfo(tz_str))
+        dt = dt.replace(tzinfo=get_zone(tz_str))
 
     # 3) Normalise everything to UTC for storage/comparisons
     return dt.astimezone(timezone.utc)
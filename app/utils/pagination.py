@@ -0,0 +1,45 @@
+"""
+Opaque page tokens for keyset ("start after") pagination.
+
+A token carries the sort-field values of the last document on a page plus a
+fingerprint of the filters it was issued for, so it cannot be replayed
+against a different query.
+"""
+
+import base64
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+
+class InvalidPageToken(ValueError):
+    pass
+
+
+def _fingerprint(filters: Dict[str, Any]) -> str:
+    raw = json.dumps(filters, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def encode_page_token(last: Dict[str, Any], filters: Dict[str, Any]) -> str:
+    """`last` maps each order_by field to the last document's value."""
+    payload = {
+        "v": {k: v.isoformat() if isinstance(v, datetime) else v for k, v in last.items()},
+        "t": [k for k, v in last.items() if isinstance(v, datetime)],
+        "f": _fingerprint(filters),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_page_token(token: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        values = payload["v"]
+        for key in payload["t"]:
+            values[key] = datetime.fromisoformat(values[key])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidPageToken("malformed page token") from exc
+    if payload.get("f") != _fingerprint(filters):
+        raise InvalidPageToken("page token was issued for different filters")
+    return values